@@ -1,3 +1,4 @@
+# accounts/models.py
 #from django.contrib.auth.models import AbstractUser
 #from django.db import models
 
@@ -10,4 +11,44 @@
 #        return self.free_analyses_used < 3
     
 #    def __str__(self):
-#        return self.email
\ No newline at end of file
+#        return self.email
+
+from zoneinfo import available_timezones
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+def default_timezone():
+    return settings.TIME_ZONE
+
+
+def validate_timezone(value):
+    if value not in available_timezones():
+        raise ValidationError(f"Unknown timezone: {value}")
+
+
+class UserProfile(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
+    # IANA name; mood analytics bucket days in this zone
+    timezone = models.CharField(max_length=64, default=default_timezone, validators=[validate_timezone])
+
+    def __str__(self):
+        return f"{self.user.username} ({self.timezone})"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(timezone_cache_key(self.user_id))
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        cache.delete(timezone_cache_key(user_id))
+        return result
+
+
+def timezone_cache_key(user_id):
+    return f'accounts:timezone:{user_id}'
@@ -0,0 +1,26 @@
+# accounts/services.py
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import UserProfile, timezone_cache_key
+
+
+def get_user_timezone(user_id):
+    """The user's profile timezone (settings.TIME_ZONE without a profile)"""
+    key = timezone_cache_key(user_id)
+    name = cache.get(key)
+    if name is None:
+        name = (UserProfile.objects.filter(user_id=user_id).values_list('timezone', flat=True).first()
+                or settings.TIME_ZONE)
+        cache.set(key, name)
+    return get_zone(name)
+
+
+def get_zone(name):
+    """ZoneInfo for name, falling back to settings.TIME_ZONE if it is unknown"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
@@ -0,0 +1,184 @@
+# analysis/breaker.py
+"""
+Circuit breaker around the remote (Hugging Face) analyzer.
+
+The breaker watches the outcome and duration of recent remote calls (the
+last WINDOW seconds, at most MAX_SAMPLES of them) and stops sending
+traffic to an endpoint that is failing or slow:
+
+    closed     calls go through; once MIN_CALLS are in the window it trips
+               when ERROR_RATE of them failed or their p95 reaches
+               P95_LATENCY seconds
+    open       calls are rejected straight away (callers fall back to the
+               lexicon) for OPEN_SECONDS
+    half_open  up to PROBES calls go through as probes; a fast success
+               closes the breaker, anything else opens it again
+
+State, trip counts and window stats are per process (stats(), and the
+staff-only analysis/api/analyzer-status/ view). Configure with
+settings.MOOD_ANALYZER['BREAKER']; see DEFAULTS.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+DEFAULTS = {
+    'WINDOW': 60.0,
+    'MAX_SAMPLES': 200,
+    'MIN_CALLS': 10,
+    'ERROR_RATE': 0.5,
+    'P95_LATENCY': 2.0,
+    'OPEN_SECONDS': 30.0,
+    'PROBES': 1,
+}
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def breaker_setting(name):
+    return getattr(settings, 'MOOD_ANALYZER', {}).get('BREAKER', {}).get(name, DEFAULTS[name])
+
+
+class CircuitOpen(Exception):
+    """The breaker rejected a call without trying it"""
+
+
+class CircuitBreaker:
+    """Error-rate and p95-latency breaker with half-open probes; thread safe"""
+
+    def __init__(self, window=None, max_samples=None, min_calls=None, error_rate=None, p95_latency=None,
+                 open_seconds=None, probes=None, clock=time.monotonic):
+        def option(value, name):
+            return breaker_setting(name) if value is None else value
+
+        self.window = option(window, 'WINDOW')
+        self.min_calls = option(min_calls, 'MIN_CALLS')
+        self.error_rate = option(error_rate, 'ERROR_RATE')
+        self.p95_latency = option(p95_latency, 'P95_LATENCY')
+        self.open_seconds = option(open_seconds, 'OPEN_SECONDS')
+        self.probes = option(probes, 'PROBES')
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        # (finished at, succeeded, seconds) of recent calls, oldest first
+        self._calls = deque(maxlen=option(max_samples, 'MAX_SAMPLES'))
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = 0
+        self.trips = {'errors': 0, 'latency': 0, 'probe': 0}
+        self.rejected = 0
+        self.last_trip = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state, self._probing = HALF_OPEN, 0
+        return self._state
+
+    def allow(self):
+        """Whether a call may go out now; a True in half_open claims a probe slot"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, succeeded, seconds):
+        """Report the outcome of a call that allow() let through"""
+        with self._lock:
+            now = self.clock()
+            if self._state == HALF_OPEN:
+                self._probing = max(self._probing - 1, 0)
+                if succeeded and seconds < self.p95_latency:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._trip('probe', now)
+                return
+            if self._state == OPEN:
+                return  # Started before the breaker tripped
+            self._calls.append((now, succeeded, seconds))
+            self._prune(now)
+            if len(self._calls) < self.min_calls:
+                return
+            if self._failure_rate() >= self.error_rate:
+                self._trip('errors', now)
+            elif self._p95() >= self.p95_latency:
+                self._trip('latency', now)
+
+    def call(self, function, *args, **kwargs):
+        """function(*args, **kwargs) through the breaker; CircuitOpen if rejected"""
+        if not self.allow():
+            raise CircuitOpen(f"Remote analyzer circuit is {self.state}")
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self.record(False, time.perf_counter() - start)
+            raise
+        self.record(True, time.perf_counter() - start)
+        return result
+
+    def _trip(self, reason, now):
+        self._state, self._opened_at, self._probing = OPEN, now, 0
+        self.trips[reason] += 1
+        self.last_trip = reason
+        self._calls.clear()
+
+    def _prune(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _failure_rate(self):
+        return sum(not succeeded for _at, succeeded, _seconds in self._calls) / len(self._calls)
+
+    def _p95(self):
+        latencies = sorted(seconds for _at, _succeeded, seconds in self._calls)
+        return latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+
+    def stats(self):
+        with self._lock:
+            self._prune(self.clock())
+            state = self._current_state()
+            return {
+                'state': state,
+                'open_for': (max(self.open_seconds - (self.clock() - self._opened_at), 0.0)
+                             if state == OPEN else None),
+                'trips': dict(self.trips),
+                'last_trip': self.last_trip,
+                'rejected': self.rejected,
+                'calls': len(self._calls),
+                'error_rate': self._failure_rate() if self._calls else None,
+                'p95_latency': self._p95() if self._calls else None,
+            }
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def remote_breaker():
+    """The process-wide breaker of the remote analyzer, created on first use"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+
+def reset_remote_breaker():
+    """Drop the process-wide breaker (state and counters); the next use builds a new one"""
+    global _breaker
+    with _breaker_lock:
+        _breaker = None
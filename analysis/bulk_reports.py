@@ -0,0 +1,170 @@
+# analysis/bulk_reports.py
+"""
+Mood reports for many users at once, rendered on a process pool.
+
+`python manage.py generate_bulk_reports` picks the users and calls
+generate_reports(), which hands one user per task to a
+ProcessPoolExecutor. Each worker opens its own database connection and
+reads its user's analyses in chunks (write_mood_report), so workers
+share nothing but the output directory, and throughput grows with the
+number of cores until the database becomes the limit.
+
+The output directory holds one PDF per user and manifest.jsonl: a header
+line with the run's parameters, then one line per finished (or failed)
+user, appended and flushed as each report lands. PDFs are written beside
+their final name and renamed into place. Running the same command again
+after a crash therefore skips every user the manifest already has a
+report for and retries the rest.
+"""
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connections
+
+from .reports import write_mood_report
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+class ManifestMismatch(Exception):
+    """The output directory holds a run with different parameters"""
+
+
+def report_filename(user_id, username):
+    return f"{user_id}-{username}.pdf"
+
+
+class Manifest:
+    """The manifest.jsonl of an output directory, opened for appending"""
+
+    def __init__(self, directory, params):
+        self.path = Path(directory) / MANIFEST_NAME
+        self.params = params
+        # user_id -> latest record
+        self.records = {}
+        if self.path.exists():
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({'params': params}) + '\n')
+        self._file = open(self.path, 'a')
+
+    def _load(self):
+        with open(self.path, 'rb+') as manifest:
+            content = manifest.read()
+            # A crash mid-write leaves a partial last line; drop it
+            complete = content[:content.rfind(b'\n') + 1]
+            if len(complete) != len(content):
+                manifest.truncate(len(complete))
+        lines = complete.decode().splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get('params') != self.params:
+            raise ManifestMismatch(
+                f"{self.path} was written for {header.get('params')}, not {self.params}"
+            )
+        for line in lines[1:]:
+            record = json.loads(line)
+            self.records[record['user_id']] = record
+
+    def is_done(self, user_id):
+        record = self.records.get(user_id)
+        return (record is not None and record['status'] == 'done'
+                and (self.path.parent / record['file']).exists())
+
+    def record(self, record):
+        self.records[record['user_id']] = record
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def render_user_report(user_id, directory, params, chunk_size=None):
+    """Render one user's report into directory; its manifest record"""
+    started = time.perf_counter()
+    record = {'user_id': user_id, 'username': None, 'file': None, 'status': 'failed',
+              'pages': 0, 'bytes': 0, 'seconds': 0.0, 'error': ''}
+    try:
+        user = User.objects.get(id=user_id)
+        record['username'] = user.username
+        record['file'] = report_filename(user.id, user.username)
+        path = Path(directory) / record['file']
+        partial = path.with_name(f".{path.name}.{os.getpid()}")
+        try:
+            with open(partial, 'wb') as output:
+                record['pages'] = write_mood_report(
+                    user, output,
+                    start=date.fromisoformat(params['start']) if params['start'] else None,
+                    end=date.fromisoformat(params['end']) if params['end'] else None,
+                    max_rows=params['max_rows'],
+                    chunk_size=chunk_size,
+                )
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+        record['bytes'] = path.stat().st_size
+        record['status'] = 'done'
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def _init_worker():
+    # Forked workers inherit a configured Django; spawned ones start bare
+    if not apps.ready:
+        django.setup()
+
+
+def generate_reports(user_ids, directory, params, processes=None, chunk_size=None, log=None):
+    """
+    Render the reports of user_ids into directory on processes worker
+    processes (in this process when processes is 1), skipping users the
+    manifest already has; returns the records of this run. log(record) is
+    called as each report finishes.
+    """
+    processes = processes or os.cpu_count() or 1
+    directory = Path(directory)
+    manifest = Manifest(directory, params)
+    pending = [user_id for user_id in user_ids if not manifest.is_done(user_id)]
+    results = []
+
+    def finished(record):
+        manifest.record(record)
+        results.append(record)
+        if log:
+            log(record)
+
+    try:
+        if processes <= 1:
+            for user_id in pending:
+                finished(render_user_report(user_id, directory, params, chunk_size))
+            return results
+
+        # Workers must open their own connections, not share this process's
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+            queue = iter(pending)
+            running = set()
+            while True:
+                # A couple of tasks per worker keeps them busy without queueing thousands
+                for user_id in queue:
+                    running.add(pool.submit(render_user_report, user_id, directory, params, chunk_size))
+                    if len(running) >= processes * 2:
+                        break
+                if not running:
+                    return results
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished(future.result())
+    finally:
+        manifest.close()
@@ -0,0 +1,235 @@
+# analysis/classifier.py
+"""
+Offline emotion classifier: hashed n-gram features and a linear model.
+
+Each text becomes a sparse vector of hashed features: words, word
+bigrams ("not happy") and character 3/4-grams of each word ("<exh",
+"haus"), counted, signed by one bit of the hash and L2-normalised, plus a
+bias feature. Hash codes of each distinct word are cached, since words
+recur across texts. A weight matrix of shape (2**bits + 1, len(moods)) turns
+that into one logit per mood. Scoring a batch is a single sparse-by-dense
+product (gather the weight rows of every feature, scale, sum per text)
+followed by a softmax, so the model needs NumPy and nothing else.
+
+Weights are a float32 .npy file (settings.MOOD_CLASSIFIER['PATH']) with
+a small JSON sidecar (<path>.json: moods, bits, a content hash of the
+weights, training stats). Workers
+open it with mmap_mode='r', so gunicorn workers share one copy of the
+pages, and get_classifier() re-checks it every CHECK_INTERVAL seconds to
+pick up a retrained model. Train with `python manage.py
+train_mood_classifier`.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+FEATURE_VERSION = 1
+DEFAULT_BITS = 18
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+class ClassifierUnavailable(Exception):
+    """No trained weights at settings.MOOD_CLASSIFIER['PATH']"""
+
+
+def classifier_path():
+    config = getattr(settings, 'MOOD_CLASSIFIER', {})
+    return Path(config.get('PATH', Path(settings.BASE_DIR) / 'var' / 'mood_classifier.npy'))
+
+
+@lru_cache(maxsize=50_000)
+def _word_codes(word):
+    """crc32 of word and of its character 3/4-grams (words recur, so this is cached)"""
+    padded = f"<{word}>"
+    grams = [word] + [padded[start:start + size] for size in (3, 4) for start in range(len(padded) - size + 1)]
+    codes = np.array([zlib.crc32(gram.encode()) for gram in grams], dtype=np.uint32)
+    codes.flags.writeable = False
+    return codes
+
+
+def text_features(text, bits):
+    """(indices, values) of text's hashed features; the bias feature (index 2**bits) comes last"""
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return np.array([1 << bits], dtype=np.int64), np.ones(1, dtype=np.float32)
+    bigrams = np.array([zlib.crc32(f"{first} {second}".encode()) for first, second in zip(words, words[1:])],
+                       dtype=np.uint32)
+    codes = np.concatenate([_word_codes(word) for word in words] + [bigrams])
+
+    # The top bit signs the feature so that collisions tend to cancel out
+    signs = np.where(codes & 0x80000000, 1.0, -1.0)
+    indices, inverse = np.unique((codes & ((1 << bits) - 1)).astype(np.int64), return_inverse=True)
+    values = np.bincount(inverse, weights=signs).astype(np.float32)
+    norm = np.sqrt(np.dot(values, values))
+    if norm:
+        values /= norm
+    return np.append(indices, 1 << bits), np.append(values, np.float32(1.0))
+
+
+def batch_features(texts, bits):
+    """(indices, values, offsets) of texts, CSR style: text i is offsets[i]:offsets[i + 1]"""
+    features = [text_features(text, bits) for text in texts]
+    offsets = np.zeros(len(features) + 1, dtype=np.int64)
+    np.cumsum([len(indices) for indices, _values in features], out=offsets[1:])
+    if not features:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), offsets
+    return (np.concatenate([indices for indices, _values in features]),
+            np.concatenate([values for _indices, values in features]), offsets)
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+
+def _logits(weights, indices, values, offsets):
+    # Every text has at least its bias feature, so no reduceat segment is empty
+    return np.add.reduceat(weights[indices] * values[:, None], offsets[:-1], axis=0)
+
+
+class MoodClassifier:
+    """A trained (possibly memory-mapped) weight matrix and the moods of its columns"""
+
+    def __init__(self, weights, moods, bits=DEFAULT_BITS, info=None):
+        if weights.shape != ((1 << bits) + 1, len(moods)):
+            raise ValueError(f"Weights of shape {weights.shape} do not fit {bits} bits and {len(moods)} moods")
+        self.weights = weights
+        self.moods = tuple(moods)
+        self.bits = bits
+        self.info = info or {}
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map the weights at path (read-only)"""
+        path = Path(path)
+        with open(f"{path}.json", encoding='utf-8') as handle:
+            info = json.load(handle)
+        if info.get('feature_version') != FEATURE_VERSION:
+            raise ValueError(f"{path} was trained on feature version {info.get('feature_version')}")
+        classifier = cls(np.load(path, mmap_mode='r'), info['moods'], info['bits'], info)
+        stat = os.stat(path)
+        classifier.file_signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return classifier
+
+    @property
+    def version(self):
+        """Content hash of the weights (as saved), for cache keys"""
+        return self.info.get('version')
+
+    def predict_proba(self, texts):
+        """(len(texts), len(moods)) array of mood probabilities"""
+        if not texts:
+            return np.zeros((0, len(self.moods)), dtype=np.float32)
+        return _softmax(_logits(self.weights, *batch_features(texts, self.bits)))
+
+    @classmethod
+    def train(cls, texts, labels, moods, bits=DEFAULT_BITS, epochs=10, learning_rate=0.5, batch_size=64,
+              l2=1e-6, seed=0):
+        """Fit softmax regression with mini-batch AdaGrad; labels are moods, one per text"""
+        index = {mood: column for column, mood in enumerate(moods)}
+        targets = np.array([index[label] for label in labels], dtype=np.int64)
+        features = [text_features(text, bits) for text in texts]
+        weights = np.zeros(((1 << bits) + 1, len(moods)), dtype=np.float32)
+        squared = np.full_like(weights, 1e-8)
+        rng = np.random.default_rng(seed)
+
+        for _epoch in range(epochs):
+            order = rng.permutation(len(texts))
+            for start in range(0, len(order), batch_size):
+                rows = order[start:start + batch_size]
+                lengths = [len(features[row][0]) for row in rows]
+                indices = np.concatenate([features[row][0] for row in rows])
+                values = np.concatenate([features[row][1] for row in rows])
+                offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+                np.cumsum(lengths, out=offsets[1:])
+
+                error = _softmax(_logits(weights, indices, values, offsets))
+                error[np.arange(len(rows)), targets[rows]] -= 1.0
+                # Gradient rows of the features present in this batch only
+                touched, inverse = np.unique(indices, return_inverse=True)
+                gradient = np.zeros((len(touched), len(moods)), dtype=np.float32)
+                np.add.at(gradient, inverse, values[:, None] * np.repeat(error, lengths, axis=0))
+                gradient /= len(rows)
+                gradient += l2 * weights[touched]
+                squared[touched] += gradient ** 2
+                weights[touched] -= learning_rate * gradient / np.sqrt(squared[touched])
+        return cls(weights, moods, bits)
+
+    def accuracy(self, texts, labels):
+        if not texts:
+            return None
+        predicted = self.predict_proba(texts).argmax(axis=1)
+        return float(np.mean([self.moods[column] == label for column, label in zip(predicted, labels)]))
+
+    def save(self, path, **info):
+        """Write weights and sidecar atomically (sidecar first, weights swapped in last)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        weights = np.ascontiguousarray(self.weights)
+        self.info = {'feature_version': FEATURE_VERSION, 'moods': list(self.moods), 'bits': self.bits,
+                     'version': hashlib.sha1(weights.data).hexdigest()[:16], **info}
+        for target, write in ((Path(f"{path}.json"), lambda handle: handle.write(json.dumps(self.info).encode())),
+                              (path, lambda handle: np.save(handle, weights))):
+            handle, partial = tempfile.mkstemp(dir=path.parent, prefix=f".{target.name}.")
+            try:
+                with os.fdopen(handle, 'wb') as output:
+                    write(output)
+                os.replace(partial, target)
+            finally:
+                if os.path.exists(partial):
+                    os.unlink(partial)
+
+
+_current = None
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+
+def get_classifier():
+    """The newest trained classifier, re-checking its file every CHECK_INTERVAL seconds"""
+    global _current, _checked_at
+    interval = getattr(settings, 'MOOD_CLASSIFIER', {}).get('CHECK_INTERVAL', 5)
+    classifier = _current
+    if classifier is not None and time.monotonic() - _checked_at < interval:
+        return classifier
+
+    with _reload_lock:
+        if _current is not None and time.monotonic() - _checked_at < interval:
+            return _current
+        path = classifier_path()
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            _current = None
+            raise ClassifierUnavailable(f"No trained mood classifier at {path}")
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if _current is None or getattr(_current, 'file_signature', None) != signature:
+            try:
+                _current = MoodClassifier.open(path)
+            except (OSError, ValueError, KeyError) as e:
+                if _current is None:
+                    raise ClassifierUnavailable(f"Could not load {path}: {e}")
+                # Keep the previous model while a retrain is half-written
+        _checked_at = time.monotonic()
+        return _current
+
+
+def reset_classifier():
+    """Forget the loaded classifier so the next get_classifier() reloads it"""
+    global _current, _checked_at
+    with _reload_lock:
+        _current = None
+        _checked_at = 0.0
@@ -0,0 +1,155 @@
+# analysis/inference.py
+"""
+Client for the Hugging Face inference API (emotion classification).
+
+One InferenceClient per process and API key (inference_client()) keeps a
+requests.Session, so calls reuse pooled keep-alive connections instead of
+paying a TCP and TLS handshake each. Texts are sent BATCH_SIZE per HTTP
+call. Every call has a connect and a read timeout; connection errors,
+timeouts, 429 and 5xx responses (503 while the model loads) are retried
+RETRIES times with jittered exponential backoff, honouring Retry-After or
+the API's estimated_time. Anything else raises InferenceError. An
+optional deadline (a time.monotonic() value) caps the whole call: timeouts
+shrink to the time left, and no retry starts that could not finish in it.
+
+    labels = inference_client().classify(["I feel great", "so tired"])
+    # [{'joy': 0.93, 'neutral': 0.03, ...}, {'sadness': 0.61, ...}]
+
+Settings live in settings.HF_INFERENCE; see DEFAULTS.
+"""
+import random
+import time
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+DEFAULTS = {
+    'API_URL': "https://api-inference.huggingface.co/models/j-hartmann/emotion-english-distilroberta-base",
+    'API_KEY': '',
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10.0,
+    'RETRIES': 2,
+    'BACKOFF': 0.5,
+    'MAX_BACKOFF': 8.0,
+    'BATCH_SIZE': 32,
+    'POOL_SIZE': 10,
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def inference_setting(name):
+    return getattr(settings, 'HF_INFERENCE', {}).get(name, DEFAULTS[name])
+
+
+class InferenceError(Exception):
+    """The inference API did not classify a batch (after any retries)"""
+
+
+class InferenceClient:
+    """Pooled, batching, retrying client of one inference endpoint"""
+
+    def __init__(self, url=None, api_key=None, connect_timeout=None, read_timeout=None, retries=None,
+                 backoff=None, max_backoff=None, batch_size=None, pool_size=None):
+        def option(value, name):
+            return inference_setting(name) if value is None else value
+
+        self.url = option(url, 'API_URL')
+        self.timeout = (option(connect_timeout, 'CONNECT_TIMEOUT'), option(read_timeout, 'READ_TIMEOUT'))
+        self.retries = option(retries, 'RETRIES')
+        self.backoff = option(backoff, 'BACKOFF')
+        self.max_backoff = option(max_backoff, 'MAX_BACKOFF')
+        self.batch_size = option(batch_size, 'BATCH_SIZE')
+
+        self.session = requests.Session()
+        # Retries are ours (with jitter); the adapter only pools connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=option(pool_size, 'POOL_SIZE'), max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        api_key = option(api_key, 'API_KEY')
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+
+    def classify(self, texts, deadline=None):
+        """{label: score} for each text, in order; InferenceError if a batch fails or the deadline passes"""
+        texts = list(texts)
+        results = []
+        for start in range(0, len(texts), self.batch_size):
+            results.extend(self._classify_batch(texts[start:start + self.batch_size], deadline))
+        return results
+
+    def _timeout(self, deadline):
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise InferenceError("Deadline exceeded before the inference API answered")
+        return tuple(min(timeout, remaining) for timeout in self.timeout)
+
+    def _classify_batch(self, batch, deadline=None):
+        payload = {'inputs': batch, 'parameters': {'top_k': None}}
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self._timeout(deadline))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    return self._parse(response, len(batch))
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRY_STATUSES:
+                    raise InferenceError(error)
+                retry_after = self._retry_after(response)
+            if attempt < self.retries:
+                delay = self._delay(attempt, retry_after)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise InferenceError(f"Deadline exceeded after {attempt + 1} attempt(s): {error}")
+                time.sleep(delay)
+        raise InferenceError(f"Gave up after {self.retries + 1} attempts: {error}")
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        # Full jitter: callers that failed together do not retry together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get('Retry-After')
+        if value is None:
+            try:
+                value = response.json().get('estimated_time')
+            except (ValueError, AttributeError):
+                return None
+        try:
+            return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _parse(response, expected):
+        try:
+            body = response.json()
+        except ValueError:
+            raise InferenceError(f"Invalid JSON from the inference API: {response.text[:200]}")
+        # A single input may come back as a flat list of labels
+        if expected == 1 and body and isinstance(body[0], dict):
+            body = [body]
+        if not isinstance(body, list) or len(body) != expected:
+            raise InferenceError(f"Expected {expected} result(s) from the inference API, got {str(body)[:200]}")
+        try:
+            return [{item['label']: float(item['score']) for item in labels} for labels in body]
+        except (KeyError, TypeError, ValueError):
+            raise InferenceError(f"Unexpected result from the inference API: {str(body)[:200]}")
+
+    def close(self):
+        self.session.close()
+
+
+@lru_cache(maxsize=8)
+def inference_client(api_key=None):
+    """The process-wide client for api_key (default: HF_INFERENCE['API_KEY'])"""
+    return InferenceClient(api_key=api_key)
@@ -0,0 +1,136 @@
+# analysis/inference_stub.py
+"""
+Local stand-in for the Hugging Face inference API (tests and benchmarks).
+
+StubInferenceServer answers POSTs the way the emotion model endpoint
+does, from the keyword lexicon instead of a model, on a free port of
+127.0.0.1 in a background thread. It counts requests and connections,
+can add latency, and can be told to fail the next requests.
+
+    with StubInferenceServer(latency=0.02) as stub:
+        client = InferenceClient(url=stub.url)
+        client.classify(["I feel great"])
+        stub.requests, stub.connections  # 1, 1
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.lexicon import ANALYSIS_LEXICON
+
+# Model label of each lexicon mood (the inverse of MoodAnalyzer.EMOTION_MAP)
+MODEL_LABELS = {
+    'happy': 'joy',
+    'sad': 'sadness',
+    'angry': 'anger',
+    'fear': 'fear',
+    'neutral': 'neutral',
+    'surprise': 'surprise',
+}
+
+
+def stub_labels(text):
+    """Model-style [{label, score}] for text, highest score first"""
+    scores = ANALYSIS_LEXICON.as_dict(ANALYSIS_LEXICON.score(text))
+    total = sum(scores.values())
+    if not total:
+        scores, total = {'neutral': 1.0}, 1.0
+    labels = {label: 0.0 for label in (*MODEL_LABELS.values(), 'disgust')}
+    for mood, score in scores.items():
+        labels[MODEL_LABELS[mood]] += score / total
+    return [{'label': label, 'score': score}
+            for label, score in sorted(labels.items(), key=lambda item: -item[1])]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    # Headers and body are separate writes; without TCP_NODELAY the body
+    # waits for the client's delayed ACK on a reused connection
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with stub.lock:
+            stub.requests += 1
+            stub.authorizations.append(self.headers.get('Authorization'))
+            failure = stub.failures.pop(0) if stub.failures else None
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if failure is not None:
+            status, headers, payload = failure
+        else:
+            inputs = body.get('inputs')
+            if isinstance(inputs, str):
+                status, headers, payload = 200, {}, [stub_labels(inputs)]
+            elif isinstance(inputs, list) and all(isinstance(text, str) for text in inputs):
+                status, headers, payload = 200, {}, [stub_labels(text) for text in inputs]
+            else:
+                status, headers, payload = 400, {}, {'error': 'inputs must be a string or a list of strings'}
+
+        data = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out and hung up while we slept
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubInferenceServer:
+    """The stub endpoint, serving on its own thread while started"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.authorizations = []
+        # (status, headers, payload) answered by the next requests, in order
+        self.failures = []
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/models/stub"
+
+    def fail_next(self, count=1, status=503, retry_after=None, payload=None):
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        payload = payload if payload is not None else {'error': 'Model is currently loading'}
+        with self.lock:
+            self.failures.extend([(status, headers, payload)] * count)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='inference-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
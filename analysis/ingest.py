@@ -0,0 +1,163 @@
+# analysis/ingest.py
+"""
+Bulk import of journal entries (diaries moved over from other apps).
+
+An entry has 'text' and optionally 'created_at': ISO 8601, a date alone
+meaning local midnight, naive times read in the user's timezone, missing
+meaning now. Other keys (such as the extra columns of our own CSV/NDJSON
+exports) are ignored; moods are always computed here.
+
+import_entries() takes any iterable of entries and works BATCH_SIZE at a
+time: one MoodAnalyzer.analyze_batch call per batch (past the result
+cache, since imported texts rarely come back), then one bulk_create in its
+own transaction together with the batch's daily rollup deltas and a
+MoodDataVersion bump, which bulk_create would otherwise skip (it sends no
+model signals). Memory depends on BATCH_SIZE, not on the size of the
+import.
+
+    with open('diary.ndjson', encoding='utf-8') as handle:
+        stats = import_entries(user, read_entries(handle, 'ndjson'))
+
+Used by the analysis/api/import/ endpoint (at most MAX_ENTRIES per
+request) and `python manage.py import_journal`. Settings live in
+settings.MOOD_IMPORT; see DEFAULTS.
+"""
+import csv
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, time as dt_time
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from accounts.services import get_user_timezone
+
+from .models import MoodAnalysis
+from .rollups import add_deltas, bump_versions
+from .services import MoodAnalyzer
+
+DEFAULTS = {
+    'BATCH_SIZE': 500,
+    'MAX_ENTRIES': 500,
+}
+
+FORMATS = ('csv', 'ndjson')
+
+
+def import_setting(name):
+    return getattr(settings, 'MOOD_IMPORT', {}).get(name, DEFAULTS[name])
+
+
+class InvalidEntry(ValueError):
+    """An entry without text, or with a timestamp that cannot be read"""
+
+
+def read_entries(handle, fmt):
+    """Entries of an open CSV (text, created_at columns) or NDJSON file, read lazily"""
+    if fmt == 'csv':
+        return csv.DictReader(handle)
+    if fmt == 'ndjson':
+        # Parsed by parse_entry, so a bad line is one invalid entry
+        return (line for line in handle if line.strip())
+    raise ValueError(f"Unknown import format '{fmt}' (use one of: {', '.join(FORMATS)})")
+
+
+def parse_entry(entry, zone):
+    """(text, created_at) of an entry (a dict, or one NDJSON line); InvalidEntry if unusable"""
+    if isinstance(entry, str):
+        try:
+            entry = json.loads(entry)
+        except ValueError as e:
+            raise InvalidEntry(f"invalid JSON ({e})")
+    if not isinstance(entry, dict):
+        raise InvalidEntry("expected an object with 'text'")
+    text = entry.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise InvalidEntry("'text' is missing or empty")
+
+    value = entry.get('created_at')
+    if value is None or value == '':
+        return text.strip(), timezone.now()
+    moment = None
+    if isinstance(value, str):
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                moment = datetime.combine(day, dt_time()) if day else None
+        except ValueError:
+            pass
+    if moment is None:
+        raise InvalidEntry(f"'created_at' is not an ISO 8601 date or time: {value!r}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, zone)
+    return text.strip(), moment
+
+
+def import_entries(user, entries, batch_size=None, engine=None, skip_invalid=False, log=None):
+    """
+    Analyze and store entries for user, batch by batch. An invalid entry
+    raises InvalidEntry (batches before it stay imported; wrap the call in
+    a transaction for all or nothing) unless skip_invalid, which counts it
+    and passes a note to log. Returns {'imported', 'skipped', 'seconds',
+    'rows_per_second'}.
+    """
+    batch_size = batch_size or import_setting('BATCH_SIZE')
+    zone = get_user_timezone(user.id)
+    numbered = enumerate(entries, 1)
+    imported = skipped = 0
+    start = time.perf_counter()
+
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        parsed = []
+        for number, entry in batch:
+            try:
+                parsed.append(parse_entry(entry, zone))
+            except InvalidEntry as e:
+                if not skip_invalid:
+                    raise InvalidEntry(f"Entry {number}: {e}")
+                skipped += 1
+                if log:
+                    log(f"Skipped entry {number}: {e}")
+        if parsed:
+            imported += _store_batch(user, parsed, zone, engine)
+
+    seconds = time.perf_counter() - start
+    return {
+        'imported': imported,
+        'skipped': skipped,
+        'seconds': seconds,
+        'rows_per_second': imported / seconds if seconds else 0.0,
+    }
+
+
+def _store_batch(user, parsed, zone, engine):
+    results = MoodAnalyzer.analyze_batch([text for text, _created_at in parsed], engine, cached=False)
+    analyses = []
+    # (local day, mood) -> [count, confidence sum]
+    buckets = defaultdict(lambda: [0, 0.0])
+    for (text, created_at), result in zip(parsed, results):
+        analyses.append(MoodAnalysis(
+            user=user,
+            text=text,
+            detected_mood=result['detected_mood'],
+            confidence=result['confidence'],
+            emotions=result['emotions'],
+            created_at=created_at,
+        ))
+        bucket = buckets[(timezone.localtime(created_at, zone).date(), result['detected_mood'])]
+        bucket[0] += 1
+        bucket[1] += result['confidence']
+
+    with transaction.atomic():
+        MoodAnalysis.objects.bulk_create(analyses)
+        add_deltas(user.id, buckets)
+        bump_versions([user.id])
+    return len(analyses)
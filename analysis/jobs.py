@@ -0,0 +1,198 @@
+# analysis/jobs.py
+"""
+Background report jobs.
+
+enqueue_report() records a ReportJob and `python manage.py
+run_report_worker` renders it. The queue is the ReportJob table itself:
+workers claim a job with a conditional UPDATE, so several worker
+processes (each with its own threads) can share it without locks.
+
+Artifacts are files under settings.REPORT_JOBS['ARTIFACT_DIR'] named by
+(user, report type, params, data version). The data version changes with
+every analysis saved or deleted, so an unchanged dataset is never
+rendered twice: repeat requests get the running or finished job, or a
+new job that is done as soon as it is created.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import MoodDataVersion, ReportJob
+from .reports import report_setting, write_mood_report
+
+DEFAULTS = {
+    'ARTIFACT_DIR': Path(settings.BASE_DIR) / 'var' / 'reports',
+    'POLL_INTERVAL': 1.0,
+    'STALE_AFTER': 15 * 60,
+    'MAX_ATTEMPTS': 3,
+}
+
+
+def job_setting(name):
+    return getattr(settings, 'REPORT_JOBS', {}).get(name, DEFAULTS[name])
+
+
+def _render_pdf(user, output, params):
+    write_mood_report(
+        user, output,
+        start=date.fromisoformat(params['start']) if params.get('start') else None,
+        end=date.fromisoformat(params['end']) if params.get('end') else None,
+        max_rows=params.get('max_rows'),
+    )
+
+
+# report_type -> (file suffix, content type, renderer(user, output, params))
+RENDERERS = {
+    'pdf': ('.pdf', 'application/pdf', _render_pdf),
+}
+
+
+def report_params(start=None, end=None, max_rows=None):
+    """Canonical params of a PDF report, as stored on the job"""
+    return {
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'max_rows': max_rows or report_setting('MAX_ROWS'),
+    }
+
+
+def artifact_key(report_type, params, version):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{report_type}-{digest}-v{version}"
+
+
+def artifact_path(job):
+    suffix = RENDERERS[job.report_type][0]
+    return Path(job_setting('ARTIFACT_DIR')) / str(job.user_id) / f"{job.cache_key}{suffix}"
+
+
+def enqueue_report(user, report_type='pdf', params=None):
+    """The job that will produce (or produced) this report for the user's current data"""
+    params = params if params is not None else report_params()
+    version = MoodDataVersion.objects.filter(user=user).values_list('version', flat=True).first() or 0
+    key = artifact_key(report_type, params, version)
+
+    # A double click, or a repeat request for unchanged data
+    existing = ReportJob.objects.filter(user=user, cache_key=key).exclude(status=ReportJob.FAILED).order_by('-id').first()
+    if existing is not None and (existing.status != ReportJob.DONE or artifact_path(existing).exists()):
+        return existing
+
+    job = ReportJob(user=user, report_type=report_type, params=params, cache_key=key, data_version=version)
+    if artifact_path(job).exists():
+        job.status, job.finished_at = ReportJob.DONE, timezone.now()
+        job.artifact = str(artifact_path(job))
+    job.save()
+    return job
+
+
+def claim_next_job():
+    """Mark the oldest runnable job as running for this worker and return it (None when idle)"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=job_setting('STALE_AFTER'))
+    # Running jobs whose worker died are picked up again after STALE_AFTER
+    candidates = ReportJob.objects.filter(
+        Q(status=ReportJob.QUEUED) | Q(status=ReportJob.RUNNING, started_at__lt=stale)
+    ).order_by('created_at').values_list('id', 'status', 'started_at')[:10]
+    for job_id, status, started_at in candidates:
+        claimed = ReportJob.objects.filter(id=job_id, status=status, started_at=started_at).update(
+            status=ReportJob.RUNNING, started_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            return ReportJob.objects.select_related('user').get(id=job_id)
+    return None
+
+
+def _finish(job, status, **fields):
+    # Only while the job is still this claim: past STALE_AFTER a slow render
+    # may have been claimed again, and that run's result stands
+    finished = ReportJob.objects.filter(
+        id=job.id, status=ReportJob.RUNNING, attempts=job.attempts, started_at=job.started_at,
+    ).update(status=status, finished_at=timezone.now(), **fields)
+    return status if finished else None
+
+
+def run_job(job):
+    """
+    Render a claimed job's artifact (unless it already exists); the resulting
+    status, or None if the job was claimed again meanwhile
+    """
+    if job.attempts > job_setting('MAX_ATTEMPTS'):
+        return _finish(job, ReportJob.FAILED, error=f"Gave up after {job.attempts - 1} attempts")
+    path = artifact_path(job)
+    try:
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Render beside the artifact and rename, so readers never see half a file
+            partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+            try:
+                with open(partial, 'wb') as output:
+                    RENDERERS[job.report_type][2](job.user, output, job.params)
+                os.replace(partial, path)
+            finally:
+                partial.unlink(missing_ok=True)
+            # Artifacts of older data versions of this report are dead
+            prefix = job.cache_key.rsplit('-v', 1)[0] + '-v'
+            for old in path.parent.glob(f"{prefix}*"):
+                if old != path:
+                    old.unlink(missing_ok=True)
+        return _finish(job, ReportJob.DONE, artifact=str(path), error='')
+    except Exception as e:
+        return _finish(job, ReportJob.FAILED, error=str(e))
+
+
+def _run_claimed(job):
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
+
+
+def run_worker(threads=1, once=False, poll_interval=None, log=None):
+    """
+    Claim and run jobs on threads threads until stopped, or with once until
+    the queue is empty; returns the number of jobs run. log(job, status) is
+    called after each job.
+    """
+    poll_interval = job_setting('POLL_INTERVAL') if poll_interval is None else poll_interval
+    processed = 0
+    if threads <= 1:
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    return processed
+                time.sleep(poll_interval)
+                continue
+            status = run_job(job)
+            processed += 1
+            if log:
+                log(job, status)
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='mindtrack-report') as pool:
+        running = {}
+        while True:
+            while len(running) < threads:
+                job = claim_next_job()
+                if job is None:
+                    break
+                running[pool.submit(_run_claimed, job)] = job
+            if not running:
+                if once:
+                    return processed
+                time.sleep(poll_interval)
+                continue
+            done, _pending = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                processed += 1
+                if log:
+                    log(job, future.result())
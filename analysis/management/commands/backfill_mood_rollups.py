@@ -0,0 +1,27 @@
+# analysis/management/commands/backfill_mood_rollups.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily mood rollups from existing mood analyses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], metavar='USERNAME',
+                            help='Only rebuild this user (repeatable; default: everyone)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            users = dict(User.objects.filter(username__in=options['user']).values_list('username', 'id'))
+            missing = sorted(set(options['user']) - set(users))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(missing)}")
+            user_ids = list(users.values())
+
+        created = rebuild_rollups(user_ids, batch_size=options['batch_size'])
+        scope = f"{len(user_ids)} user(s)" if user_ids is not None else "all users"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily mood rollups for {scope}"))
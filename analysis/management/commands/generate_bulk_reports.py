@@ -0,0 +1,101 @@
+# analysis/management/commands/generate_bulk_reports.py
+import calendar
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.bulk_reports import ManifestMismatch, generate_reports
+from analysis.jobs import report_params
+from analysis.models import MoodDailyRollup
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"'{value}' is not a date (YYYY-MM-DD)")
+
+
+def _month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+    except ValueError:
+        raise CommandError(f"'{value}' is not a month (YYYY-MM)")
+
+
+class Command(BaseCommand):
+    help = ("Render PDF mood reports for many users into a directory, on a process pool "
+            "(rerun the same command to resume after a crash)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory for the PDFs and manifest.jsonl')
+        parser.add_argument('--user', action='append', default=[], metavar='USERNAME',
+                            help='Only this user (repeatable)')
+        parser.add_argument('--group', action='append', default=[], metavar='NAME',
+                            help='Only members of this group (repeatable)')
+        parser.add_argument('--month', help='Report on this month (YYYY-MM)')
+        parser.add_argument('--start', help='First day to report on (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to report on (YYYY-MM-DD)')
+        parser.add_argument('--include-empty', action='store_true',
+                            help='Also render users without analyses in the period')
+        parser.add_argument('--max-rows', type=int, help='Entries per report (default: MOOD_REPORT MAX_ROWS)')
+        parser.add_argument('--chunk-size', type=int, help='Analyses read per query')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Worker processes')
+
+    def handle(self, *args, **options):
+        if options['month'] and (options['start'] or options['end']):
+            raise CommandError("Use either --month or --start/--end")
+        if options['month']:
+            start, end = _month(options['month'])
+        else:
+            start = _date(options['start']) if options['start'] else None
+            end = _date(options['end']) if options['end'] else None
+
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username__in=options['user'])
+            missing = sorted(set(options['user']) - set(users.values_list('username', flat=True)))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(missing)}")
+        if options['group']:
+            users = users.filter(groups__name__in=options['group']).distinct()
+        if not options['include_empty']:
+            rollups = MoodDailyRollup.objects.all()
+            if start is not None:
+                rollups = rollups.filter(day__gte=start)
+            if end is not None:
+                rollups = rollups.filter(day__lte=end)
+            users = users.filter(id__in=rollups.values('user_id'))
+        user_ids = list(users.values_list('id', flat=True))
+
+        def log(record):
+            if record['status'] == 'failed':
+                self.stderr.write(f"{record['username'] or record['user_id']}: {record['error']}")
+            elif options['verbosity'] >= 2:
+                self.stdout.write(f"{record['file']}: {record['pages']} page(s) in {record['seconds']:.2f}s")
+
+        started = time.perf_counter()
+        try:
+            results = generate_reports(
+                user_ids, options['output_dir'], report_params(start, end, options['max_rows']),
+                processes=options['processes'], chunk_size=options['chunk_size'], log=log,
+            )
+        except ManifestMismatch as e:
+            raise CommandError(f"{e}; use another output directory")
+        except BrokenProcessPool:
+            raise CommandError("A worker process died; rerun the same command to resume")
+        seconds = time.perf_counter() - started
+
+        done = [record for record in results if record['status'] == 'done']
+        pages = sum(record['pages'] for record in done)
+        skipped = len(user_ids) - len(results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {len(done)} report(s), {pages} page(s) in {seconds:.1f}s "
+            f"({len(done) / seconds if seconds else 0:.2f} reports/s, {pages / seconds if seconds else 0:.1f} pages/s); "
+            f"{skipped} already done, {len(results) - len(done)} failed"
+        ))
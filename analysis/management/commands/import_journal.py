@@ -0,0 +1,80 @@
+# analysis/management/commands/import_journal.py
+import csv
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.ingest import FORMATS, import_entries, read_entries
+from analysis.services import MoodAnalyzer
+
+SUFFIXES = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+# Skipped entries noted one by one on stderr; the rest are only counted
+MAX_NOTES = 20
+
+
+class Command(BaseCommand):
+    help = ("Import journal entries for a user from CSV (text, created_at columns) or NDJSON files, "
+            "streaming, analyzed and stored in batches")
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('paths', nargs='+', metavar='PATH', help="Files to import ('-' reads stdin)")
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the file suffix)')
+        parser.add_argument('--batch-size', type=int, help='Entries per batch (default: MOOD_IMPORT BATCH_SIZE)')
+        parser.add_argument('--engine', choices=list(MoodAnalyzer.ENGINES),
+                            help="Analyzer engine (default: MOOD_ANALYZER['ENGINE'])")
+        parser.add_argument('--strict', action='store_true',
+                            help='Stop at the first invalid entry instead of skipping it')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user '{options['username']}'")
+
+        formats = []
+        for path in options['paths']:
+            fmt = options['format'] or next(
+                (fmt for suffix, fmt in SUFFIXES.items() if path.lower().endswith(suffix)), None)
+            if fmt is None:
+                raise CommandError(f"Cannot tell the format of {path}; pass --format")
+            formats.append(fmt)
+
+        notes = 0
+
+        def log(message):
+            nonlocal notes
+            notes += 1
+            if notes <= MAX_NOTES:
+                self.stderr.write(message)
+
+        imported = skipped = 0
+        seconds = 0.0
+        for path, fmt in zip(options['paths'], formats):
+            try:
+                handle = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(f"Could not read {path}: {e}")
+            try:
+                stats = import_entries(user, read_entries(handle, fmt), batch_size=options['batch_size'],
+                                       engine=options['engine'], skip_invalid=not options['strict'], log=log)
+            except (ValueError, csv.Error) as e:
+                raise CommandError(f"{path}: {e}")
+            finally:
+                if handle is not sys.stdin:
+                    handle.close()
+            imported += stats['imported']
+            skipped += stats['skipped']
+            seconds += stats['seconds']
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{path}: {stats['imported']} entries ({stats['rows_per_second']:.0f} rows/s)")
+
+        if notes > MAX_NOTES:
+            self.stderr.write(f"... and {notes - MAX_NOTES} more skipped")
+        rate = imported / seconds if seconds else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} entries for {user.username} in {seconds:.1f}s ({rate:.0f} rows/s)"
+            + (f"; skipped {skipped} invalid" if skipped else '')
+        ))
@@ -0,0 +1,29 @@
+# analysis/management/commands/run_report_worker.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from analysis.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Render queued report jobs (run several for more throughput; they share the queue)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1, help='Jobs rendered at once by this worker')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, help="Seconds between polls of an empty queue")
+
+    def handle(self, *args, **options):
+        def log(job, status):
+            status = status or 'claimed again by another worker, result dropped'
+            self.stdout.write(f"Job #{job.id} ({job.user.username}, {job.report_type}): {status}")
+
+        started = time.perf_counter()
+        try:
+            processed = run_worker(options['threads'], options['once'], options['poll_interval'], log)
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {processed} job(s) in {time.perf_counter() - started:.1f}s"
+        ))
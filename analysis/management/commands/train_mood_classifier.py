@@ -0,0 +1,74 @@
+# analysis/management/commands/train_mood_classifier.py
+import csv
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.classifier import DEFAULT_BITS, MoodClassifier, classifier_path
+from analysis.models import MoodAnalysis
+
+MOODS = [mood for mood, _label in MoodAnalysis.MOOD_CHOICES]
+
+
+def read_examples(path):
+    """(text, mood) pairs from a CSV with text,mood columns or JSON lines with text and mood keys"""
+    with open(path, encoding='utf-8', newline='') as handle:
+        if str(path).endswith(('.jsonl', '.ndjson')):
+            rows = (json.loads(line) for line in handle if line.strip())
+        else:
+            rows = csv.DictReader(handle)
+        return [(row['text'], row['mood'].strip().lower()) for row in rows]
+
+
+class Command(BaseCommand):
+    help = "Train the offline mood classifier and write its memory-mapped weights"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', action='append', default=[], metavar='PATH',
+                            help='Labelled examples: CSV (text,mood) or JSON lines (repeatable)')
+        parser.add_argument('--from-db', action='store_true',
+                            help='Also learn from stored analyses, labelled with their detected mood')
+        parser.add_argument('--output', help="Weights file (default: settings.MOOD_CLASSIFIER['PATH'])")
+        parser.add_argument('--bits', type=int, default=DEFAULT_BITS, help='log2 of the hashed feature count')
+        parser.add_argument('--epochs', type=int, default=10)
+        parser.add_argument('--holdout', type=float, default=0.1, help='Share of examples kept for accuracy')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        examples = []
+        for path in options['data']:
+            try:
+                examples.extend(read_examples(path))
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read {path}: {e}")
+        if options['from_db']:
+            examples.extend(MoodAnalysis.objects.exclude(text='').values_list('text', 'detected_mood').iterator())
+
+        unknown = sum(1 for _text, mood in examples if mood not in MOODS)
+        examples = [(text, mood) for text, mood in examples if mood in MOODS]
+        if unknown:
+            self.stderr.write(f"Skipped {unknown} example(s) with a mood outside {', '.join(MOODS)}")
+        if not examples:
+            raise CommandError("No training examples; pass --data and/or --from-db")
+
+        random.Random(options['seed']).shuffle(examples)
+        held = int(len(examples) * options['holdout'])
+        train, holdout = examples[held:], examples[:held]
+
+        started = time.perf_counter()
+        classifier = MoodClassifier.train(
+            [text for text, _mood in train], [mood for _text, mood in train], MOODS,
+            bits=options['bits'], epochs=options['epochs'], seed=options['seed'],
+        )
+        seconds = time.perf_counter() - started
+        accuracy = classifier.accuracy([text for text, _mood in holdout], [mood for _text, mood in holdout])
+
+        path = options['output'] or classifier_path()
+        classifier.save(path, examples=len(train), holdout_accuracy=accuracy)
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained on {len(train)} example(s) in {seconds:.1f}s"
+            + (f", holdout accuracy {accuracy:.1%} on {held}" if accuracy is not None else '')
+            + f"; wrote {path}"
+        ))
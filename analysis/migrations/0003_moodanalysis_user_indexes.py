@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 05:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0002_alter_moodanalysis_confidence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moodanalysis',
+            index=models.Index(fields=['user', 'created_at'], name='mood_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moodanalysis',
+            index=models.Index(fields=['user', 'detected_mood', 'created_at'], name='mood_user_mood_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-18 05:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0003_moodanalysis_user_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('mood', models.CharField(choices=[('happy', '😊 Happy'), ('sad', '😢 Sad'), ('angry', '😠 Angry'), ('fear', '😨 Fear'), ('neutral', '😐 Neutral'), ('surprise', '😲 Surprise')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0.0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mood_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'mood', 'day'], name='rollup_user_mood_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'mood'), name='rollup_user_day_mood_uniq')],
+            },
+        ),
+    ]
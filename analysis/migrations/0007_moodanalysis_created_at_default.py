@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 06:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0006_reportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='moodanalysis',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,5 +1,6 @@
 # analysis/models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class MoodAnalysis(models.Model):
@@ -17,11 +18,92 @@ class MoodAnalysis(models.Model):
     detected_mood = models.CharField(max_length=20, choices=MOOD_CHOICES)
     confidence = models.FloatField(default=0.0)
     emotions = models.JSONField(default=dict)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Defaulted rather than auto_now_add so imports keep the original times (ingest.py)
+    created_at = models.DateTimeField(default=timezone.now)
     
     def __str__(self):
         return f"{self.user.username} - {self.detected_mood} ({self.confidence:.0%})"
     
     class Meta:
         verbose_name_plural = "Mood Analyses"
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Per-user history, newest first (dashboard, PDF export, date ranges)
+            models.Index(fields=['user', 'created_at'], name='mood_user_created_idx'),
+            # Per-user GROUP BY detected_mood (analytics, PDF summaries)
+            models.Index(fields=['user', 'detected_mood', 'created_at'], name='mood_user_mood_created_idx'),
+        ]
+
+class MoodDailyRollup(models.Model):
+    """Per-user, per-local-day mood totals kept in step with MoodAnalysis (see rollups.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mood_rollups')
+    # Calendar day in the user's timezone
+    day = models.DateField()
+    mood = models.CharField(max_length=20, choices=MoodAnalysis.MOOD_CHOICES)
+    count = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)
+
+    def __str__(self):
+        return f"{self.user.username} {self.day} {self.mood}: {self.count}"
+
+    class Meta:
+        constraints = [
+            # One row per bucket; also serves per-user day ranges (trends)
+            models.UniqueConstraint(fields=['user', 'day', 'mood'], name='rollup_user_day_mood_uniq'),
+        ]
+        indexes = [
+            # Per-user GROUP BY mood (pie chart, report summaries)
+            models.Index(fields=['user', 'mood', 'day'], name='rollup_user_mood_day_idx'),
+        ]
+
+
+class MoodDataVersion(models.Model):
+    """Per-user counter bumped whenever the user's mood data changes (see rollups.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='mood_data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user.username} v{self.version}"
+
+
+class ReportJob(models.Model):
+    """A queued report render (see jobs.py); finished artifacts live on disk"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    REPORT_TYPES = [
+        ('pdf', 'PDF mood report'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPES, default='pdf')
+    params = models.JSONField(default=dict)
+    # The artifact is keyed by (user, report_type, params, data_version)
+    cache_key = models.CharField(max_length=64)
+    data_version = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    artifact = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} {self.report_type} #{self.id} ({self.status})"
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+            # Reuse of an identical job (double clicks, unchanged data)
+            models.Index(fields=['user', 'cache_key'], name='reportjob_user_key_idx'),
+        ]
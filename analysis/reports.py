@@ -0,0 +1,237 @@
+# analysis/reports.py
+"""
+Streaming PDF mood reports.
+
+The story is fed to reportlab from a generator, so flowables exist only
+for the entries about to be laid out, and analyses are read from the
+database in chunks. reportlab still keeps each finished page until the
+document is saved, so a report's size (and memory) is bounded by a row
+cap and an optional date range instead of by the whole history.
+
+Styles and table styles come from one ReportTemplate per process
+(report_template()).
+
+    with open('report.pdf', 'wb') as output:
+        write_mood_report(user, output, start=date(2026, 1, 1), max_rows=500)
+"""
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from accounts.services import get_user_timezone
+
+from .models import MoodAnalysis, MoodDailyRollup
+
+DEFAULTS = {
+    'MAX_ROWS': 2000,
+    'CHUNK_SIZE': 500,
+    'SPOOL_MAX_SIZE': 4 * 1024 * 1024,
+}
+
+
+def report_setting(name):
+    return getattr(settings, 'MOOD_REPORT', {}).get(name, DEFAULTS[name])
+
+
+class StreamedStory(list):
+    """Flowable list that pulls from an iterable as the document consumes it"""
+
+    def __init__(self, flowables, lookahead=32):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+        self._fill()
+
+    def _fill(self):
+        while self._source is not None and super().__len__() < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return super().__len__()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._fill()
+
+
+def report_window(user, start=None, end=None):
+    """(analyses, rollups) of user between the local dates start and end, inclusive"""
+    analyses = MoodAnalysis.objects.filter(user=user)
+    rollups = MoodDailyRollup.objects.filter(user=user)
+    tz = get_user_timezone(user.id)
+    if start is not None:
+        analyses = analyses.filter(created_at__gte=datetime.combine(start, time(), tzinfo=tz))
+        rollups = rollups.filter(day__gte=start)
+    if end is not None:
+        analyses = analyses.filter(created_at__lt=datetime.combine(end + timedelta(days=1), time(), tzinfo=tz))
+        rollups = rollups.filter(day__lte=end)
+    return analyses, rollups
+
+
+class ReportTemplate:
+    """Styles and table templates of the mood report; build once with report_template()"""
+
+    EMOTION_HEADER = ['Emotion', 'Percentage']
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.styles = styles
+
+        # Custom styles
+        self.title = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1,  # Center alignment
+        )
+        self.subtitle = ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=16,
+            spaceAfter=20,
+        )
+        self.normal = styles['Normal']
+
+        self.summary_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+        self.emotion_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+    def summary_table(self, data):
+        return Table(data, style=self.summary_style)
+
+    def emotion_table(self, emotions):
+        """Emotion breakdown of one analysis"""
+        data = [self.EMOTION_HEADER] + [[str(emotion).capitalize(), emotion_percentage(score)]
+                                        for emotion, score in emotions.items()]
+        return Table(data, style=self.emotion_style)
+
+
+def emotion_percentage(score):
+    """'42.0%' for a score from 0 to 1; text (older analyses stored '42.0%') as it is"""
+    if isinstance(score, (int, float)) and not isinstance(score, bool):
+        return f"{score:.1%}"
+    return str(score)
+
+
+@lru_cache(maxsize=None)
+def report_template():
+    """The process-wide ReportTemplate (styles are read-only once built)"""
+    return ReportTemplate()
+
+
+def report_story(user, start=None, end=None, max_rows=None, chunk_size=None):
+    """Flowables of user's mood report, generated as they are needed"""
+    max_rows = report_setting('MAX_ROWS') if max_rows is None else max_rows
+    chunk_size = chunk_size or report_setting('CHUNK_SIZE')
+    analyses, rollups = report_window(user, start, end)
+    template = report_template()
+    styles = template.styles
+    subtitle_style = template.subtitle
+    normal_style = template.normal
+
+    # Title
+    yield Paragraph("MindTrack - Mood Analysis Report", template.title)
+    yield Spacer(1, 12)
+
+    # Summary statistics from the daily rollups
+    mood_counts = list(rollups.values('mood').annotate(count=Sum('count')).order_by('-count'))
+    total = sum(mood_count['count'] for mood_count in mood_counts)
+
+    # User info
+    yield Paragraph(f"User: {escape(user.username)}", subtitle_style)
+    yield Paragraph(f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", normal_style)
+    if start is not None or end is not None:
+        yield Paragraph(f"Period: {start or 'first entry'} to {end or 'today'}", normal_style)
+    yield Paragraph(f"Total Analyses: {total}", normal_style)
+    yield Spacer(1, 20)
+
+    if not total:
+        yield Paragraph("No mood analyses found for this user.", normal_style)
+        return
+
+    yield Paragraph("Mood Distribution Summary:", subtitle_style)
+
+    summary_data = [['Mood', 'Count', 'Percentage']]
+    for mood_count in mood_counts:
+        mood = mood_count['mood'].capitalize()
+        count = mood_count['count']
+        percentage = f"{(count/total*100):.1f}%"
+        summary_data.append([mood, str(count), percentage])
+
+    yield template.summary_table(summary_data)
+    yield Spacer(1, 20)
+
+    # Individual analyses, newest first
+    yield Paragraph("Detailed Analysis History:", subtitle_style)
+    if total > max_rows:
+        yield Paragraph(f"Showing the latest {max_rows} of {total} analyses.", normal_style)
+    yield Spacer(1, 12)
+
+    tz = get_user_timezone(user.id)
+    for analysis in analyses.order_by('-created_at')[:max_rows].iterator(chunk_size=chunk_size):
+        created_at = timezone.localtime(analysis.created_at, tz)
+        # Analysis header
+        yield Paragraph(f"Analysis #{analysis.id} - {created_at.strftime('%Y-%m-%d %H:%M')}", styles['Heading3'])
+
+        # Mood and confidence
+        yield Paragraph(f"Mood: {analysis.get_detected_mood_display()}", normal_style)
+        yield Paragraph(f"Confidence: {analysis.confidence:.1%}", normal_style)
+
+        # Text (truncated if too long)
+        text = analysis.text
+        if len(text) > 200:
+            text = text[:200] + "..."
+        yield Paragraph(f"Text: {escape(text)}", normal_style)
+
+        # Emotions
+        if analysis.emotions:
+            yield Paragraph("Emotion Breakdown:", styles['Heading4'])
+            yield template.emotion_table(analysis.emotions)
+
+        yield Spacer(1, 20)
+
+
+def write_mood_report(user, output, start=None, end=None, max_rows=None, chunk_size=None):
+    """Render user's mood report as PDF into the binary file object output; its page count"""
+    doc = SimpleDocTemplate(output, pagesize=letter)
+    doc.build(StreamedStory(report_story(user, start, end, max_rows, chunk_size)))
+    return doc.page
+
+
+def spooled_mood_report(user, start=None, end=None, max_rows=None):
+    """The report in a spooled temp file (on disk past SPOOL_MAX_SIZE), rewound"""
+    output = SpooledTemporaryFile(max_size=report_setting('SPOOL_MAX_SIZE'))
+    try:
+        write_mood_report(user, output, start, end, max_rows)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
@@ -0,0 +1,136 @@
+# analysis/result_cache.py
+"""
+Two-tier cache of mood analysis results, keyed by text and analyzer.
+
+A result is stored under sha256(engine, engine version, normalised text):
+the text with Unicode compatibility forms folded (NFKC) and runs of
+whitespace collapsed, so a re-submitted entry hits even if its spacing
+changed. The engine version (lexicon fingerprint, trained weights, model
+URL) is part of the key, so retraining or switching models never serves
+stale results.
+
+    local   bounded in-process LRU (MAX_ENTRIES per worker)
+    shared  a Django cache alias (CACHE_ALIAS; shared between workers when
+            it is Redis/Memcached), entries expire after TIMEOUT seconds
+
+Hits in the shared tier are copied into the local one. Hit and miss
+counters are per process (stats()). Configure with settings.ANALYSIS_CACHE;
+set CACHE_ALIAS to None for the local tier only.
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 30 * 24 * 60 * 60,
+    'KEY_PREFIX': 'analysis:result',
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def cache_setting(name):
+    return getattr(settings, 'ANALYSIS_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+def copy_result(result):
+    """A result the caller may modify without touching the cached one"""
+    return {**result, 'emotions': dict(result['emotions'])}
+
+
+class AnalysisCache:
+    """Local LRU in front of a shared Django cache, with hit/miss counters"""
+
+    def __init__(self, max_entries=None, cache_alias=DEFAULTS['CACHE_ALIAS'], timeout=None, key_prefix=None):
+        self.max_entries = cache_setting('MAX_ENTRIES') if max_entries is None else max_entries
+        self.shared = caches[cache_alias] if cache_alias else None
+        self.timeout = cache_setting('TIMEOUT') if timeout is None else timeout
+        self.key_prefix = key_prefix or cache_setting('KEY_PREFIX')
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = self.shared_hits = self.misses = 0
+
+    def key(self, engine, version, text):
+        digest = hashlib.sha256(f"{engine}\0{version}\0{normalize_text(text)}".encode()).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def get_many(self, keys):
+        """{key: result} for the keys found in either tier"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = result
+        missing = [key for key in keys if key not in found]
+        shared = self.shared.get_many(missing) if self.shared is not None and missing else {}
+        if shared:
+            self._remember(shared)
+
+        with self._lock:
+            self.local_hits += len(found)
+            self.shared_hits += len(shared)
+            self.misses += len(missing) - len(shared)
+        found.update(shared)
+        return found
+
+    def set_many(self, results):
+        self._remember(results)
+        if self.shared is not None and results:
+            self.shared.set_many(results, self.timeout)
+
+    def _remember(self, results):
+        with self._lock:
+            for key, result in results.items():
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': (self.local_hits + self.shared_hits) / lookups if lookups else None,
+            }
+
+    def clear_local(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """The process-wide analysis cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(cache_alias=cache_setting('CACHE_ALIAS'))
+    return _cache
+
+
+def reset_analysis_cache():
+    """Drop the process-wide cache (and its counters); the next use builds a new one"""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -0,0 +1,140 @@
+# analysis/rollups.py
+"""
+Daily mood rollups: one MoodDailyRollup row per (user, local day, mood)
+holding the number of analyses and their summed confidence.
+
+signals.py applies every MoodAnalysis save and delete as a delta, so
+analytics read O(days) rows instead of every analysis, and bumps the
+user's MoodDataVersion so cached analytics (trends.py) go stale. Writes that skip
+model signals (bulk_create, bulk_update, queryset.update) are not
+tracked; run `python manage.py backfill_mood_rollups` after them, or
+apply their deltas with add_deltas() as ingest.py does.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from accounts.services import get_user_timezone, get_zone
+
+from .models import MoodAnalysis, MoodDailyRollup, MoodDataVersion
+
+
+def local_day(user_id, moment):
+    """The calendar day of moment in the user's timezone (naive moments are read in it)"""
+    zone = get_user_timezone(user_id)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, zone)
+    return timezone.localtime(moment, zone).date()
+
+
+def apply_delta(user_id, day, mood, count, confidence):
+    """Add count analyses with confidence summed to one bucket (negative to remove)"""
+    bucket = MoodDailyRollup.objects.filter(user_id=user_id, day=day, mood=mood)
+    changes = {'count': F('count') + count, 'confidence_sum': F('confidence_sum') + confidence}
+    with transaction.atomic():
+        if count < 0:
+            bucket.update(**changes)
+            bucket.filter(count__lte=0).delete()
+        elif not bucket.update(**changes):
+            try:
+                with transaction.atomic():
+                    MoodDailyRollup.objects.create(user_id=user_id, day=day, mood=mood,
+                                                   count=count, confidence_sum=confidence)
+            except IntegrityError:
+                # Another writer created the bucket first
+                bucket.update(**changes)
+
+
+def add_deltas(user_id, deltas):
+    """
+    Add {(day, mood): (count, confidence)} to user_id's buckets (counts
+    positive) in a handful of queries, however many buckets there are
+    """
+    with transaction.atomic():
+        existing = {
+            (rollup.day, rollup.mood): rollup
+            for rollup in MoodDailyRollup.objects.select_for_update().filter(
+                user_id=user_id, day__in={day for day, _mood in deltas})
+        }
+        changed, created = [], []
+        for (day, mood), (count, confidence) in deltas.items():
+            rollup = existing.get((day, mood))
+            if rollup is None:
+                created.append(MoodDailyRollup(user_id=user_id, day=day, mood=mood,
+                                               count=count, confidence_sum=confidence))
+            else:
+                rollup.count += count
+                rollup.confidence_sum += confidence
+                changed.append(rollup)
+        MoodDailyRollup.objects.bulk_update(changed, ['count', 'confidence_sum'])
+        try:
+            with transaction.atomic():
+                MoodDailyRollup.objects.bulk_create(created)
+        except IntegrityError:
+            # Another writer created one of these buckets first
+            for rollup in created:
+                apply_delta(user_id, rollup.day, rollup.mood, rollup.count, rollup.confidence_sum)
+
+
+def add_analysis(analysis, sign=1):
+    """Count analysis into its bucket (sign=-1 takes it back out)"""
+    apply_delta(analysis.user_id, local_day(analysis.user_id, analysis.created_at),
+                analysis.detected_mood, sign, sign * analysis.confidence)
+
+
+def bump_versions(user_ids):
+    """Mark the mood data of user_ids as changed"""
+    user_ids = set(user_ids)
+    now = timezone.now()
+    with transaction.atomic():
+        bumped = MoodDataVersion.objects.filter(user_id__in=user_ids).update(version=F('version') + 1,
+                                                                              updated_at=now)
+        if bumped == len(user_ids):
+            return
+        # First change for some of these users; the insert skips the rows just
+        # bumped, and a concurrent bump may win it, which already marks the
+        # data as changed
+        MoodDataVersion.objects.bulk_create(
+            [MoodDataVersion(user_id=user_id, version=1, updated_at=now) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_rollups(user_ids=None, batch_size=1000):
+    """Recompute rollups from MoodAnalysis for user_ids (all users by default)"""
+    analyses = MoodAnalysis.objects.order_by()
+    rollups = MoodDailyRollup.objects.all()
+    profiles = UserProfile.objects.exclude(timezone=settings.TIME_ZONE)
+    if user_ids is not None:
+        analyses = analyses.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+        profiles = profiles.filter(user_id__in=user_ids)
+
+    # Day boundaries depend on the timezone: aggregate each zone separately
+    zones = defaultdict(list)
+    for user_id, name in profiles.values_list('user_id', 'timezone'):
+        zones[name].append(user_id)
+    groups = [(name, analyses.filter(user_id__in=ids)) for name, ids in zones.items()]
+    groups.append((settings.TIME_ZONE, analyses.exclude(user_id__in=[i for ids in zones.values() for i in ids])))
+
+    created = 0
+    with transaction.atomic():
+        changed = set(rollups.values_list('user_id', flat=True).distinct())
+        changed.update(analyses.values_list('user_id', flat=True).distinct())
+        rollups.delete()
+        for name, group in groups:
+            rows = group.annotate(
+                day=TruncDate('created_at', tzinfo=get_zone(name))
+            ).values('user_id', 'day', 'detected_mood').annotate(count=Count('id'), confidence_sum=Sum('confidence'))
+            created += len(MoodDailyRollup.objects.bulk_create((
+                MoodDailyRollup(user_id=row['user_id'], day=row['day'], mood=row['detected_mood'],
+                                count=row['count'], confidence_sum=row['confidence_sum'])
+                for row in rows.iterator()
+            ), batch_size=batch_size))
+        bump_versions(changed)
+    return created
@@ -1,13 +1,37 @@
 # analysis/services.py
-import requests
+import hashlib
 import json
+import time
+from functools import lru_cache
+
 from django.conf import settings
 
+from utils import lexicon
+from utils.lexicon import ANALYSIS_LEXICON
+
+from .breaker import CircuitOpen, remote_breaker
+from .classifier import ClassifierUnavailable, get_classifier
+from .inference import DEFAULTS as INFERENCE_DEFAULTS, InferenceError, inference_client, inference_setting
+from .result_cache import copy_result, get_analysis_cache
+
+
+def analyzer_setting(name, default=None):
+    return getattr(settings, 'MOOD_ANALYZER', {}).get(name, default)
+
+
+@lru_cache(maxsize=None)
+def lexicon_version():
+    """Fingerprint of the keyword lexicon behind analyze_text_simulated"""
+    data = [lexicon.ANALYSIS_MOODS, lexicon.INTENSIFIERS, lexicon.NEGATORS, lexicon.NEGATION_WINDOW]
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+
 class MoodAnalyzer:
     """Analyze mood using Hugging Face DistilBERT API"""
     
     # Free model from Hugging Face
-    API_URL = "https://api-inference.huggingface.co/models/j-hartmann/emotion-english-distilroberta-base"
+    # (settings.HF_INFERENCE['API_URL'] overrides it; see inference.py)
+    API_URL = INFERENCE_DEFAULTS['API_URL']
     
     # For demo/testing (no API key needed)
     EMOTION_MAP = {
@@ -20,42 +44,156 @@ class MoodAnalyzer:
         'surprise': 'surprise'
     }
     
+    # engine -> batch method; see analyze_batch
+    ENGINES = {
+        'simulated': 'analyze_many',
+        'local': 'analyze_many_local',
+        'api': 'analyze_many_guarded',
+        'cascade': 'analyze_many_cascade',
+    }
+    # Engines whose results are worth a cache lookup: scoring with the
+    # lexicon costs less than normalising and hashing the text for a key
+    CACHED_ENGINES = ('local', 'api')
+    
+    @staticmethod
+    def analyze(text, engine=None):
+        """Analyze one text with the configured engine, through the result cache"""
+        return MoodAnalyzer.analyze_batch([text], engine)[0]
+    
+    @staticmethod
+    def analyze_batch(texts, engine=None, cached=True):
+        """
+        Analyze texts with engine (default: settings.MOOD_ANALYZER['ENGINE']).
+        For the CACHED_ENGINES, texts already in the analysis cache skip the
+        engine entirely; the rest go to it in one batch, repeats once. When
+        the API engine is unavailable they get lexicon results, which are not
+        cached as its own and say so in their 'stage'. cached=False leaves the
+        cache alone (bulk imports, whose texts rarely come back).
+        """
+        engine = engine or analyzer_setting('ENGINE', 'simulated')
+        if engine not in MoodAnalyzer.ENGINES:
+            raise ValueError(f"Unknown mood analyzer engine '{engine}'")
+        if engine == 'cascade':
+            # Not cached as a whole: its lexicon stage costs less than a
+            # lookup, and escalated texts are cached under their own engine
+            return MoodAnalyzer.analyze_many_cascade(texts, cached)
+        cached = cached and engine in MoodAnalyzer.CACHED_ENGINES
+        if cached:
+            cache = get_analysis_cache()
+            version = MoodAnalyzer.engine_version(engine)
+            keys = [cache.key(engine, version, text) for text in texts]
+            results = cache.get_many(list(dict.fromkeys(keys)))
+        else:
+            keys, results = list(texts), {}
+        
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in results:
+                missing.setdefault(key, text)
+        if missing:
+            pending = list(missing.values())
+            computed = getattr(MoodAnalyzer, MoodAnalyzer.ENGINES[engine])(pending)
+            if computed is None:
+                fallback = MoodAnalyzer.analyze_batch(pending, 'simulated', cached)
+                computed = {key: {**result, 'stage': 'simulated'} for key, result in zip(missing, fallback)}
+            else:
+                computed = dict(zip(missing, computed))
+                if cached:
+                    cache.set_many(computed)
+            results.update(computed)
+        return [copy_result(results[key]) for key in keys]
+    
+    @staticmethod
+    def engine_version(engine):
+        """What an engine's results depend on besides the text (part of cache keys)"""
+        if engine == 'local':
+            return get_classifier().version
+        if engine == 'api':
+            return inference_setting('API_URL')
+        return lexicon_version()
+    
     @staticmethod
     def analyze_text_simulated(text):
         """
         Simulated mood analysis for development
         Returns consistent results based on keywords
         """
-        text_lower = text.lower()
-        
-        # Keyword-based detection (simple fallback)
-        mood_keywords = {
-            'happy': ['happy', 'joy', 'good', 'great', 'wonderful', 'excited', 'love', 'amazing'],
-            'sad': ['sad', 'unhappy', 'depressed', 'cry', 'tears', 'lonely', 'miserable'],
-            'angry': ['angry', 'mad', 'hate', 'annoyed', 'furious', 'rage', 'angry'],
-            'fear': ['fear', 'scared', 'afraid', 'anxious', 'worried', 'nervous', 'panic'],
-            'neutral': ['okay', 'fine', 'normal', 'alright', 'meh', 'whatever'],
-            'surprise': ['surprise', 'wow', 'shocked', 'unexpected', 'amazing']
-        }
-        
-        # Count keyword matches
-        scores = {mood: 0 for mood in mood_keywords}
+        # One pass of the shared lexicon (intensifiers and negation included)
+        scores = ANALYSIS_LEXICON.as_dict(ANALYSIS_LEXICON.score(text))
+        return MoodAnalyzer._result_from_scores(scores)
+    
+    @staticmethod
+    def analyze_many(texts):
+        """
+        Batch version of analyze_text_simulated (re-scoring, imports, load tests).
+        Returns one result per text, identical to calling it text by text.
+        """
+        # Repeated texts (common in chat logs) are scored once
+        unique = list(dict.fromkeys(texts))
+        matrix = ANALYSIS_LEXICON.score_many(unique)
+        moods = ANALYSIS_LEXICON.moods
         
-        for mood, keywords in mood_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    scores[mood] += 1
+        # Rows with the same scores share one computed result
+        computed = {}
+        by_text = {}
+        for text, row in zip(unique, zip(*[iter(matrix)] * len(moods))):
+            result = computed.get(row)
+            if result is None:
+                result = computed[row] = MoodAnalyzer._result_from_scores(dict(zip(moods, row)))
+            by_text[text] = result
         
-        # Add intensity
-        intensity_words = ['very', 'really', 'extremely', 'so', 'super']
-        words = text_lower.split()
-        for i, word in enumerate(words):
-            if word in intensity_words and i + 1 < len(words):
-                next_word = words[i + 1]
-                for mood, keywords in mood_keywords.items():
-                    if next_word in keywords:
-                        scores[mood] += 2
+        results = []
+        for result in map(by_text.__getitem__, texts):
+            results.append({
+                'detected_mood': result['detected_mood'],
+                'confidence': result['confidence'],
+                'emotions': dict(result['emotions']),
+            })
+        return results
+    
+    @staticmethod
+    def analyze_many_cascade(texts, cached=True):
+        """
+        Lexicon first, the heavier engine only where the lexicon is unsure.
+        A text keeps its lexicon result when its top mood leads the runner-up
+        by at least MOOD_ANALYZER['CASCADE']['MIN_MARGIN'] of all its keyword
+        scores; the rest (texts without any keyword included) go to
+        CASCADE['ENGINE'] ('local' or 'api') in one batch. Each result says
+        which engine produced it in 'stage'.
+        """
+        config = analyzer_setting('CASCADE', {})
+        min_margin = config.get('MIN_MARGIN', 0.3)
+        heavy = config.get('ENGINE', 'local')
+        if heavy not in ('local', 'api'):
+            raise ValueError(f"Cascade engine must be 'local' or 'api', not '{heavy}'")
         
+        texts = list(texts)
+        moods = ANALYSIS_LEXICON.moods
+        matrix = ANALYSIS_LEXICON.score_many(texts)
+        results = [None] * len(texts)
+        escalated = []
+        for i, row in enumerate(zip(*[iter(matrix)] * len(moods))):
+            total = sum(row)
+            first, second = sorted(row, reverse=True)[:2]
+            if total and (first - second) / total >= min_margin:
+                results[i] = {**MoodAnalyzer._result_from_scores(dict(zip(moods, row))), 'stage': 'simulated'}
+            else:
+                escalated.append(i)
+        if escalated:
+            pending = [texts[i] for i in escalated]
+            try:
+                heavy_results = MoodAnalyzer.analyze_batch(pending, heavy, cached)
+            except ClassifierUnavailable:
+                # No trained model yet: the lexicon answers everything
+                heavy_results = [{**result, 'stage': 'simulated'} for result in MoodAnalyzer.analyze_many(pending)]
+            for i, result in zip(escalated, heavy_results):
+                result.setdefault('stage', heavy)
+                results[i] = result
+        return results
+    
+    @staticmethod
+    def _result_from_scores(scores):
+        """Turn lexicon scores into detected mood, confidence and emotions"""
         # If no matches, default to neutral
         if all(score == 0 for score in scores.values()):
             return {
@@ -83,21 +221,85 @@ class MoodAnalyzer:
             'emotions': emotions
         }
     
+    @staticmethod
+    def analyze_text_local(text):
+        """
+        Offline analysis with the trained hashed n-gram classifier
+        Raises ClassifierUnavailable until one is trained (train_mood_classifier)
+        """
+        return MoodAnalyzer.analyze_many_local([text])[0]
+    
+    @staticmethod
+    def analyze_many_local(texts):
+        """Batch version of analyze_text_local: the whole batch is scored in one pass"""
+        classifier = get_classifier()
+        results = []
+        for row in classifier.predict_proba(list(texts)).tolist():
+            emotions = dict(zip(classifier.moods, row))
+            detected_mood = max(emotions, key=emotions.get)
+            results.append({
+                'detected_mood': detected_mood,
+                'confidence': round(emotions[detected_mood], 2),
+                'emotions': emotions
+            })
+        return results
+    
     @staticmethod
     def analyze_text_api(text, api_key=None):
         """
-        Real Hugging Face API call
-        Comment: We'll implement this later when we get API key
+        Real Hugging Face API call (DistilRoBERTa emotion model)
+        Raises InferenceError if the API cannot be reached after retries
+        """
+        return MoodAnalyzer.analyze_many_api([text], api_key)[0]
+    
+    @staticmethod
+    def analyze_many_api(texts, api_key=None, deadline=None):
         """
-        # For now, use simulated version
-        return MoodAnalyzer.analyze_text_simulated(text)
+        Batch version of analyze_text_api: texts go BATCH_SIZE per HTTP call
+        over the process-wide pooled client; repeated texts are sent once.
+        """
+        unique = list(dict.fromkeys(texts))
+        labels = dict(zip(unique, inference_client(api_key or None).classify(unique, deadline=deadline)))
+        return [MoodAnalyzer._result_from_labels(labels[text]) for text in texts]
+    
+    @staticmethod
+    def analyze_many_guarded(texts):
+        """
+        analyze_many_api behind the remote circuit breaker (breaker.py) and
+        within settings.MOOD_ANALYZER['DEADLINE'] seconds. Returns None when
+        the caller should fall back to the lexicon: breaker open, API error
+        or deadline passed.
+        """
+        deadline = time.monotonic() + analyzer_setting('DEADLINE', 2.0)
+        try:
+            return remote_breaker().call(MoodAnalyzer.analyze_many_api, texts, deadline=deadline)
+        except (CircuitOpen, InferenceError):
+            return None
+    
+    @staticmethod
+    def _result_from_labels(labels):
+        """Turn model label scores into detected mood, confidence and emotions"""
+        emotions = dict.fromkeys(ANALYSIS_LEXICON.moods, 0.0)
+        for label, score in labels.items():
+            mood = MoodAnalyzer.EMOTION_MAP.get(label)
+            if mood is not None:
+                emotions[mood] += score
+        total = sum(emotions.values())
+        if not total:
+            return MoodAnalyzer._result_from_scores(dict.fromkeys(emotions, 0))
+        emotions = {mood: score/total for mood, score in emotions.items()}
+        detected_mood = max(emotions, key=emotions.get)
+        
+        return {
+            'detected_mood': detected_mood,
+            'confidence': round(emotions[detected_mood], 2),
+            'emotions': emotions
+        }
 
 def analyze_mood(text, user):
     """Main function to analyze mood and save result"""
-    analyzer = MoodAnalyzer()
-    
-    # Use simulated analysis for now
-    result = analyzer.analyze_text_simulated(text)
+    # Configured engine (simulated by default); repeated texts come from the cache
+    result = MoodAnalyzer.analyze(text)
     
     # Save to database
     from .models import MoodAnalysis
@@ -0,0 +1,81 @@
+# analysis/signals.py
+"""Keep MoodDailyRollup and MoodDataVersion in step with MoodAnalysis (see rollups.py)"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from accounts.services import get_user_timezone
+
+from .models import MoodAnalysis
+from .rollups import add_analysis, bump_versions, rebuild_rollups
+
+
+def _deleting_user(origin):
+    # The user's rollups go with them; no need to decrement row by row
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+@receiver(pre_save, sender=MoodAnalysis)
+def remember_previous_bucket(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if not raw and instance.created_at and timezone.is_naive(instance.created_at):
+        # A naive time is the user's wall clock, as in ingest.parse_entry
+        instance.created_at = timezone.make_aware(instance.created_at, get_user_timezone(instance.user_id))
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._rollup_previous = MoodAnalysis.objects.filter(pk=instance.pk).only(
+            'user_id', 'created_at', 'detected_mood', 'confidence').first()
+
+
+@receiver(post_save, sender=MoodAnalysis)
+def count_saved_analysis(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changed = {instance.user_id}
+    previous = getattr(instance, '_rollup_previous', None)
+    # Rollups and versions change together or not at all
+    with transaction.atomic():
+        if previous is not None:
+            add_analysis(previous, -1)
+            changed.add(previous.user_id)
+        add_analysis(instance)
+        bump_versions(changed)
+
+
+@receiver(post_delete, sender=MoodAnalysis)
+def uncount_deleted_analysis(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        with transaction.atomic():
+            add_analysis(instance, -1)
+            bump_versions([instance.user_id])
+
+
+@receiver(pre_save, sender=UserProfile)
+def remember_previous_timezone(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The zone the user's days are bucketed in now (None: left as they are)
+    instance._rollup_timezone = None
+    if raw or (update_fields is not None and 'timezone' not in update_fields):
+        return
+    if instance._state.adding:
+        instance._rollup_timezone = settings.TIME_ZONE
+    else:
+        instance._rollup_timezone = UserProfile.objects.filter(pk=instance.pk).values_list(
+            'timezone', flat=True).first() or settings.TIME_ZONE
+
+
+@receiver(post_save, sender=UserProfile)
+def rebucket_saved_profile(sender, instance, raw=False, **kwargs):
+    # Day boundaries move only when the timezone does
+    previous = getattr(instance, '_rollup_timezone', None)
+    if not raw and previous is not None and previous != instance.timezone:
+        rebuild_rollups([instance.user_id])
+
+
+@receiver(post_delete, sender=UserProfile)
+def rebucket_deleted_profile(sender, instance, origin=None, **kwargs):
+    # Without a profile the user's days fall back to settings.TIME_ZONE
+    if not _deleting_user(origin) and instance.timezone != settings.TIME_ZONE:
+        rebuild_rollups([instance.user_id])
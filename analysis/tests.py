@@ -1,3 +1,1131 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from reportlab.platypus import Table
+
+from accounts.models import UserProfile
+from utils.exports import csv_chunks, ndjson_chunks
+from utils.lexicon import ANALYSIS_LEXICON, CHAT_LEXICON
+
+from .breaker import CircuitBreaker, remote_breaker, reset_remote_breaker
+from .classifier import ClassifierUnavailable, get_classifier, reset_classifier, text_features
+from .inference import InferenceClient, InferenceError, inference_client
+from .ingest import InvalidEntry, import_entries
+from .inference_stub import StubInferenceServer
+from .jobs import claim_next_job, run_job, run_worker
+from .models import MoodAnalysis, MoodDailyRollup, MoodDataVersion, ReportJob
+from .reports import report_story, report_template, write_mood_report
+from .rollups import bump_versions, rebuild_rollups
+from .result_cache import AnalysisCache, get_analysis_cache, reset_analysis_cache
+from .services import MoodAnalyzer, analyze_mood
+from .trends import MAX_POINTS, choose_bucket, mood_trends
+
+
+class LexiconTestCase(SimpleTestCase):
+    def scores(self, text):
+        return ANALYSIS_LEXICON.as_dict(ANALYSIS_LEXICON.score(text))
+
+    def test_dense_vector_in_mood_order(self):
+        scores = ANALYSIS_LEXICON.score("happy happy, a little sad")
+        self.assertEqual(len(scores), len(ANALYSIS_LEXICON.moods))
+        self.assertEqual(self.scores("happy happy, a little sad")['happy'], 2.0)
+        self.assertEqual(self.scores("happy happy, a little sad")['sad'], 1.0)
+
+    def test_word_boundaries_and_stems(self):
+        self.assertEqual(sum(ANALYSIS_LEXICON.score("a goodbye to the badger")), 0)
+        self.assertEqual(self.scores("so frustrating")['angry'], 2.0)
+
+    def test_intensifiers(self):
+        self.assertEqual(self.scores("very happy")['happy'], 2.0)
+        self.assertEqual(self.scores("so very happy")['happy'], 4.0)
+        # Only directly before the word
+        self.assertEqual(self.scores("so I was happy")['happy'], 1.0)
+
+    def test_negation(self):
+        scores = self.scores("I am not happy")
+        self.assertEqual((scores['happy'], scores['sad']), (0.0, 1.0))
+        self.assertEqual(self.scores("I don't feel very happy")['sad'], 2.0)
+        # Scope ends at the clause and after a few words
+        self.assertEqual(self.scores("not today. happy now")['happy'], 1.0)
+        self.assertEqual(self.scores("no plans for this weekend but happy")['happy'], 1.0)
+        self.assertEqual(self.scores("I'm not scared")['fear'], 0.0)
+
+    def test_dominant(self):
+        self.assertEqual(ANALYSIS_LEXICON.dominant(ANALYSIS_LEXICON.score("nothing here")), None)
+        # Ties go to the earlier mood
+        self.assertEqual(CHAT_LEXICON.dominant(CHAT_LEXICON.score("happy but tired")), 'tired')
+        self.assertEqual(CHAT_LEXICON.dominant(CHAT_LEXICON.score("so happy but tired")), 'happy')
+
+    def test_simulated_analysis_uses_lexicon(self):
+        result = MoodAnalyzer.analyze_text_simulated("I'm really worried and not okay")
+        self.assertEqual(result['detected_mood'], 'fear')
+        self.assertAlmostEqual(sum(result['emotions'].values()), 1.0)
+        self.assertEqual(MoodAnalyzer.analyze_text_simulated("a day")['detected_mood'], 'neutral')
+
+
+class BatchAnalysisTestCase(SimpleTestCase):
+    texts = [
+        "I'm so happy today!",
+        "not happy. happy again",
+        "",
+        "nothing to see",
+        "very very worried; not scared",
+        "I'm so happy today!",
+        "tabs\tand\nnewlines, frustrated",
+        "a stray \x00 separator, sad",
+    ] * 40
+
+    def test_score_many_matches_score(self):
+        matrix = ANALYSIS_LEXICON.score_many(self.texts)
+        width = len(ANALYSIS_LEXICON.moods)
+        for row, text in enumerate(self.texts):
+            self.assertEqual(list(matrix[row * width:(row + 1) * width]), ANALYSIS_LEXICON.score(text))
+
+    def test_analyze_many_matches_single_calls(self):
+        results = MoodAnalyzer.analyze_many(self.texts)
+        self.assertEqual(results, [MoodAnalyzer.analyze_text_simulated(text) for text in self.texts])
+        # Results are independent even when rows share a computed result
+        results[0]['emotions']['happy'] = -1
+        self.assertNotEqual(results[5]['emotions']['happy'], -1)
+        self.assertEqual(MoodAnalyzer.analyze_many([]), [])
+
+
+class InferenceClientTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubInferenceServer().start()
+        cls.addClassCleanup(cls.stub.stop)
+
+    def setUp(self):
+        self.stub.requests = self.stub.connections = 0
+        self.stub.failures.clear()
+        self.stub.latency = 0
+        settings = override_settings(HF_INFERENCE={'API_URL': self.stub.url, 'API_KEY': 'hf_test', 'RETRIES': 2,
+                                                   'BACKOFF': 0.01, 'BATCH_SIZE': 4, 'READ_TIMEOUT': 0.5})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        inference_client.cache_clear()
+        self.addCleanup(inference_client.cache_clear)
+
+    def test_batches_share_one_connection(self):
+        texts = ["I'm so happy today!", "very worried", "nothing much", "so furious"] * 3
+        results = MoodAnalyzer.analyze_many_api(texts + ["what a surprise"])
+        self.assertEqual([result['detected_mood'] for result in results[:4]], ['happy', 'fear', 'neutral', 'angry'])
+        self.assertEqual(results[-1]['detected_mood'], 'surprise')
+        self.assertAlmostEqual(sum(results[0]['emotions'].values()), 1.0)
+        # 5 distinct texts in batches of 4, over one keep-alive connection
+        self.assertEqual((self.stub.requests, self.stub.connections), (2, 1))
+        self.assertEqual(MoodAnalyzer.analyze_text_api("I'm so happy today!"), results[0])
+        self.assertEqual((self.stub.requests, self.stub.connections), (3, 1))
+        self.assertEqual(self.stub.authorizations[-1], 'Bearer hf_test')
+
+    def test_labels_map_through_emotion_map(self):
+        result = MoodAnalyzer._result_from_labels({'anger': 0.3, 'disgust': 0.3, 'joy': 0.4, 'unknown': 0.5})
+        self.assertEqual(result['detected_mood'], 'angry')
+        self.assertEqual(result['confidence'], 0.6)
+        self.assertEqual(MoodAnalyzer._result_from_labels({})['detected_mood'], 'neutral')
+
+    def test_transient_failures_are_retried(self):
+        self.stub.fail_next(2, status=503, retry_after=0)
+        self.assertEqual(MoodAnalyzer.analyze_text_api("happy")['detected_mood'], 'happy')
+        self.assertEqual(self.stub.requests, 3)
+
+        self.stub.fail_next(3, status=429)
+        with self.assertRaisesMessage(InferenceError, 'Gave up after 3 attempts: HTTP 429'):
+            MoodAnalyzer.analyze_text_api("happy")
+
+    def test_client_errors_and_timeouts(self):
+        self.stub.fail_next(1, status=400, payload={'error': 'bad input'})
+        with self.assertRaisesMessage(InferenceError, 'HTTP 400'):
+            MoodAnalyzer.analyze_text_api("happy")
+        self.assertEqual(self.stub.requests, 1)
+
+        self.stub.latency = 1.0
+        client = InferenceClient(url=self.stub.url, read_timeout=0.05, retries=1, backoff=0)
+        with self.assertRaisesMessage(InferenceError, 'ReadTimeout'):
+            client.classify(["happy"])
+
+
+class MoodClassifierTestCase(SimpleTestCase):
+    words = {
+        'happy': ['happy', 'great', 'wonderful', 'joyful', 'excited'],
+        'sad': ['sad', 'lonely', 'miserable', 'crying', 'heartbroken'],
+        'angry': ['angry', 'furious', 'annoyed', 'mad', 'irritated'],
+        'fear': ['scared', 'worried', 'anxious', 'nervous', 'afraid'],
+        'neutral': ['okay', 'fine', 'normal', 'alright', 'average'],
+        'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'stunned'],
+    }
+    templates = ["I feel {} today", "so {} right now", "work made me {}", "{} after the call", "honestly just {}"]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'classifier.npy')
+        settings = override_settings(MOOD_CLASSIFIER={'PATH': self.path, 'CHECK_INTERVAL': 0})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_classifier()
+        self.addCleanup(reset_classifier)
+
+    def examples(self):
+        return [(template.format(word), mood) for mood, words in self.words.items()
+                for word in words for template in self.templates]
+
+    def train(self, **options):
+        examples = os.path.join(os.path.dirname(self.path), 'examples.csv')
+        with open(examples, 'w', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['text', 'mood'])
+            writer.writerows(self.examples() + [("meh", 'bored')])
+        out, err = StringIO(), StringIO()
+        options = {'bits': 14, 'epochs': 20, 'holdout': 0, **options}
+        call_command('train_mood_classifier', data=[examples], stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_unavailable_until_trained(self):
+        with self.assertRaises(ClassifierUnavailable):
+            MoodAnalyzer.analyze_text_local("I feel great")
+        out, err = self.train()
+        self.assertIn('Trained on 150 example(s)', out)
+        self.assertIn('Skipped 1 example(s)', err)
+
+        texts = ["great, I feel great", "so lonely and sad tonight", "furious about work", "a stunned silence"]
+        results = MoodAnalyzer.analyze_many_local(texts)
+        self.assertEqual([result['detected_mood'] for result in results], ['happy', 'sad', 'angry', 'surprise'])
+        for text, result in zip(texts, results):
+            self.assertAlmostEqual(sum(result['emotions'].values()), 1.0, places=5)
+            single = MoodAnalyzer.analyze_text_local(text)
+            self.assertEqual(single['detected_mood'], result['detected_mood'])
+            self.assertAlmostEqual(single['emotions']['happy'], result['emotions']['happy'], places=5)
+        self.assertEqual(MoodAnalyzer.analyze_many_local([]), [])
+
+    def test_weights_are_memory_mapped_and_hot_reloaded(self):
+        self.train()
+        first = get_classifier()
+        self.assertIsInstance(first.weights, np.memmap)
+        self.assertEqual(first.weights.shape, ((1 << 14) + 1, 6))
+        self.assertIs(get_classifier(), first)
+        self.train(epochs=1)
+        self.assertIsNot(get_classifier(), first)
+
+    def test_features_are_stable_across_processes(self):
+        # crc32, not the per-process salted hash()
+        indices, values = text_features("not happy", 10)
+        self.assertEqual(indices[-1], 1 << 10)
+        self.assertEqual(values[-1], 1.0)
+        self.assertAlmostEqual(float(np.dot(values[:-1], values[:-1])), 1.0, places=5)
+        self.assertEqual(text_features("", 10)[0].tolist(), [1 << 10])
+        self.assertEqual(indices.tolist(), text_features("NOT happy!", 10)[0].tolist())
+
+
+class AnalysisCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_analysis_cache()
+        self.addCleanup(reset_analysis_cache)
+        # The cache mechanics, on the engine that needs no model or server
+        cached_engines = mock.patch.object(MoodAnalyzer, 'CACHED_ENGINES', ('simulated', 'local', 'api'))
+        cached_engines.start()
+        self.addCleanup(cached_engines.stop)
+
+    def test_cheap_engines_skip_the_cache(self):
+        with mock.patch.object(MoodAnalyzer, 'CACHED_ENGINES', ('local', 'api')):
+            MoodAnalyzer.analyze_batch(["so happy", "so happy"])
+        self.assertEqual(get_analysis_cache().stats()['entries'], 0)
+        self.assertEqual(get_analysis_cache().stats()['misses'], 0)
+
+    def test_repeated_texts_skip_the_engine(self):
+        with mock.patch.object(MoodAnalyzer, 'analyze_many', wraps=MoodAnalyzer.analyze_many) as engine:
+            first = MoodAnalyzer.analyze_batch(["I'm so happy today!", "very worried", "I'm so happy today!"])
+            self.assertEqual(engine.call_args.args[0], ["I'm so happy today!", "very worried"])
+            # Spacing and compatibility characters do not matter
+            again = MoodAnalyzer.analyze("  I'm so   happy\ntoday\uff01")
+            self.assertEqual(engine.call_count, 1)
+        self.assertEqual(again, first[0])
+        self.assertEqual(first[0], MoodAnalyzer.analyze_text_simulated("I'm so happy today!"))
+        self.assertEqual(get_analysis_cache().stats(),
+                         {'entries': 2, 'local_hits': 1, 'shared_hits': 0, 'misses': 2, 'hit_rate': 1 / 3})
+
+        # Results are copies
+        again['emotions']['happy'] = -1
+        self.assertNotEqual(MoodAnalyzer.analyze("I'm so happy today!")['emotions']['happy'], -1)
+
+    def test_shared_tier_serves_other_workers(self):
+        MoodAnalyzer.analyze("so tired and sad")
+        reset_analysis_cache()
+        with mock.patch.object(MoodAnalyzer, 'analyze_many') as engine:
+            self.assertEqual(MoodAnalyzer.analyze("so tired and sad")['detected_mood'], 'sad')
+        engine.assert_not_called()
+        self.assertEqual(get_analysis_cache().stats()['shared_hits'], 1)
+
+    def test_engine_version_is_part_of_the_key(self):
+        MoodAnalyzer.analyze("furious")
+        with mock.patch('analysis.services.lexicon_version', return_value='retuned'), \
+                mock.patch.object(MoodAnalyzer, 'analyze_many', wraps=MoodAnalyzer.analyze_many) as engine:
+            MoodAnalyzer.analyze("furious")
+        engine.assert_called_once()
+        with self.assertRaisesMessage(ValueError, "Unknown mood analyzer engine 'magic'"):
+            MoodAnalyzer.analyze("furious", engine='magic')
+
+    def test_local_tier_is_bounded(self):
+        local = AnalysisCache(max_entries=2, cache_alias=None)
+        local.set_many({'a': {'emotions': {}}, 'b': {'emotions': {}}})
+        local.get_many(['a'])
+        local.set_many({'c': {'emotions': {}}})
+        self.assertEqual(set(local.get_many(['a', 'b', 'c'])), {'a', 'c'})
+
+    def test_analyze_mood_uses_the_cache(self):
+        user = User.objects.create_user(username='cached', password='x')
+        analyze_mood("a wonderful day", user)
+        with mock.patch.object(MoodAnalyzer, 'analyze_many') as engine:
+            entry = analyze_mood("a wonderful day", user)
+        engine.assert_not_called()
+        self.assertEqual(entry.detected_mood, 'happy')
+
+
+class RemoteBreakerTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubInferenceServer().start()
+        cls.addClassCleanup(cls.stub.stop)
+
+    def setUp(self):
+        self.stub.requests = 0
+        self.stub.failures.clear()
+        self.stub.latency = 0
+        settings = override_settings(
+            HF_INFERENCE={'API_URL': self.stub.url, 'RETRIES': 0, 'READ_TIMEOUT': 1.0},
+            MOOD_ANALYZER={'ENGINE': 'api', 'DEADLINE': 0.3,
+                           'BREAKER': {'MIN_CALLS': 4, 'ERROR_RATE': 0.5, 'P95_LATENCY': 0.1,
+                                       'OPEN_SECONDS': 0.2, 'PROBES': 1}},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for reset in (inference_client.cache_clear, reset_remote_breaker, reset_analysis_cache, cache.clear):
+            reset()
+            self.addCleanup(reset)
+
+    def test_errors_trip_the_breaker_and_probes_restore_it(self):
+        self.stub.fail_next(4, status=500)
+        for i in range(4):
+            result = MoodAnalyzer.analyze(f"so happy {i}")
+            self.assertEqual(result, {**MoodAnalyzer.analyze_text_simulated(f"so happy {i}"), 'stage': 'simulated'})
+        self.assertEqual(remote_breaker().stats()['trips']['errors'], 1)
+
+        # Open: the lexicon answers without calling the API
+        self.assertEqual(MoodAnalyzer.analyze("very worried")['detected_mood'], 'fear')
+        self.assertEqual(self.stub.requests, 4)
+        self.assertEqual(remote_breaker().stats()['state'], 'open')
+        self.assertEqual(remote_breaker().rejected, 1)
+
+        # After OPEN_SECONDS one probe goes out, and its success closes the breaker
+        time.sleep(0.25)
+        self.assertEqual(remote_breaker().state, 'half_open')
+        self.assertEqual(MoodAnalyzer.analyze("very worried")['detected_mood'], 'fear')
+        self.assertEqual(self.stub.requests, 5)
+        self.assertEqual(remote_breaker().state, 'closed')
+
+    def test_fallback_results_are_not_cached_as_api_results(self):
+        self.stub.fail_next(1, status=500)
+        fallback = MoodAnalyzer.analyze("so furious")
+        self.assertEqual((fallback['detected_mood'], fallback['stage']), ('angry', 'simulated'))
+        self.assertEqual(MoodAnalyzer.analyze("so furious")['detected_mood'], 'angry')
+        self.assertEqual(self.stub.requests, 2)
+        MoodAnalyzer.analyze("so furious")
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_slow_calls_trip_on_p95_and_respect_the_deadline(self):
+        self.stub.latency = 0.15
+        for i in range(4):
+            MoodAnalyzer.analyze(f"calm {i}")
+        self.assertEqual(remote_breaker().stats()['trips'], {'errors': 0, 'latency': 1, 'probe': 0})
+
+        # A probe that runs out of time opens the breaker again, within the deadline
+        self.stub.latency = 1.0
+        time.sleep(0.25)
+        start = time.monotonic()
+        self.assertEqual(MoodAnalyzer.analyze("so happy")['detected_mood'], 'happy')
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(remote_breaker().stats()['trips']['probe'], 1)
+        self.assertEqual(remote_breaker().state, 'open')
+
+    def test_breaker_window_and_probe_slots(self):
+        now = [0.0]
+        breaker = CircuitBreaker(window=10, min_calls=3, error_rate=0.5, p95_latency=1.0, open_seconds=5,
+                                 probes=1, clock=lambda: now[0])
+        for succeeded in (False, True, False):
+            now[0] += 6
+            breaker.record(succeeded, 0.01)
+        # Only the last two calls are in the window
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record(True, 0.01)
+        self.assertEqual(breaker.stats()['calls'], 3)
+        breaker.record(False, 0.01)
+        self.assertEqual(breaker.state, 'open')
+
+        now[0] += 5
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # one probe at a time
+        breaker.record(True, 0.01)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_status_is_staff_only(self):
+        url = reverse('analysis:analyzer_status')
+        self.client.force_login(User.objects.create_user(username='member', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        data = self.client.get(url).json()
+        self.assertEqual(data['engine'], 'api')
+        self.assertEqual(data['breaker']['state'], 'closed')
+        self.assertEqual(data['breaker']['trips'], {'errors': 0, 'latency': 0, 'probe': 0})
+
+
+class CascadeAnalyzerTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubInferenceServer().start()
+        cls.addClassCleanup(cls.stub.stop)
+
+    def setUp(self):
+        self.stub.requests = 0
+        settings = override_settings(
+            HF_INFERENCE={'API_URL': self.stub.url, 'RETRIES': 0},
+            MOOD_ANALYZER={'ENGINE': 'cascade', 'CASCADE': {'ENGINE': 'api', 'MIN_MARGIN': 0.3}},
+            MOOD_CLASSIFIER={'PATH': os.path.join(tempfile.gettempdir(), 'no-such-classifier.npy')},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for reset in (inference_client.cache_clear, reset_remote_breaker, reset_analysis_cache, reset_classifier,
+                      cache.clear):
+            reset()
+            self.addCleanup(reset)
+
+    def test_only_ambiguous_texts_escalate(self):
+        texts = ["I'm so happy today!", "Happy about the trip but worried about the cost",
+                 "Went to the dentist then the supermarket", "so lonely and sad"]
+        results = MoodAnalyzer.analyze_batch(texts)
+        self.assertEqual([result['stage'] for result in results], ['simulated', 'api', 'api', 'simulated'])
+        self.assertEqual(results[0], {**MoodAnalyzer.analyze_text_simulated(texts[0]), 'stage': 'simulated'})
+        self.assertEqual(results[2]['detected_mood'], 'neutral')
+        # Both escalated texts went out in one call, and are cached as API results
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(MoodAnalyzer.analyze(texts[1])['stage'], 'api')
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_margin_is_configurable(self):
+        texts = ["I'm so happy today!", "sad but okay"]
+        with self.settings(MOOD_ANALYZER={'CASCADE': {'ENGINE': 'api', 'MIN_MARGIN': 1.01}}):
+            self.assertEqual([result['stage'] for result in MoodAnalyzer.analyze_batch(texts, 'cascade')],
+                             ['api', 'api'])
+        with self.settings(MOOD_ANALYZER={'CASCADE': {'ENGINE': 'api', 'MIN_MARGIN': 0}}):
+            self.assertEqual([result['stage'] for result in MoodAnalyzer.analyze_batch(texts, 'cascade')],
+                             ['simulated', 'simulated'])
+        with self.settings(MOOD_ANALYZER={'CASCADE': {'ENGINE': 'cascade'}}):
+            with self.assertRaisesMessage(ValueError, "Cascade engine must be 'local' or 'api'"):
+                MoodAnalyzer.analyze("meh", 'cascade')
+
+    def test_untrained_local_engine_leaves_the_lexicon_result(self):
+        with self.settings(MOOD_ANALYZER={'CASCADE': {'ENGINE': 'local', 'MIN_MARGIN': 0.3}}):
+            result = MoodAnalyzer.analyze("Happy about the trip but worried about the cost", 'cascade')
+        self.assertEqual(result['stage'], 'simulated')
+        self.assertEqual(result['confidence'], 0.5)
+
+
+class AsyncAnalysisViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', password='x')
+
+    async def post(self, name, payload, query=''):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(reverse(name) + query, json.dumps(payload),
+                                                content_type='application/json')
+        return response.json()
+
+    async def test_analyze_ajax(self):
+        data = await self.post('analysis:analyze_ajax', {'text': "I am so worried about tomorrow"})
+        self.assertTrue(data['success'])
+        self.assertEqual(data['data']['mood_key'], 'fear')
+        self.assertEqual(data['data']['confidence'], 1.0)
+        self.assertEqual(data['data']['emotions']['fear'], 1.0)
+        self.assertNotIn('analysis_id', data['data'])
+
+        # No keywords: the same neutral result every time, not a random mood
+        results = [(await self.post('analysis:analyze_ajax', {'text': "Went to the dentist"}))['data']
+                   for _ in range(3)]
+        self.assertEqual({(result['mood_key'], result['confidence']) for result in results}, {('neutral', 0.5)})
+
+        data = await self.post('analysis:analyze_ajax', {'text': "hi"})
+        self.assertEqual(data['error'], 'Text is too short (minimum 3 characters)')
+        self.assertFalse(await MoodAnalysis.objects.aexists())
+
+    async def test_analyze_and_persist(self):
+        text = "So happy, but a little worried about the move"
+        data = await self.post('analysis:analyze_ajax', {'text': text}, query='?persist=1')
+        analysis = await MoodAnalysis.objects.aget(id=data['data']['analysis_id'])
+        expected = MoodAnalyzer.analyze_text_simulated(text)
+        self.assertEqual((analysis.user_id, analysis.text), (self.user.id, text))
+        self.assertEqual((analysis.detected_mood, analysis.confidence), ('happy', expected['confidence']))
+        self.assertEqual(analysis.emotions, expected['emotions'])
+        self.assertEqual(data['data']['emotions'],
+                         {mood: round(score, 3) for mood, score in expected['emotions'].items()})
+
+    async def test_save_analysis_ajax(self):
+        data = await self.post('analysis:save_analysis_ajax', {
+            'text': "A calm, ordinary day", 'mood_key': 'happy', 'confidence': '80%', 'emotions': {'happy': '99%'},
+        })
+        self.assertTrue(data['success'])
+        analysis = await MoodAnalysis.objects.aget(id=data['analysis_id'])
+        # Computed on the server; the client's mood and scores are ignored
+        self.assertEqual((analysis.user_id, analysis.detected_mood, analysis.confidence),
+                         (self.user.id, 'neutral', 0.5))
+        self.assertEqual(analysis.emotions, MoodAnalyzer.analyze_text_simulated("A calm, ordinary day")['emotions'])
+
+    async def test_login_required(self):
+        response = await self.async_client.post(reverse('analysis:analyze_ajax'), '{}',
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 302)
+
+
+class MoodRollupTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='roller', password='x')
+
+    def analysis(self, mood, confidence, at):
+        analysis = MoodAnalysis.objects.create(user=self.user, text=mood, detected_mood=mood, confidence=confidence)
+        # Created now and then moved to at, so every test also moves a bucket
+        analysis.created_at = at
+        analysis.save()
+        return analysis
+
+    def buckets(self):
+        return {
+            (rollup.day, rollup.mood): (rollup.count, round(rollup.confidence_sum, 6))
+            for rollup in MoodDailyRollup.objects.filter(user=self.user)
+        }
+
+    def test_saves_and_deletes_update_buckets(self):
+        noon = datetime(2026, 3, 1, 6, 0, tzinfo=dt_timezone.utc)
+        first = self.analysis('happy', 0.8, noon)
+        second = self.analysis('happy', 0.6, noon)
+        self.assertEqual(self.buckets(), {(date(2026, 3, 1), 'happy'): (2, 1.4)})
+
+        second.detected_mood = 'sad'
+        second.save()
+        self.assertEqual(self.buckets(), {(date(2026, 3, 1), 'happy'): (1, 0.8),
+                                          (date(2026, 3, 1), 'sad'): (1, 0.6)})
+
+        first.delete()
+        self.assertEqual(self.buckets(), {(date(2026, 3, 1), 'sad'): (1, 0.6)})
+
+    def test_days_follow_the_user_timezone(self):
+        # 20:00 UTC is already the next day in Kathmandu (UTC+5:45)
+        evening = datetime(2026, 3, 1, 20, 0, tzinfo=dt_timezone.utc)
+        self.analysis('fear', 0.7, evening)
+        self.assertEqual(list(self.buckets()), [(date(2026, 3, 2), 'fear')])
+
+        profile = UserProfile.objects.create(user=self.user, timezone='America/New_York')
+        self.assertEqual(list(self.buckets()), [(date(2026, 3, 1), 'fear')])
+        self.analysis('fear', 0.5, evening)
+        self.assertEqual(self.buckets(), {(date(2026, 3, 1), 'fear'): (2, 1.2)})
+
+        profile.delete()
+        self.assertEqual(self.buckets(), {(date(2026, 3, 2), 'fear'): (2, 1.2)})
+
+    def test_only_timezone_changes_rebuild(self):
+        with mock.patch('analysis.signals.rebuild_rollups') as rebuild:
+            profile = UserProfile.objects.create(user=self.user)
+            profile.save()
+            profile.save(update_fields=['timezone'])
+            profile.timezone = 'Europe/Paris'
+            profile.save(update_fields=[])
+            self.assertEqual(rebuild.call_count, 0)
+            profile.save()
+            profile.delete()
+            self.assertEqual(rebuild.call_count, 2)
+
+    def test_versions_bump_with_one_update(self):
+        self.analysis('happy', 0.5, datetime(2026, 3, 1, tzinfo=dt_timezone.utc))
+        with CaptureQueriesContext(connection) as queries:
+            bump_versions([self.user.id])
+        statements = [query['sql'].split()[0] for query in queries]
+        # Savepoints aside, the only statement is the UPDATE
+        self.assertEqual([sql for sql in statements if sql not in ('SAVEPOINT', 'RELEASE')], ['UPDATE'])
+        self.assertEqual(MoodDataVersion.objects.get(user=self.user).version, 3)
+
+    def test_naive_times_are_read_in_the_user_timezone(self):
+        analysis = self.analysis('sad', 0.6, datetime(2026, 3, 1, 23, 30))
+        analysis.refresh_from_db()
+        # 23:30 in Kathmandu is 17:45 UTC, still March 1st there
+        self.assertEqual(analysis.created_at, datetime(2026, 3, 1, 17, 45, tzinfo=dt_timezone.utc))
+        self.assertEqual(list(self.buckets()), [(date(2026, 3, 1), 'sad')])
+
+    def test_backfill_matches_incremental(self):
+        for hour, mood in enumerate(['happy', 'sad', 'happy', 'neutral', 'angry']):
+            self.analysis(mood, 0.5 + hour / 10, datetime(2026, 3, 1 + hour % 2, hour * 5, tzinfo=dt_timezone.utc))
+        incremental = self.buckets()
+        MoodDailyRollup.objects.all().delete()
+
+        out = StringIO()
+        call_command('backfill_mood_rollups', '--user', 'roller', stdout=out)
+        self.assertEqual(self.buckets(), incremental)
+        self.assertIn(f"Rebuilt {len(incremental)} daily mood rollups", out.getvalue())
+
+    def test_analytics_reads_rollups(self):
+        self.analysis('happy', 0.9, datetime.now(dt_timezone.utc))
+        self.analysis('sad', 0.4, datetime.now(dt_timezone.utc))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('analysis:analytics'))
+        self.assertEqual(sorted(json.loads(response.context['pie_labels'])), ['Happy', 'Sad'])
+        self.assertEqual(json.loads(response.context['pie_data']), [1, 1])
+        self.assertEqual(len(json.loads(response.context['trend_labels'])), 30)
+
+
+class MoodTrendsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='trender', password='x')
+        self.today = date(2026, 3, 18)  # a Wednesday
+
+    def rollup(self, day, mood, count):
+        MoodDailyRollup.objects.create(user=self.user, day=day, mood=mood, count=count, confidence_sum=count * 0.5)
+
+    def test_bucket_grows_with_range(self):
+        for days, bucket, points in [(7, 'day', 7), (30, 'day', 30), (90, 'week', 14), (365, 'week', 53),
+                                     (6 * 365, 'quarter', 25)]:
+            chosen, starts = choose_bucket(self.today - timedelta(days=days - 1), self.today)
+            self.assertEqual((chosen, len(starts)), (bucket, points), days)
+            self.assertLessEqual(len(starts), MAX_POINTS)
+
+    def test_weeks_are_summed_and_empty_moods_dropped(self):
+        self.rollup(date(2026, 3, 16), 'happy', 2)   # Monday
+        self.rollup(date(2026, 3, 18), 'happy', 3)   # same week
+        self.rollup(date(2026, 3, 9), 'sad', 1)      # week before
+        self.rollup(date(2025, 1, 1), 'angry', 4)    # outside 90 days
+        trends = mood_trends(self.user, '90d', self.today)
+
+        self.assertEqual(trends['bucket'], 'week')
+        self.assertEqual(trends['trend_labels'][-2:], ['2026-03-09', '2026-03-16'])
+        datasets = {dataset['label']: dataset['data'] for dataset in trends['trend_datasets']}
+        self.assertEqual(set(datasets), {'Happy', 'Sad'})
+        self.assertEqual(datasets['Happy'][-2:], [0, 5])
+        self.assertEqual(datasets['Sad'][-2:], [1, 0])
+        self.assertEqual(trends['pie_labels'], ['Happy', 'Sad'])
+
+    def test_all_time_starts_at_first_rollup(self):
+        self.rollup(date(2024, 2, 10), 'neutral', 1)
+        self.rollup(date(2026, 3, 1), 'neutral', 2)
+        trends = mood_trends(self.user, 'all', self.today)
+        self.assertEqual((trends['bucket'], trends['trend_labels'][0]), ('month', '2024-02'))
+        self.assertEqual(sum(trends['trend_datasets'][0]['data']), 3)
+
+    def test_view_range_parameter(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('analysis:analytics'), {'range': '1y'})
+        self.assertEqual((response.context['range'], response.context['bucket']), ('1y', 'week'))
+        self.assertFalse(response.context['has_data'])
+        response = self.client.get(reverse('analysis:analytics'), {'range': 'forever'})
+        self.assertEqual(response.context['range'], '30d')
+
+
+class AnalyticsApiTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='charter', password='x')
+        self.client.force_login(self.user)
+        self.url = reverse('analysis:analytics_api')
+
+    def save(self, mood):
+        return MoodAnalysis.objects.create(user=self.user, text=mood, detected_mood=mood, confidence=0.7)
+
+    def test_payload_and_validators(self):
+        self.save('happy')
+        response = self.client.get(self.url, {'range': '7d'})
+        data = response.json()['data']
+        self.assertEqual((data['range'], data['bucket'], data['pie_data']), ('7d', 'day', [1]))
+        self.assertEqual(len(data['trend_labels']), 7)
+        self.assertTrue(response['ETag'].startswith('"analytics-'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_not_modified_until_new_analysis(self):
+        self.save('happy')
+        etag = self.client.get(self.url)['ETag']
+        # Session, user and data version; no chart queries
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.save('sad')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(sorted(response.json()['data']['pie_labels']), ['Happy', 'Sad'])
+
+    def test_if_modified_since(self):
+        self.save('happy')
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_server_cache_reused_until_version_changes(self):
+        self.save('happy')
+        with mock.patch('analysis.trends.mood_trends', wraps=mood_trends) as compute:
+            self.client.get(self.url)
+            self.client.get(self.url)
+            self.client.get(reverse('analysis:analytics'))
+            self.assertEqual(compute.call_count, 1)
+            self.save('fear')
+            self.client.get(self.url)
+            self.assertEqual(compute.call_count, 2)
+
+    def test_unknown_range(self):
+        response = self.client.get(self.url, {'range': 'forever'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+
+class MoodReportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reporter', password='x')
+        self.client.force_login(self.user)
+
+    def seed(self, size, batch=20_000):
+        for start in range(0, size, batch):
+            MoodAnalysis.objects.bulk_create(
+                MoodAnalysis(user=self.user, text=f"entry {i} <3", detected_mood='happy', confidence=0.8,
+                             emotions={'happy': '80.0%', 'sad': '20.0%'})
+                for i in range(start, min(start + batch, size))
+            )
+        rebuild_rollups([self.user.id])
+
+    def peak_memory(self, max_rows):
+        tracemalloc.start()
+        try:
+            with open(os.devnull, 'wb') as output:
+                write_mood_report(self.user, output, max_rows=max_rows, chunk_size=100)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_export_streams_a_pdf(self):
+        self.seed(3)
+        response = self.client.get(reverse('analysis:export_pdf'))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('attachment; filename="mindtrack_report_reporter_', response['Content-Disposition'])
+        self.assertTrue(response.streaming)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_range_and_limit_parameters(self):
+        url = reverse('analysis:export_pdf')
+        self.assertEqual(self.client.get(url, {'start': '2026-01-01', 'end': '2026-02-01', 'limit': 5}).status_code, 200)
+        self.assertEqual(self.client.get(url, {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': '-1'}).status_code, 400)
+
+    def test_story_respects_row_cap_and_window(self):
+        self.seed(30)
+        headers = [flowable for flowable in report_story(self.user, max_rows=10)
+                   if getattr(flowable, 'style', None) is not None and flowable.style.name == 'Heading3']
+        self.assertEqual(len(headers), 10)
+        self.assertFalse(any(True for flowable in report_story(self.user, start=date(2000, 1, 1), end=date(2000, 1, 2))
+                             if getattr(flowable, 'style', None) is not None and flowable.style.name == 'Heading3'))
+
+    def test_memory_ceiling_independent_of_history(self):
+        self.seed(1_000)
+        small = self.peak_memory(max_rows=200)
+        self.seed(99_000)
+        large = self.peak_memory(max_rows=200)
+        self.assertEqual(MoodAnalysis.objects.filter(user=self.user).count(), 100_000)
+        self.assertLess(large, small * 1.25)
+        self.assertLess(large, 32 * 1024 * 1024)
+
+    def test_styles_are_built_once(self):
+        self.seed(3)
+        titles = [next(report_story(self.user)).style for _ in range(2)]
+        self.assertIs(titles[0], titles[1])
+        self.assertIs(report_template(), report_template())
+
+    def test_numeric_emotions_print_as_percentages(self):
+        MoodAnalysis.objects.create(user=self.user, text="scored by the analyzer", detected_mood='happy',
+                                    confidence=0.62, emotions={'happy': 0.62, 'sad': 0.3, 'calm': 0.08})
+        MoodAnalysis.objects.create(user=self.user, text="saved by an older client", detected_mood='sad',
+                                    confidence=0.7, emotions={'sad': '70.0%'})
+        rebuild_rollups([self.user.id])
+        tables = [flowable._cellvalues for flowable in report_story(self.user)
+                  if isinstance(flowable, Table) and flowable._cellvalues[0] == ['Emotion', 'Percentage']]
+        self.assertEqual(sorted(tables), sorted([
+            [['Emotion', 'Percentage'], ['Happy', '62.0%'], ['Sad', '30.0%'], ['Calm', '8.0%']],
+            [['Emotion', 'Percentage'], ['Sad', '70.0%']],
+        ]))
+
+
+class ReportJobTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(artifacts.cleanup)
+        settings = override_settings(REPORT_JOBS={'ARTIFACT_DIR': artifacts.name, 'STALE_AFTER': 60,
+                                                  'MAX_ATTEMPTS': 2, 'POLL_INTERVAL': 0})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username='queuer', password='x')
+        self.client.force_login(self.user)
+        self.save('happy')
+
+    def save(self, mood):
+        return MoodAnalysis.objects.create(user=self.user, text=mood, detected_mood=mood, confidence=0.7)
+
+    def enqueue(self, **payload):
+        return self.client.post(reverse('analysis:report_enqueue'), json.dumps({'limit': 10, **payload}),
+                                content_type='application/json')
+
+    def test_enqueue_render_download(self):
+        first = self.enqueue().json()
+        self.assertEqual(first['job']['status'], 'queued')
+        # A double click joins the queued job
+        self.assertEqual(self.enqueue().json()['job']['id'], first['job']['id'])
+
+        self.assertEqual(run_worker(once=True), 1)
+        status = self.client.get(first['status_url']).json()['job']
+        self.assertEqual(status['status'], 'done')
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_unchanged_data_never_renders_twice(self):
+        self.enqueue()
+        with mock.patch('analysis.jobs.write_mood_report', wraps=write_mood_report) as render:
+            run_worker(once=True)
+            ReportJob.objects.all().delete()
+            response = self.enqueue()
+            self.assertEqual((response.status_code, response.json()['job']['status']), (200, 'done'))
+            self.assertEqual(run_worker(once=True), 0)
+
+            self.save('sad')
+            job = ReportJob.objects.get(id=self.enqueue().json()['job']['id'])
+            self.assertEqual(job.status, 'queued')
+            run_worker(once=True)
+            self.assertEqual(render.call_count, 2)
+        # The artifact of the old data version was replaced
+        job.refresh_from_db()
+        self.assertEqual(os.listdir(os.path.dirname(job.artifact)), [os.path.basename(job.artifact)])
+
+    def test_stale_jobs_are_retried_then_abandoned(self):
+        job_id = self.enqueue().json()['job']['id']
+        long_ago = datetime.now(dt_timezone.utc) - timedelta(minutes=5)
+        ReportJob.objects.filter(id=job_id).update(status='running', started_at=long_ago, attempts=1)
+        run_worker(once=True)
+        self.assertEqual(ReportJob.objects.get(id=job_id).status, 'done')
+
+        job_id = self.enqueue(limit=5).json()['job']['id']
+        ReportJob.objects.filter(id=job_id).update(status='running', started_at=long_ago, attempts=2)
+        run_worker(once=True)
+        job = ReportJob.objects.get(id=job_id)
+        self.assertEqual((job.status, job.error), ('failed', 'Gave up after 2 attempts'))
+
+    def test_a_reclaimed_job_keeps_the_latest_claims_result(self):
+        job_id = self.enqueue().json()['job']['id']
+        slow = claim_next_job()
+        # The render outlives STALE_AFTER and another worker claims the job again
+        long_ago = datetime.now(dt_timezone.utc) - timedelta(minutes=5)
+        ReportJob.objects.filter(id=job_id).update(started_at=long_ago)
+        retry = claim_next_job()
+        self.assertEqual((retry.id, retry.attempts), (job_id, 2))
+
+        with mock.patch('analysis.jobs.write_mood_report', side_effect=RuntimeError('timed out')):
+            self.assertIsNone(run_job(slow))
+        self.assertEqual(ReportJob.objects.get(id=job_id).status, 'running')
+        self.assertEqual(run_job(retry), 'done')
+        self.assertEqual(ReportJob.objects.get(id=job_id).status, 'done')
+
+    def test_render_errors_fail_the_job(self):
+        job_id = self.enqueue().json()['job']['id']
+        with mock.patch('analysis.jobs.write_mood_report', side_effect=RuntimeError('disk full')):
+            run_worker(once=True)
+        job = ReportJob.objects.get(id=job_id)
+        self.assertEqual((job.status, job.error), ('failed', 'disk full'))
+        # A failed job is not reused
+        self.assertNotEqual(self.enqueue().json()['job']['id'], job_id)
+
+    def test_jobs_are_private_and_validated(self):
+        job_id = self.enqueue().json()['job']['id']
+        run_worker(once=True)
+        self.assertEqual(self.enqueue(start='soon').status_code, 400)
+        self.client.force_login(User.objects.create_user(username='snoop', password='x'))
+        self.assertEqual(self.client.get(reverse('analysis:report_status', args=[job_id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('analysis:report_download', args=[job_id])).status_code, 404)
+
+
+class BulkReportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        self.output = output.name
+        self.users = [User.objects.create_user(username=f'patient{i}', password='x') for i in range(3)]
+        for user in self.users[:2]:
+            MoodAnalysis.objects.create(user=user, text='fine', detected_mood='happy', confidence=0.7)
+
+    def generate(self, *args, **options):
+        out = StringIO()
+        call_command('generate_bulk_reports', self.output, *args, processes=1, stdout=out, stderr=StringIO(),
+                     **options)
+        return out.getvalue()
+
+    def manifest(self):
+        with open(os.path.join(self.output, 'manifest.jsonl')) as manifest:
+            return [json.loads(line) for line in manifest]
+
+    def test_renders_users_with_data_and_a_manifest(self):
+        today = timezone.localdate()
+        summary = self.generate(month=today.strftime('%Y-%m'))
+        self.assertIn('Rendered 2 report(s)', summary)
+        header, *records = self.manifest()
+        self.assertEqual(header['params']['start'], today.replace(day=1).isoformat())
+        self.assertEqual([record['username'] for record in records], ['patient0', 'patient1'])
+        for record in records:
+            with open(os.path.join(self.output, record['file']), 'rb') as pdf:
+                self.assertTrue(pdf.read().startswith(b'%PDF'))
+            self.assertEqual((record['status'], record['pages']), ('done', 1))
+
+        self.output = tempfile.mkdtemp(dir=self.output)
+        self.assertIn('Rendered 3 report(s)', self.generate(include_empty=True))
+
+    def test_resumes_after_a_crash(self):
+        with mock.patch('analysis.bulk_reports.write_mood_report', side_effect=[1, RuntimeError('killed')]):
+            self.assertIn('0 already done, 1 failed', self.generate())
+        # A crash while appending leaves half a line behind
+        with open(os.path.join(self.output, 'manifest.jsonl'), 'a') as manifest:
+            manifest.write('{"user_id": ')
+        with mock.patch('analysis.bulk_reports.write_mood_report', wraps=write_mood_report) as render:
+            self.assertIn('Rendered 1 report(s)', self.generate())
+            self.assertIn('2 already done, 0 failed', self.generate())
+        self.assertEqual(render.call_count, 1)
+        records = self.manifest()[1:]
+        self.assertEqual([(record['user_id'], record['status']) for record in records],
+                         [(self.users[0].id, 'done'), (self.users[1].id, 'failed'), (self.users[1].id, 'done')])
+        self.assertEqual(records[1]['error'], 'RuntimeError: killed')
+
+    def test_rejects_a_directory_from_another_run(self):
+        self.generate(start='2026-01-01')
+        with self.assertRaisesMessage(CommandError, 'use another output directory'):
+            self.generate(start='2026-02-01')
+        with self.assertRaisesMessage(CommandError, 'not a month'):
+            self.generate(month='May')
+        with self.assertRaisesMessage(CommandError, 'Unknown user(s): nobody'):
+            self.generate(user=['nobody'])
+
+
+class DataExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='x')
+        self.client.force_login(self.user)
+        for mood in ['happy', 'sad']:
+            MoodAnalysis.objects.create(user=self.user, text=f'feeling {mood}, "quoted"\nnew line',
+                                        detected_mood=mood, confidence=0.75, emotions={mood: '75.0%'})
+        MoodAnalysis.objects.create(user=User.objects.create_user(username='other', password='x'),
+                                    text='not mine', detected_mood='fear', confidence=0.5)
+
+    def download(self, fmt):
+        response = self.client.get(reverse('analysis:export_analyses', args=[fmt]))
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.download('csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="mindtrack_analyses_exporter.csv"')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ['id', 'created_at', 'detected_mood', 'confidence', 'text', 'emotions'])
+        self.assertEqual([row[2] for row in rows[1:]], ['happy', 'sad'])
+        self.assertEqual(rows[1][4], 'feeling happy, "quoted"\nnew line')
+        self.assertEqual(json.loads(rows[1][5]), {'happy': '75.0%'})
+
+    def test_ndjson(self):
+        response, body = self.download('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([record['detected_mood'] for record in records], ['happy', 'sad'])
+        self.assertEqual(records[0]['emotions'], {'happy': '75.0%'})
+        self.assertTrue(datetime.fromisoformat(records[0]['created_at']).tzinfo)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse('analysis:export_analyses', args=['xml'])).status_code, 404)
+
+    def test_header_precedes_the_query_and_rows_are_chunked(self):
+        def rows():
+            raise AssertionError("rows read before the header was sent")
+            yield
+
+        self.assertEqual(next(csv_chunks(['a', 'b'], rows())), 'a,b\r\n')
+        chunks = list(csv_chunks(['n'], ([i] for i in range(10_000)), chunk_bytes=1024))
+        self.assertTrue(all(len(chunk) < 1100 for chunk in chunks))
+        self.assertEqual(''.join(chunks).split(), ['n'] + [str(i) for i in range(10_000)])
+        lines = list(ndjson_chunks(['n'], ([i] for i in range(3)), chunk_bytes=1024))
+        self.assertEqual(lines, ['{"n": 0}\n', '{"n": 1}\n{"n": 2}\n'])
+
+
+class JournalImportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_analysis_cache()
+        self.addCleanup(reset_analysis_cache)
+        self.user = User.objects.create_user(username='importer', password='x')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def buckets(self):
+        return {(rollup.day, rollup.mood): (rollup.count, round(rollup.confidence_sum, 6))
+                for rollup in MoodDailyRollup.objects.filter(user=self.user)}
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            handle.write(content)
+        return path
+
+    def test_timestamps_rollups_and_batches(self):
+        entries = [
+            {'text': "So happy today!", 'created_at': '2025-03-01T20:00:00+00:00'},
+            {'text': "Very worried about the exam", 'created_at': '2025-03-02T08:30:00'},
+            {'text': "A lonely evening", 'created_at': '2025-03-02'},
+            '{"text": "furious at the bus", "created_at": "2025-03-02T09:00:00Z", "mood": "happy"}',
+            {'text': "Another happy day", 'created_at': '2025-03-02T10:00:00+00:00'},
+        ]
+        with mock.patch.object(MoodAnalyzer, 'analyze_batch', wraps=MoodAnalyzer.analyze_batch) as analyze:
+            stats = import_entries(self.user, iter(entries), batch_size=2)
+        self.assertEqual((stats['imported'], stats['skipped']), (5, 0))
+        self.assertEqual([call.args[0] for call in analyze.call_args_list],
+                         [["So happy today!", "Very worried about the exam"],
+                          ["A lonely evening", "furious at the bus"], ["Another happy day"]])
+        self.assertFalse(any(call.kwargs['cached'] for call in analyze.call_args_list))
+        self.assertEqual(get_analysis_cache().stats()['entries'], 0)
+
+        analyses = MoodAnalysis.objects.filter(user=self.user).order_by('created_at')
+        self.assertEqual([analysis.detected_mood for analysis in analyses],
+                         ['sad', 'happy', 'fear', 'angry', 'happy'])
+        # Naive times and bare dates are in the user's timezone (Asia/Kathmandu, UTC+5:45)
+        self.assertEqual([analysis.created_at for analysis in analyses], [
+            datetime(2025, 3, 1, 18, 15, tzinfo=dt_timezone.utc),
+            datetime(2025, 3, 1, 20, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 3, 2, 2, 45, tzinfo=dt_timezone.utc),
+            datetime(2025, 3, 2, 9, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 3, 2, 10, 0, tzinfo=dt_timezone.utc),
+        ])
+        self.assertEqual(analyses[1].emotions, MoodAnalyzer.analyze_text_simulated("So happy today!")['emotions'])
+
+        imported = self.buckets()
+        self.assertEqual(imported[(date(2025, 3, 2), 'happy')], (2, 2.0))
+        rebuild_rollups([self.user.id])
+        self.assertEqual(self.buckets(), imported)
+        self.assertTrue(MoodDataVersion.objects.filter(user=self.user, version__gt=0).exists())
+
+        # Later imports add to the existing buckets
+        import_entries(self.user, [{'text': "so happy", 'created_at': '2025-03-02T11:00:00+00:00'}])
+        self.assertEqual(self.buckets()[(date(2025, 3, 2), 'happy')], (3, 3.0))
+
+    def test_invalid_entries(self):
+        entries = [{'text': "fine"}, {'text': "  "}, "{not json", {'text': "ok", 'created_at': 'yesterday'}, 42]
+        with self.assertRaisesMessage(InvalidEntry, "Entry 2: 'text' is missing or empty"):
+            import_entries(self.user, entries)
+
+        notes = []
+        stats = import_entries(self.user, entries, skip_invalid=True, log=notes.append)
+        self.assertEqual((stats['imported'], stats['skipped']), (1, 4))
+        self.assertIn("Skipped entry 3: invalid JSON", notes[1])
+        self.assertIn("Skipped entry 4: 'created_at' is not an ISO 8601 date or time: 'yesterday'", notes[2])
+        self.assertEqual(notes[3], "Skipped entry 5: expected an object with 'text'")
+        # The entry without a timestamp is stamped now
+        self.assertLess(timezone.now() - MoodAnalysis.objects.get(text="fine").created_at, timedelta(minutes=1))
+
+    def test_batch_endpoint(self):
+        self.client.force_login(self.user)
+        url = reverse('analysis:import_entries')
+
+        def post(entries):
+            return self.client.post(url, json.dumps({'entries': entries}), content_type='application/json')
+
+        response = post([{'text': "so happy", 'created_at': '2024-12-31T23:00:00+00:00'}, {'text': "so sad"}])
+        self.assertEqual(response.json()['imported'], 2)
+        self.assertIn('rows_per_second', response.json())
+        self.assertEqual(MoodAnalysis.objects.get(text="so happy").created_at.year, 2024)
+
+        # All or nothing: a bad entry rolls back the whole request
+        response = post([{'text': "kept?"}] * 3 + [{'created_at': '2025-01-01'}])
+        self.assertEqual((response.status_code, response.json()['error']),
+                         (400, "Entry 4: 'text' is missing or empty"))
+        self.assertFalse(MoodAnalysis.objects.filter(text="kept?").exists())
+
+        with self.settings(MOOD_IMPORT={'MAX_ENTRIES': 2}):
+            response = post([{'text': "a"}] * 3)
+        self.assertEqual((response.status_code, response.json()['error']),
+                         (413, "At most 2 entries per request (got 3)"))
+        self.assertEqual(post([]).status_code, 400)
+        self.assertEqual(self.client.post(url, 'nope', content_type='application/json').status_code, 400)
+        self.assertEqual(MoodAnalysis.objects.filter(user=self.user).count(), 2)
+
+    def test_command_reimports_an_export(self):
+        source = User.objects.create_user(username='source', password='x')
+        for day, text in enumerate(["So happy today!", 'Worried, "very" worried\nabout work', "meh"], 1):
+            MoodAnalysis.objects.create(user=source, text=text, detected_mood='neutral', confidence=0.1,
+                                        created_at=datetime(2025, 1, day, 12, tzinfo=dt_timezone.utc))
+        self.client.force_login(source)
+        response = self.client.get(reverse('analysis:export_analyses', args=['csv']))
+        path = self.write('export.csv', '﻿' + b''.join(response.streaming_content).decode())
+        ndjson = self.write('more.ndjson', '{"text": "so sad"}\n\n{"text": ""}\n')
+
+        out, err = StringIO(), StringIO()
+        call_command('import_journal', 'importer', path, ndjson, '--batch-size', '2', stdout=out, stderr=err)
+        self.assertRegex(out.getvalue(),
+                         r"Imported 4 entries for importer in [\d.]+s \(\d+ rows/s\); skipped 1 invalid")
+        self.assertIn("Skipped entry 2: 'text' is missing or empty", err.getvalue())
+        imported = MoodAnalysis.objects.filter(user=self.user).order_by('created_at')
+        self.assertEqual([analysis.text for analysis in imported][:3],
+                         ["So happy today!", 'Worried, "very" worried\nabout work', "meh"])
+        self.assertEqual([analysis.detected_mood for analysis in imported][:3], ['happy', 'fear', 'neutral'])
+        self.assertEqual(imported[1].created_at, datetime(2025, 1, 2, 12, tzinfo=dt_timezone.utc))
+
+        with self.assertRaisesMessage(CommandError, "Entry 2: 'text' is missing or empty"):
+            call_command('import_journal', 'importer', ndjson, '--strict', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "Cannot tell the format of diary.txt"):
+            call_command('import_journal', 'importer', 'diary.txt')
+        with self.assertRaisesMessage(CommandError, "No user 'nobody'"):
+            call_command('import_journal', 'nobody', path)
+
+    def test_memory_does_not_grow_with_the_import(self):
+        def peak_memory(count):
+            texts = ["a good day, then a bit worried", "so lonely tonight", "furious at work", "nothing much"]
+            entries = ({'text': texts[i % 4], 'created_at': f'2020-01-{1 + i % 28:02}T00:{i % 60:02}'}
+                       for i in range(count))
+            tracemalloc.start()
+            try:
+                import_entries(self.user, entries, batch_size=200)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small = peak_memory(400)
+        large = peak_memory(4000)
+        self.assertEqual(MoodAnalysis.objects.filter(user=self.user).count(), 4400)
+        self.assertLess(large, small * 1.5)
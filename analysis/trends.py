@@ -0,0 +1,181 @@
+# analysis/trends.py
+"""
+Mood trend series over a selectable range, read from the daily rollups.
+
+The bucket size grows with the range (day, week, month, then quarter and
+year for very long histories) so no series has more than MAX_POINTS
+points. Buckets are summed in the database; empty buckets are filled with
+zeros and moods with no data in the range are left out.
+
+cached_mood_trends() keeps each series in the cache under the user's
+MoodDataVersion, which every change to their analyses bumps, so repeat
+requests reuse it until the data (or the local date) changes.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import MoodAnalysis, MoodDailyRollup, MoodDataVersion
+
+# Range key -> days covered (None: everything since the first analysis)
+RANGES = {
+    '7d': 7,
+    '30d': 30,
+    '90d': 90,
+    '1y': 365,
+    'all': None,
+}
+RANGE_LABELS = {
+    '7d': 'Last 7 days',
+    '30d': 'Last 30 days',
+    '90d': 'Last 90 days',
+    '1y': 'Last year',
+    'all': 'All time',
+}
+DEFAULT_RANGE = '30d'
+
+MAX_POINTS = 60
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+BUCKETS = ('day', 'week', 'month', 'quarter', 'year')
+
+MOOD_COLORS = {
+    'happy': '#FFD700',
+    'sad': '#4169E1',
+    'angry': '#DC143C',
+    'fear': '#8A2BE2',
+    'neutral': '#808080',
+    'surprise': '#FF69B4',
+}
+
+MOODS = [mood for mood, _label in MoodAnalysis.MOOD_CHOICES]
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket containing day"""
+    if bucket == 'day':
+        return day
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    if bucket == 'quarter':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    return date(day.year, 1, 1)
+
+
+def next_bucket(start, bucket):
+    """First day of the bucket after the one starting at start"""
+    if bucket == 'day':
+        return start + timedelta(days=1)
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    months = {'month': 1, 'quarter': 3}.get(bucket, 12)
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def bucket_label(start, bucket):
+    if bucket == 'month':
+        return start.strftime('%Y-%m')
+    if bucket == 'quarter':
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    if bucket == 'year':
+        return str(start.year)
+    return start.strftime('%Y-%m-%d')
+
+
+def bucket_starts(first, last, bucket, limit=None):
+    """Bucket start days covering first..last (None once there are more than limit)"""
+    starts = []
+    start = bucket_start(first, bucket)
+    while start <= last:
+        starts.append(start)
+        if limit is not None and len(starts) > limit:
+            return None
+        start = next_bucket(start, bucket)
+    return starts
+
+
+def choose_bucket(first, last, max_points=MAX_POINTS):
+    """The finest bucket that covers first..last in at most max_points, with its starts"""
+    for bucket in BUCKETS:
+        starts = bucket_starts(first, last, bucket, max_points)
+        if starts is not None:
+            return bucket, starts
+    return BUCKETS[-1], bucket_starts(first, last, BUCKETS[-1])
+
+
+def mood_trends(user, range_key, today, max_points=MAX_POINTS):
+    """Pie and trend series for user over range_key, ending at today (the user's local date)"""
+    if range_key not in RANGES:
+        range_key = DEFAULT_RANGE
+    rollups = MoodDailyRollup.objects.filter(user=user)
+    days = RANGES[range_key]
+    if days is None:
+        first = rollups.aggregate(first=Min('day'))['first'] or today
+    else:
+        first = today - timedelta(days=days - 1)
+        rollups = rollups.filter(day__gte=first)
+    bucket, starts = choose_bucket(first, today, max_points)
+
+    # Pie chart: mood distribution over the range
+    mood_counts = rollups.values('mood').annotate(count=Sum('count')).order_by('-count')
+    pie = [(item['mood'], item['count']) for item in mood_counts if item['count']]
+
+    # Trend: counts per bucket and mood, summed by the database
+    if bucket == 'day':
+        rows = rollups.values_list('day', 'mood').annotate(count=Sum('count')).order_by('day')
+    else:
+        rows = rollups.annotate(bucket=Trunc('day', bucket)).values_list('bucket', 'mood').annotate(
+            count=Sum('count')).order_by('bucket')
+    index = {start: i for i, start in enumerate(starts)}
+    series = {}
+    for start, mood, count in rows:
+        if start in index and count:
+            series.setdefault(mood, [0] * len(starts))[index[start]] += count
+
+    return {
+        'range': range_key,
+        'bucket': bucket,
+        'pie_labels': [mood.capitalize() for mood, _count in pie],
+        'pie_data': [count for _mood, count in pie],
+        'pie_colors': [MOOD_COLORS.get(mood, '#000000') for mood, _count in pie],
+        'trend_labels': [bucket_label(start, bucket) for start in starts],
+        'trend_datasets': [
+            {
+                'label': mood.capitalize(),
+                'data': series[mood],
+                'borderColor': MOOD_COLORS.get(mood, '#000000'),
+                'fill': False,
+            }
+            for mood in sorted(series, key=lambda mood: MOODS.index(mood) if mood in MOODS else len(MOODS))
+        ],
+    }
+
+
+def trends_state(user_id, range_key, tz):
+    """(tag, last_modified) of user_id's trends over range_key as seen in tz today"""
+    today = timezone.localdate(timezone=tz)
+    version, updated_at = MoodDataVersion.objects.filter(user_id=user_id).values_list(
+        'version', 'updated_at').first() or (0, None)
+    # The window also moves at local midnight, with or without new data
+    midnight = datetime.combine(today, time(), tzinfo=tz)
+    last_modified = max(updated_at, midnight) if updated_at else midnight
+    return f"{user_id}-{version}-{range_key}-{today.isoformat()}", last_modified
+
+
+def cached_mood_trends(user, range_key, tz, tag=None):
+    """mood_trends() for today in tz, cached under the trends_state() tag"""
+    if tag is None:
+        tag, _last_modified = trends_state(user.id, range_key, tz)
+    key = f'analysis:trends:{tag}'
+    trends = cache.get(key)
+    if trends is None:
+        trends = mood_trends(user, range_key, timezone.localdate(timezone=tz))
+        cache.set(key, trends, CACHE_TIMEOUT)
+    return trends
@@ -10,5 +10,12 @@ urlpatterns = [
     path('save-analysis-ajax/', views.save_analysis_ajax, name='save_analysis_ajax'),
     path('history/', views.history_view, name='history'),
     path('analytics/', views.analytics_view, name='analytics'),
+    path('api/analytics/', views.analytics_api, name='analytics_api'),
+    path('api/import/', views.import_entries_api, name='import_entries'),
+    path('api/analyzer-status/', views.analyzer_status, name='analyzer_status'),
     path('export-pdf/', views.export_data_pdf, name='export_pdf'),
+    path('export/<str:fmt>/', views.export_analyses, name='export_analyses'),
+    path('reports/', views.enqueue_report_view, name='report_enqueue'),
+    path('reports/<int:job_id>/', views.report_status_view, name='report_status'),
+    path('reports/<int:job_id>/download/', views.report_download_view, name='report_download'),
 ]
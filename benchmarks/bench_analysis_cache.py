@@ -0,0 +1,87 @@
+# benchmarks/bench_analysis_cache.py
+"""
+Analysis result cache on a workload of re-submitted journal texts.
+
+Replays --submissions texts, a --repeat share of which re-submit an
+earlier text (sometimes with different spacing), through the 'api' engine
+against the local inference stub (--latency ms per call, standing in for
+the paid Hugging Face API):
+
+    uncached  MoodAnalyzer.analyze_text_api for every submission
+    cached    MoodAnalyzer.analyze(text, engine='api')
+
+and prints API calls made, cache hit rate and mean ms per submission.
+
+Run from the project root:
+    python benchmarks/bench_analysis_cache.py [--submissions 2000 --repeat 0.4 --latency 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from analysis.inference import inference_client  # noqa: E402
+from analysis.inference_stub import StubInferenceServer  # noqa: E402
+from analysis.result_cache import get_analysis_cache, reset_analysis_cache  # noqa: E402
+from analysis.services import MoodAnalyzer  # noqa: E402
+from bench_chatbot_router import build_corpus  # noqa: E402
+
+
+def build_workload(submissions, repeat, seed=5):
+    rng = random.Random(seed)
+    fresh = iter(f"{text} (entry {i})" for i, text in enumerate(build_corpus(submissions, seed=seed)))
+    texts = []
+    for _ in range(submissions):
+        if texts and rng.random() < repeat:
+            text = rng.choice(texts)
+            texts.append(text.replace(' ', '  ', 1) if rng.random() < 0.5 else text)
+        else:
+            texts.append(next(fresh))
+    return texts
+
+
+def run(stub, analyze, texts):
+    stub.requests = 0
+    start = time.perf_counter()
+    for text in texts:
+        analyze(text)
+    seconds = time.perf_counter() - start
+    return stub.requests, seconds / len(texts) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=2000)
+    parser.add_argument('--repeat', type=float, default=0.4, help='share of submissions that re-submit a text')
+    parser.add_argument('--latency', type=float, default=20.0, help='ms per API call')
+    args = parser.parse_args()
+
+    texts = build_workload(args.submissions, args.repeat)
+    with StubInferenceServer(latency=args.latency / 1000) as stub, \
+            override_settings(HF_INFERENCE={'API_URL': stub.url}):
+        inference_client.cache_clear()
+        cache.clear()
+        reset_analysis_cache()
+        print(f"{len(texts)} submissions, {args.repeat:.0%} re-submitted, {args.latency} ms per API call")
+        print(f"  {'':9s} {'API calls':>10s} {'hit rate':>9s} {'ms/text':>8s}")
+        calls, ms = run(stub, MoodAnalyzer.analyze_text_api, texts)
+        print(f"  {'uncached':9s} {calls:10d} {'':>9s} {ms:8.2f}")
+        calls, ms = run(stub, lambda text: MoodAnalyzer.analyze(text, engine='api'), texts)
+        print(f"  {'cached':9s} {calls:10d} {get_analysis_cache().stats()['hit_rate']:9.1%} {ms:8.2f}")
+        inference_client.cache_clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_analytics_rollups.py
+"""
+Analytics page cost as one user's analyses grow: raw scans vs daily rollups.
+
+Seeds users with --sizes analyses each, spread over three years, backfills
+the rollups and times:
+
+    page         GET /analysis/analytics/?range=<--range> through the test
+                 client (points: trend points in its payload)
+    old queries  the pie and 30-day trend queries the view used to run on
+                 MoodAnalysis (GROUP BY mood over every row, TruncDate
+                 GROUP BY over the window)
+    rollups      the same two queries on MoodDailyRollup
+
+Runs against a throwaway test database created from the configured one.
+
+Run from the project root:
+    python benchmarks/bench_analytics_rollups.py [--sizes 1000,10000,100000 --repeat 100 --range all]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Sum  # noqa: E402
+from django.db.models.functions import TruncDate  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from analysis.models import MoodAnalysis, MoodDailyRollup  # noqa: E402
+from analysis.rollups import rebuild_rollups  # noqa: E402
+
+MOODS = [mood for mood, _label in MoodAnalysis.MOOD_CHOICES]
+
+
+def seed(user, size, batch=10_000):
+    now = timezone.now()
+    step = timedelta(days=3 * 365) / size
+    for start in range(0, size, batch):
+        analyses = MoodAnalysis.objects.bulk_create(
+            MoodAnalysis(user=user, text=f"entry {i}", detected_mood=MOODS[i % len(MOODS)], confidence=0.8)
+            for i in range(start, min(start + batch, size))
+        )
+        for i, analysis in enumerate(analyses, start):
+            analysis.created_at = now - step * i
+        MoodAnalysis.objects.bulk_update(analyses, ['created_at'])
+    rebuild_rollups([user.id])
+
+
+def timed(function, repeat):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--range', default='30d', help='7d, 30d, 90d, 1y or all')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        url = reverse('analysis:analytics')
+        print(f"ms per request ({connection.vendor})")
+        print(f"  {'analyses':>9s} {'rollup rows':>12s} {'points':>7s} {'page':>8s} {'old queries':>12s} "
+              f"{'rollups':>8s}")
+        for size in (int(size) for size in args.sizes.split(',')):
+            user = User.objects.create_user(username=f'analytics{size}', password='x')
+            seed(user, size)
+            client = Client()
+            client.force_login(user)
+            since = timezone.now() - timedelta(days=30)
+            today = timezone.localdate()
+
+            def old_queries():
+                analyses = MoodAnalysis.objects.filter(user=user)
+                list(analyses.values('detected_mood').annotate(count=Count('detected_mood')).order_by('-count'))
+                list(analyses.filter(created_at__gte=since).annotate(date=TruncDate('created_at'))
+                     .values('date', 'detected_mood').annotate(count=Count('id')).order_by('date'))
+
+            def rollup_queries():
+                rollups = MoodDailyRollup.objects.filter(user=user)
+                list(rollups.values('mood').annotate(count=Sum('count')).order_by('-count'))
+                list(rollups.filter(day__gte=today - timedelta(days=30)).values_list('day', 'mood', 'count')
+                     .order_by('day'))
+
+            results = [
+                timed(lambda: client.get(url, {'range': args.range}), args.repeat),
+                timed(old_queries, args.repeat),
+                timed(rollup_queries, args.repeat),
+            ]
+            rows = MoodDailyRollup.objects.filter(user=user).count()
+            points = client.get(url, {'range': args.range}).context['trend_points']
+            print(f"  {size:9d} {rows:12d} {points:7d} " + ' '.join(f"{value:{width}.2f}" for value, width in zip(results, (8, 12, 8))))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
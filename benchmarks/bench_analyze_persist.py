@@ -0,0 +1,98 @@
+# benchmarks/bench_analyze_persist.py
+"""
+Dashboard analyze-and-save: two requests vs analyze-ajax/?persist=1.
+
+Sends --entries journal entries of about --words words through the
+analysis views (Django test client, logged in):
+
+    two requests  POST analyze-ajax/, then POST save-analysis-ajax/ with
+                  the text and the result, as the dashboard used to
+    persist       POST analyze-ajax/?persist=1
+
+and prints requests, bytes uploaded and ms per saved entry.
+
+Runs against a throwaway test database.
+
+Run from the project root:
+    python benchmarks/bench_analyze_persist.py [--entries 500 --words 150]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from analysis.models import MoodAnalysis  # noqa: E402
+from bench_mood_lexicon import build_entries  # noqa: E402
+
+
+def post(client, url, payload):
+    body = json.dumps(payload)
+    response = client.post(url, body, content_type='application/json').json()
+    assert response['success'], response
+    return response, len(body)
+
+
+def two_requests(client, text):
+    response, sent = post(client, reverse('analysis:analyze_ajax'), {'text': text})
+    data = response['data']
+    _response, saved = post(client, reverse('analysis:save_analysis_ajax'), {
+        'text': text, 'mood_key': data['mood_key'], 'confidence': data['confidence'], 'emotions': data['emotions'],
+    })
+    return 2, sent + saved
+
+
+def persist(client, text):
+    _response, sent = post(client, reverse('analysis:analyze_ajax') + '?persist=1', {'text': text})
+    return 1, sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=500)
+    parser.add_argument('--words', type=int, default=150)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        client = Client()
+        client.force_login(User.objects.create_user(username='bench', password='x'))
+        entries = build_entries(args.entries, args.words)
+        persist(client, entries[0])  # warm up imports and connections
+
+        print(f"{args.entries} entries of ~{args.words} words ({connection.vendor})")
+        print(f"  {'':13s} {'requests':>9s} {'bytes up':>9s} {'ms/entry':>9s}")
+        for name, flow in (('two requests', two_requests), ('persist', persist)):
+            MoodAnalysis.objects.all().delete()
+            requests = uploaded = 0
+            start = time.perf_counter()
+            for text in entries:
+                sent_requests, sent_bytes = flow(client, text)
+                requests += sent_requests
+                uploaded += sent_bytes
+            seconds = time.perf_counter() - start
+            assert MoodAnalysis.objects.count() == len(entries)
+            print(f"  {name:13s} {requests / len(entries):9.0f} {uploaded / len(entries):9.0f} "
+                  f"{seconds / len(entries) * 1000:9.2f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
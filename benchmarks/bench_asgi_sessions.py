@@ -0,0 +1,258 @@
+# benchmarks/bench_asgi_sessions.py
+"""
+Concurrent chat sessions one worker sustains: ASGI (async views) vs WSGI.
+
+Each simulated session is a logged-in user who posts to /chatbot/send/,
+waits for the reply, then thinks for about --think seconds. Sessions are
+driven in-process against Django's own handlers:
+
+    WSGI  the synchronous send_message (as before the async views) behind
+          WSGIHandler, served by a pool of --threads threads (one gthread
+          worker; requests beyond that queue)
+    ASGI  the async send_message behind ASGIHandler on one event loop
+
+Every SQL statement is delayed by --db-latency ms to stand in for the round
+trip to a real database server. Sessions ramp up level by level; a level is
+sustained while the p95 reply time stays under --slo ms with no errors.
+
+Runs against a throwaway file-backed test database.
+
+Run from the project root:
+    python benchmarks/bench_asgi_sessions.py [--threads 8 --db-latency 5 --think 2 --slo 250]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.decorators import login_required  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.http import JsonResponse  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import path  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from django.views.decorators.csrf import csrf_exempt  # noqa: E402
+from django.views.decorators.http import require_POST  # noqa: E402
+
+from bench_chatbot_router import build_corpus  # noqa: E402
+from chatbot import urls as chatbot_urls  # noqa: E402
+from chatbot.models import ChatMessage  # noqa: E402
+from chatbot.services import MindTrackChatbot  # noqa: E402
+from chatbot.state import reset_state_backend  # noqa: E402
+from chatbot.views import NEPAL_TZ  # noqa: E402
+
+SEND_PATH = '/chatbot/send/'
+
+
+@login_required
+@require_POST
+@csrf_exempt
+def sync_send_message(request):
+    """The synchronous send_message the async view replaced (error handling trimmed)"""
+    data = json.loads(request.body)
+    user_message = data.get('message', '').strip()
+    mood_context = data.get('mood_context', None)
+    reply = MindTrackChatbot.reply(user_message, mood_context, user_id=request.user.id)
+    mood_context = mood_context or reply.mood
+    with transaction.atomic():
+        user_chat, bot_chat = ChatMessage.objects.bulk_create([
+            ChatMessage(user=request.user, message=user_message, is_user=True, mood_context=mood_context),
+            ChatMessage(user=request.user, message=reply.response, is_user=False,
+                        mood_context=mood_context, intent_detected=reply.intent),
+        ])
+    local_time = timezone.localtime(bot_chat.created_at, NEPAL_TZ)
+    return JsonResponse({
+        'success': True,
+        'response': reply.response,
+        'mood_context': mood_context,
+        'intent_detected': reply.intent,
+        'timestamp': local_time.strftime('%H:%M'),
+        'message_id': user_chat.id
+    })
+
+
+def urlconf(view):
+    module = types.ModuleType(f'bench_urls_{view.__name__}')
+    module.urlpatterns = [path(SEND_PATH.lstrip('/'), view)]
+    return module
+
+
+def add_db_latency(latency):
+    def delay(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+
+
+class WSGIServer:
+    """WSGIHandler behind a fixed pool of request threads"""
+
+    def __init__(self, threads):
+        self.handler = WSGIHandler()
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def _call(self, cookie, body):
+        environ = {
+            'REQUEST_METHOD': 'POST', 'PATH_INFO': SEND_PATH, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie, 'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)), 'wsgi.input': BytesIO(body), 'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False, 'wsgi.version': (1, 0),
+        }
+        status = []
+        chunks = self.handler(environ, lambda line, headers, exc_info=None: status.append(line))
+        b''.join(chunks)
+        chunks.close()
+        return int(status[0].split()[0])
+
+    async def post(self, cookie, body):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, self._call, cookie, body)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class ASGIServer:
+    """ASGIHandler called directly on the running event loop"""
+
+    def __init__(self):
+        self.handler = ASGIHandler()
+
+    async def post(self, cookie, body):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+            'scheme': 'http', 'path': SEND_PATH, 'raw_path': SEND_PATH.encode(), 'query_string': b'',
+            'root_path': '', 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode()),
+                        (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        status = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()  # no disconnect until the response is sent
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await self.handler(scope, receive, send)
+        return status[0]
+
+    def close(self):
+        pass
+
+
+async def run_level(server, sessions, cookies, corpus, think, seconds):
+    latencies, errors = [], [0]
+    deadline = time.perf_counter() + seconds
+
+    async def session(number):
+        rng = random.Random(number)
+        cookie = cookies[number % len(cookies)]
+        # Stagger the first requests over one think time
+        await asyncio.sleep(rng.uniform(0, think))
+        while time.perf_counter() < deadline:
+            body = json.dumps({'message': rng.choice(corpus)}).encode()
+            start = time.perf_counter()
+            try:
+                status = await server.post(cookie, body)
+            except Exception:
+                status = 500
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[0] += 1
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+
+    await asyncio.gather(*(session(number) for number in range(sessions)))
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else float('inf')
+    return len(latencies) / seconds, p95, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='WSGI request threads')
+    parser.add_argument('--db-latency', type=float, default=5.0, help='ms added to every SQL statement')
+    parser.add_argument('--think', type=float, default=2.0, help='mean seconds between a session\'s messages')
+    parser.add_argument('--slo', type=float, default=250.0, help='p95 reply time (ms) a level must meet')
+    parser.add_argument('--seconds', type=float, default=6.0, help='duration of each level')
+    parser.add_argument('--levels', default='25,50,100,200,400,800')
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    handle, test_db = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    connection.settings_dict['TEST']['NAME'] = test_db
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        cookies = []
+        for i in range(args.users):
+            client = Client()
+            client.force_login(User.objects.create_user(username=f'session{i}', password='x'))
+            cookies.append(f"sessionid={client.cookies['sessionid'].value}")
+        connection.close()
+        add_db_latency(args.db_latency / 1000)
+        corpus = build_corpus(500)
+        levels = [int(level) for level in args.levels.split(',')]
+
+        print(f"think {args.think}s, {args.db_latency} ms per SQL statement, p95 SLO {args.slo:.0f} ms "
+              f"({connection.vendor})")
+        for name, view, make_server in (
+            (f'WSGI, {args.threads} threads', sync_send_message, lambda: WSGIServer(args.threads)),
+            ('ASGI, one event loop', chatbot_urls.views.send_message, ASGIServer),
+        ):
+            print(f"  {name}")
+            sustained = 0
+            with override_settings(ROOT_URLCONF=urlconf(view)):
+                server = make_server()
+                try:
+                    for level in levels:
+                        reset_state_backend()
+                        rate, p95, errors = asyncio.run(
+                            run_level(server, level, cookies, corpus, args.think, args.seconds))
+                        ok = p95 * 1000 <= args.slo and not errors
+                        print(f"    {level:5d} sessions  {rate:7.1f} msg/s  p95 {p95 * 1000:8.1f} ms  "
+                              f"errors {errors:4d}  {'ok' if ok else 'over SLO'}")
+                        if not ok:
+                            break
+                        sustained = level
+                finally:
+                    server.close()
+            print(f"    sustained: {sustained} sessions")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_batch_api.py
+"""
+Single-item vs batch entry points on batches of --size texts.
+
+    MoodAnalyzer.analyze_text_simulated (loop)  vs  MoodAnalyzer.analyze_many
+    MindTrackChatbot.reply (loop)                vs  MindTrackChatbot.respond_many
+
+Analysis runs on chat-length messages (as generated, with repeats, and made
+unique) and on ~--words word journal entries;
+the chatbot replays chat messages from --users users. Results are checked to
+be identical before timings are printed.
+
+Run from the project root:
+    python benchmarks/bench_batch_api.py [--size 10000 --users 500 --words 400]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from analysis.services import MoodAnalyzer  # noqa: E402
+from bench_chatbot_router import build_corpus  # noqa: E402
+from bench_mood_lexicon import build_entries  # noqa: E402
+from chatbot.services import MindTrackChatbot  # noqa: E402
+from chatbot.state import reset_state_backend  # noqa: E402
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def report(name, size, single, batch):
+    print(f"  {name:30s} single {size / single:10,.0f}/s   batch {size / batch:10,.0f}/s   "
+          f"{single / batch:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=10_000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--words', type=int, default=400)
+    args = parser.parse_args()
+
+    print(f"batches of {args.size}")
+    for name, texts in (
+        ('analysis, chat messages', build_corpus(args.size)),
+        ('analysis, unique messages', [f"{text} #{i}" for i, text in enumerate(build_corpus(args.size))]),
+        (f'analysis, {args.words}-word entries', build_entries(args.size, args.words)),
+    ):
+        single, single_time = timed(lambda: [MoodAnalyzer.analyze_text_simulated(text) for text in texts])
+        batch, batch_time = timed(MoodAnalyzer.analyze_many, texts)
+        assert single == batch
+        report(name, args.size, single_time, batch_time)
+
+    rng = random.Random(1)
+    messages = [(rng.randrange(args.users), message) for message in build_corpus(args.size)]
+    # Same per-user order as respond_many, so the seeded replies must match
+    first_seen = {}
+    for position, (user_id, _message) in enumerate(messages):
+        first_seen.setdefault(user_id, position)
+    grouped = sorted(range(len(messages)), key=lambda position: (first_seen[messages[position][0]], position))
+
+    reset_state_backend()
+    random.seed(9)
+    single = [None] * len(messages)
+
+    def run_single():
+        for position in grouped:
+            user_id, message = messages[position]
+            single[position] = MindTrackChatbot.reply(message, user_id=user_id)
+
+    _, single_time = timed(run_single)
+    reset_state_backend()
+    random.seed(9)
+    batch, batch_time = timed(MindTrackChatbot.respond_many, messages)
+    assert single == batch
+    report(f'chatbot, {args.users} users', args.size, single_time, batch_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_bulk_reports.py
+"""
+Bulk report generation throughput by number of worker processes.
+
+Seeds --users users with --entries analyses each and renders every
+user's report with analysis.bulk_reports.generate_reports() (what
+`manage.py generate_bulk_reports` runs) into a fresh directory once per
+--processes value, printing reports/s, pages/s and the speedup over one
+process. Scaling is bounded by the cores available (os.cpu_count() is
+printed) and, on SQLite, by concurrent readers of one file.
+
+Runs against a throwaway file-backed test database, so worker processes
+can open it.
+
+Run from the project root:
+    python benchmarks/bench_bulk_reports.py [--users 64 --entries 100 --processes 1,2,4,8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from analysis.bulk_reports import generate_reports  # noqa: E402
+from analysis.jobs import report_params  # noqa: E402
+from analysis.models import MoodAnalysis  # noqa: E402
+from analysis.rollups import rebuild_rollups  # noqa: E402
+
+MOODS = [mood for mood, _label in MoodAnalysis.MOOD_CHOICES]
+
+
+def seed(users, entries):
+    user_ids = []
+    for number in range(users):
+        user = User.objects.create_user(username=f'bulk{number}', password='x')
+        MoodAnalysis.objects.bulk_create(
+            MoodAnalysis(user=user, text=f"entry {i}: a short note about how the day went.",
+                         detected_mood=MOODS[i % len(MOODS)], confidence=0.8,
+                         emotions={'happy': f"{i % 100}.0%", 'sad': '10.0%'})
+            for i in range(entries)
+        )
+        user_ids.append(user.id)
+    rebuild_rollups(user_ids)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=64)
+    parser.add_argument('--entries', type=int, default=100, help='analyses per user')
+    parser.add_argument('--processes', default='1,2,4,8')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    handle, test_db = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    connection.settings_dict['TEST']['NAME'] = test_db
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user_ids = seed(args.users, args.entries)
+        params = report_params()
+
+        print(f"{args.users} users x {args.entries} entries, {os.cpu_count()} CPU(s) ({connection.vendor})")
+        print(f"  {'processes':>9s} {'reports/s':>10s} {'pages/s':>9s} {'speedup':>8s}")
+        baseline = None
+        for processes in (int(value) for value in args.processes.split(',')):
+            with tempfile.TemporaryDirectory() as directory:
+                start = time.perf_counter()
+                records = generate_reports(user_ids, directory, params, processes=processes)
+                seconds = time.perf_counter() - start
+            failed = [record for record in records if record['status'] != 'done']
+            if failed:
+                raise SystemExit(f"{len(failed)} report(s) failed: {failed[0]['error']}")
+            rate = len(records) / seconds
+            baseline = baseline or rate
+            pages = sum(record['pages'] for record in records)
+            print(f"  {processes:9d} {rate:10.2f} {pages / seconds:9.1f} {rate / baseline:7.2f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
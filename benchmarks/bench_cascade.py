@@ -0,0 +1,125 @@
+# benchmarks/bench_cascade.py
+"""
+Cascade analyzer: how many texts reach the expensive engine, latency and accuracy.
+
+Analyzes the hand-labelled sample corpus (--data, text,mood CSV as read
+by train_mood_classifier) one text per call, the way the views do, with
+the result cache off:
+
+    lexicon      MoodAnalyzer 'simulated' engine only
+    <engine>     the expensive engine only ('api' or 'local')
+    cascade m    'cascade' with MIN_MARGIN m, for each of --margins
+
+and prints the share of texts sent to the expensive engine, mean and p95
+ms per text and accuracy against the labels (overall, and of the texts
+the lexicon kept). --engine api uses the local stub with --latency ms per
+call unless --url points at a real endpoint (HF_API_KEY from the
+environment); the stub labels texts with the lexicon itself, so accuracy
+of escalated texts only means something with --url or --engine local
+(trained on generated messages labelled by the lexicon, as in
+bench_mood_classifier.py).
+
+Run from the project root:
+    python benchmarks/bench_cascade.py [--engine api --latency 50 --margins 0.1,0.3,0.5 --rounds 3]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+
+from analysis.breaker import reset_remote_breaker  # noqa: E402
+from analysis.classifier import MoodClassifier, reset_classifier  # noqa: E402
+from analysis.inference import inference_client  # noqa: E402
+from analysis.inference_stub import StubInferenceServer  # noqa: E402
+from analysis.result_cache import reset_analysis_cache  # noqa: E402
+from analysis.services import MoodAnalyzer  # noqa: E402
+from bench_chatbot_router import build_corpus  # noqa: E402
+from utils.lexicon import ANALYSIS_LEXICON  # noqa: E402
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'mood_sample.csv')
+
+
+def read_sample(path):
+    with open(path, newline='', encoding='utf-8') as handle:
+        return [(row['text'], row['mood']) for row in csv.DictReader(handle)]
+
+
+def run(name, engine, sample, rounds, cascade=None):
+    analyzer = dict(cascade and {'CASCADE': cascade} or {}, ENGINE=engine)
+    with override_settings(MOOD_ANALYZER=analyzer):
+        latencies = []
+        results = []
+        for _round in range(rounds):
+            results = []
+            for text, _mood in sample:
+                start = time.perf_counter()
+                results.append(MoodAnalyzer.analyze(text))
+                latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    heavy = {'simulated': 0.0, 'cascade': None}.get(engine, 1.0)
+    if heavy is None:
+        heavy = sum(result['stage'] != 'simulated' for result in results) / len(results)
+    correct = [result['detected_mood'] == mood for result, (_text, mood) in zip(results, sample)]
+    kept = [ok for ok, result in zip(correct, results) if result.get('stage', engine) == 'simulated']
+    print(f"  {name:14s} {heavy:10.1%} {sum(latencies) / len(latencies) * 1000:8.2f} "
+          f"{latencies[int(len(latencies) * 0.95)] * 1000:8.2f} {sum(correct) / len(correct):9.1%} "
+          f"{(f'{sum(kept) / len(kept):.1%}' if kept else '-'):>10s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=SAMPLE, help='labelled text,mood CSV')
+    parser.add_argument('--engine', choices=['api', 'local'], default='api')
+    parser.add_argument('--latency', type=float, default=50.0, help='ms the stub adds to every call')
+    parser.add_argument('--url', help='real inference endpoint instead of the stub')
+    parser.add_argument('--margins', default='0.1,0.3,0.5')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    sample = read_sample(args.data)
+    margins = [float(margin) for margin in args.margins.split(',')]
+    with ExitStack() as stack:
+        stack.enter_context(override_settings(ANALYSIS_CACHE={'MAX_ENTRIES': 0, 'CACHE_ALIAS': None}))
+        if args.engine == 'api':
+            url = args.url or stack.enter_context(StubInferenceServer(latency=args.latency / 1000)).url
+            stack.enter_context(override_settings(HF_INFERENCE={'API_URL': url,
+                                                                'API_KEY': os.environ.get('HF_API_KEY', '')}))
+            inference_client.cache_clear()
+            reset_remote_breaker()
+        else:
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+            path = os.path.join(directory, 'classifier.npy')
+            texts = [f"{text} #{i}" for i, text in enumerate(build_corpus(20_000, seed=3))]
+            labels = [result['detected_mood'] for result in MoodAnalyzer.analyze_many(texts)]
+            MoodClassifier.train(texts, labels, ANALYSIS_LEXICON.moods, bits=18, epochs=5).save(path)
+            stack.enter_context(override_settings(MOOD_CLASSIFIER={'PATH': path}))
+            reset_classifier()
+        reset_analysis_cache()
+
+        print(f"{len(sample)} labelled texts x {args.rounds}; expensive engine: {args.engine}"
+              + (f" ({args.url or f'stub, {args.latency:.0f} ms per call'})" if args.engine == 'api' else ''))
+        print(f"  {'':14s} {'expensive':>10s} {'mean ms':>8s} {'p95 ms':>8s} {'accuracy':>9s} {'lexicon ok':>10s}")
+        run('lexicon', 'simulated', sample, args.rounds)
+        run(args.engine, args.engine, sample, args.rounds)
+        for margin in margins:
+            run(f'cascade {margin:g}', 'cascade', sample, args.rounds,
+                cascade={'ENGINE': args.engine, 'MIN_MARGIN': margin})
+        reset_analysis_cache()
+        reset_classifier()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_chat_history.py
+"""
+Chat history latency as one user's history grows.
+
+Seeds users with --sizes messages each and times requests to
+/chatbot/history/ through the test client (middleware and auth included):
+
+    newest page       no cursor
+    deep page         ?before=<id in the middle of the history>
+    delta poll        ?since=<newest id - 2>
+    idle poll (304)   ?since=<newest id> with a matching If-None-Match
+
+plus the query the view used to run (the oldest 50 by created_at).
+
+Runs against a throwaway test database created from the configured one.
+
+Run from the project root:
+    python benchmarks/bench_chat_history.py [--sizes 1000,10000,100000 --repeat 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from chatbot.models import ChatMessage  # noqa: E402
+
+
+def seed(user, size, batch=10_000):
+    for start in range(0, size, batch):
+        ChatMessage.objects.bulk_create(
+            ChatMessage(user=user, message=f"message {i}", is_user=i % 2 == 0, mood_context='neutral')
+            for i in range(start, min(start + batch, size))
+        )
+    return list(ChatMessage.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+
+
+def timed(function, repeat):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        url = reverse('chatbot:get_history')
+        print(f"ms per request ({connection.vendor})")
+        print(f"  {'messages':>9s} {'newest page':>12s} {'deep page':>10s} {'delta poll':>11s} "
+              f"{'idle 304':>9s} {'old query':>10s}")
+        for size in (int(size) for size in args.sizes.split(',')):
+            user = User.objects.create_user(username=f'history{size}', password='x')
+            ids = seed(user, size)
+            client = Client()
+            client.force_login(user)
+            etag = client.get(url, {'since': ids[-1]})['ETag']
+
+            def old_query():
+                list(ChatMessage.objects.filter(user=user).order_by('created_at')[:50])
+
+            results = [
+                timed(lambda: client.get(url), args.repeat),
+                timed(lambda: client.get(url, {'before': ids[len(ids) // 2]}), args.repeat),
+                timed(lambda: client.get(url, {'since': ids[-3]}), args.repeat),
+                timed(lambda: client.get(url, {'since': ids[-1]}, HTTP_IF_NONE_MATCH=etag), args.repeat),
+                timed(old_query, args.repeat),
+            ]
+            print(f"  {size:9d} " + ' '.join(f"{value:{width}.2f}" for value, width in zip(results, (12, 10, 11, 9, 10))))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
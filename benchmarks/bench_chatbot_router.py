@@ -0,0 +1,129 @@
+# benchmarks/bench_chatbot_router.py
+"""
+Per-message routing latency: legacy substring if-cascade vs compiled router.
+
+Run from the project root:
+    python benchmarks/bench_chatbot_router.py [--repeat 20]
+
+Only the text scanning is measured (mood detection plus intent selection),
+not response formatting or content selection.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot.router import route  # noqa: E402
+
+OPENERS = ["", "hey, ", "hi! ", "so ", "honestly ", "ugh, ", "well, "]
+BODIES = [
+    "I've been feeling really lonely since I moved to the city",
+    "can you play a song that fits my mood",
+    "I'm so tired after work, any exercise suggestion?",
+    "how to overcome fear of public speaking",
+    "give me a nepali quote about motivation",
+    "नेपाली poem please",
+    "I need a quote, something uplifting",
+    "write me a poem about the rain and feeling calm",
+    "how are you today",
+    "I failed my exam and I'm really sad and angry at myself",
+    "today was fine I guess, nothing special happened at the office",
+    "my friend got a new job and I'm happy for her but also a bit anxious",
+    "what should I read this week? I just finished a book about history",
+    "I'm nervous about the interview tomorrow morning",
+    "thank you, that really helped",
+    "ok bye for now",
+]
+CLOSERS = ["", ".", "!", " 😊", " please", " thanks"]
+
+
+def build_corpus(size, seed=7):
+    rng = random.Random(seed)
+    return [rng.choice(OPENERS) + rng.choice(BODIES) + rng.choice(CLOSERS) for _ in range(size)]
+
+
+def legacy_route(user_message):
+    """The scanning work get_response/analyze_mood_from_text did before the router"""
+    text_lower = user_message.lower()
+    mood = None
+    if any(k in text_lower for k in ['motivat', 'inspire', 'encourag', 'need motivation', 'want motivation', 'give me motivation']):
+        mood = 'motivational'
+    elif 'lonely' in text_lower or 'alone' in text_lower:
+        mood = 'lonely'
+    elif 'tired' in text_lower or 'exhausted' in text_lower:
+        mood = 'tired'
+    elif 'anxious' in text_lower or 'anxiety' in text_lower or 'fear' in text_lower or 'scared' in text_lower or 'nervous' in text_lower:
+        mood = 'anxious'
+    elif 'angry' in text_lower or 'mad' in text_lower:
+        mood = 'angry'
+    elif 'happy' in text_lower or 'joy' in text_lower:
+        mood = 'happy'
+    elif 'sad' in text_lower or 'unhappy' in text_lower:
+        mood = 'sad'
+    elif 'okay' in text_lower or 'fine' in text_lower or 'ok' in text_lower:
+        mood = 'neutral'
+
+    user_message_lower = user_message.lower().strip()
+    is_nepali_request = 'nepali' in user_message_lower or 'नेपाली' in user_message_lower
+    if any(w in user_message_lower for w in ['song', 'music', 'youtube', 'playlist', 'listen']):
+        intent = 'music'
+    elif any(w in user_message_lower for w in ['exercise', 'workout', 'activity', 'tip', 'suggestion', 'physical']):
+        intent = 'exercise'
+    elif user_message_lower.startswith('how to') or 'how do i' in user_message_lower:
+        intent = 'how_to'
+    elif is_nepali_request and 'quote' in user_message_lower:
+        intent = 'nepali_quote'
+    elif is_nepali_request and ('poem' in user_message_lower or 'poetry' in user_message_lower):
+        intent = 'nepali_poem'
+    elif 'quote' in user_message_lower or 'quotes' in user_message_lower:
+        intent = 'quote'
+    elif 'poem' in user_message_lower or 'poetry' in user_message_lower:
+        intent = 'poem'
+    elif 'how are you' in user_message_lower:
+        intent = 'how_are_you'
+    elif any(g in user_message_lower for g in ['hello', 'hi', 'hey', 'greetings', 'how you doing', 'how you doin', 'how ya doing']):
+        intent = 'greeting'
+    else:
+        intent = None
+    # _update_state scanned the message once more for the cheer-up check
+    cheer = 'cheer' in user_message.lower() or 'up' in user_message.lower()
+    return intent, mood, cheer
+
+
+def compiled_route(user_message):
+    r = route(user_message)
+    return r.intent, r.mood, r.has('cheer', 'up')
+
+
+def bench(fn, corpus, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in corpus:
+            fn(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(corpus)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+    legacy = bench(legacy_route, corpus, args.repeat)
+    compiled = bench(compiled_route, corpus, args.repeat)
+    changed = sum(1 for m in corpus if legacy_route(m)[:2] != compiled_route(m)[:2])
+
+    print(f"messages:        {len(corpus)}")
+    print(f"legacy cascade:  {legacy * 1e6:8.2f} us/message")
+    print(f"compiled router: {compiled * 1e6:8.2f} us/message")
+    print(f"speedup:         {legacy / compiled:8.2f}x")
+    print(f"routing changed: {changed} messages (word-boundary fixes such as 'hi' in 'this')")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_content_catalog.py
+"""
+Per-worker memory and lookup cost: Python content literals vs the mmap catalog.
+
+Grows every shipped category --scale times, then compares the Python heap
+held by the equivalent literals with the heap held by an opened catalog
+(whose items stay in the shared page cache), and times random lookups.
+
+Run from the project root:
+    python benchmarks/bench_content_catalog.py [--scale 200 --lookups 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from chatbot.catalog import ContentCatalog, resource_entries, write_catalog  # noqa: E402
+
+
+def grown_entries(scale):
+    entries = []
+    for language, category, mood, kind, items in resource_entries():
+        if kind == 'json':
+            grown = [dict(item, id=f"{item['id']}-{copy}") for copy in range(scale) for item in items]
+        else:
+            grown = [f"{item} #{copy}" for copy in range(scale) for item in items]
+        entries.append((language, category, mood, kind, grown))
+    return entries
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, default=200)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'catalog.bin')
+        write_catalog(path, grown_entries(args.scale))
+        size = os.path.getsize(path)
+
+        literals, literal_bytes = measure(lambda: {
+            (language, category, mood): items for language, category, mood, _kind, items in grown_entries(args.scale)
+        })
+        catalog, catalog_bytes = measure(lambda: ContentCatalog.open(path))
+        keys = list(literals)
+        item_count = sum(len(items) for items in literals.values())
+        print(f"{item_count} items under {len(keys)} keys, catalog file {size / 1e6:.1f} MB")
+        print(f"  python literals  {literal_bytes / 1e6:8.2f} MB heap per worker")
+        print(f"  mmap catalog     {catalog_bytes / 1e6:8.2f} MB heap per worker")
+
+        rng = random.Random(5)
+        plan = [(key, rng.random()) for key in (rng.choice(keys) for _ in range(args.lookups))]
+        for name, lookup in (
+            ('python literals', lambda key: literals[key]),
+            ('mmap catalog', lambda key: catalog.items(*key)),
+        ):
+            start = time.perf_counter()
+            for key, fraction in plan:
+                items = lookup(key)
+                items[int(fraction * len(items))]
+            elapsed = time.perf_counter() - start
+            print(f"  {name:16s} {elapsed / args.lookups * 1e6:6.2f} us/lookup")
+
+
+if __name__ == '__main__':
+    main()
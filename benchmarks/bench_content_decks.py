@@ -0,0 +1,110 @@
+# benchmarks/bench_content_decks.py
+"""
+Fresh-content rotation: legacy filtered lists vs per-user decks.
+
+Draws --draws items spread over --users simulated users, each draw picking a
+random quote/poem/song category, then the same draws again, and reports
+us/draw of both passes plus the JSON size of the per-user rotation state
+(best of --repeat runs). The first pass also creates a deck for every
+(user, category) it meets, which the three legacy history lists per user do
+not need; the second is steady state, and fails the run if decks draw
+slower than the legacy lists there.
+
+Run from the project root:
+    python benchmarks/bench_content_decks.py [--draws 1000000 --users 10000 --scale 1 --repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import data_resources as resources  # noqa: E402
+from chatbot.decks import draw  # noqa: E402
+
+
+def build_categories(scale):
+    """Shipped content, optionally with every category grown `scale` times"""
+    categories = (
+        [('quote', key, items) for key, items in resources.QUOTE_CATEGORIES.items()]
+        + [('poem', key, items) for key, items in resources.POEM_CATEGORIES.items()]
+        + [('song', key, [r['id'] for r in items]) for key, items in resources.YOUTUBE_RESOURCES.items()]
+    )
+    if scale > 1:
+        categories = [(kind, key, [f"{item} #{copy}" for copy in range(scale) for item in items])
+                      for kind, key, items in categories]
+    return categories
+
+
+HISTORY = {'quote': ('last_quotes_given', 5), 'poem': ('last_poems_given', 5), 'song': ('last_songs_given', 8)}
+
+
+def legacy_draw(state, kind, items):
+    """The list-filtering path _get_fresh_* used before decks"""
+    field, keep = HISTORY[kind]
+    fresh = [item for item in items if item not in state[field]]
+    if not fresh:
+        state[field] = []
+        fresh = items
+    selected = random.choice(fresh)
+    state[field].append(selected)
+    if len(state[field]) > keep:
+        state[field] = state[field][-keep:]
+    return selected
+
+
+def deck_draw(state, kind, key, items):
+    return items[draw(state, f'{kind}:{key}', len(items))]
+
+
+def run(args, categories, use_decks):
+    rng = random.Random(3)
+    plan = [(rng.randrange(args.users), rng.choice(categories)) for _ in range(args.draws)]
+    if use_decks:
+        states = [{'decks': {}} for _ in range(args.users)]  # as new_state() starts
+    else:
+        states = [{'last_quotes_given': [], 'last_poems_given': [], 'last_songs_given': []}
+                  for _ in range(args.users)]
+
+    passes = []
+    for _pass in range(2):
+        start = time.perf_counter()
+        if use_decks:
+            for user, (kind, key, items) in plan:
+                deck_draw(states[user], kind, key, items)
+        else:
+            for user, (kind, _key, items) in plan:
+                legacy_draw(states[user], kind, items)
+        passes.append((time.perf_counter() - start) / args.draws * 1e6)
+
+    state_bytes = sum(len(json.dumps(state)) for state in states) / args.users
+    return passes[1], passes[0], state_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--draws', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--scale', type=int, default=1,
+                        help='grow every category this many times (catalog growth)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    categories = build_categories(args.scale)
+    sizes = sorted(len(items) for _kind, _key, items in categories)
+    print(f"{args.draws} draws across {args.users} users, {len(categories)} categories "
+          f"of {sizes[0]}-{sizes[-1]} items")
+    print(f"  {'':22s} {'first pass':>16s} {'steady state':>16s}")
+    steady = {}
+    for name, use_decks in (('legacy filtered lists', False), ('shuffled decks', True)):
+        steady[use_decks], first, state_bytes = min(run(args, categories, use_decks) for _ in range(args.repeat))
+        print(f"  {name:22s} {first:8.2f} us/draw {steady[use_decks]:8.2f} us/draw  "
+              f"{state_bytes:7.0f} B state/user")
+    assert steady[True] <= steady[False], "decks draw slower than the legacy lists"
+
+
+if __name__ == '__main__':
+    main()
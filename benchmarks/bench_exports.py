@@ -0,0 +1,95 @@
+# benchmarks/bench_exports.py
+"""
+Streaming CSV / NDJSON exports as one user's history grows.
+
+Seeds a user with --sizes chat messages and times
+/chatbot/export/<format>/ through the test client:
+
+    first byte   until the first chunk of the streamed body is available
+    total        until the whole body has been consumed
+    rows/s       rows / total
+    peak MiB     peak memory traced (tracemalloc) while streaming
+
+Chunks are discarded as they arrive, as a client socket would.
+
+Runs against a throwaway test database created from the configured one.
+
+Run from the project root:
+    python benchmarks/bench_exports.py [--sizes 10000,100000,1000000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from chatbot.models import ChatMessage  # noqa: E402
+
+
+def seed(user, size, batch=20_000):
+    for start in range(0, size, batch):
+        ChatMessage.objects.bulk_create(
+            ChatMessage(user=user, message=f"message {i}, how are you feeling today?", is_user=i % 2 == 0,
+                        mood_context='neutral', intent_detected='conversation')
+            for i in range(start, min(start + batch, size))
+        )
+
+
+def stream(client, url, trace):
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url)
+    chunks = iter(response.streaming_content)
+    next(chunks)
+    first = time.perf_counter() - start
+    for _chunk in chunks:
+        pass
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    return first, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        print(f"chat history export ({connection.vendor})")
+        print(f"  {'messages':>9s} {'format':>7s} {'first byte':>11s} {'total':>8s} {'rows/s':>9s} {'peak MiB':>9s}")
+        for size in (int(size) for size in args.sizes.split(',')):
+            user = User.objects.create_user(username=f'export{size}', password='x')
+            seed(user, size)
+            client = Client()
+            client.force_login(user)
+            for fmt in ('csv', 'ndjson'):
+                url = reverse('chatbot:export_history', args=[fmt])
+                first, total, _peak = stream(client, url, trace=False)
+                _first, _total, peak = stream(client, url, trace=True)
+                print(f"  {size:9d} {fmt:>7s} {first * 1000:9.1f}ms {total:7.2f}s {size / total:9.0f} "
+                      f"{peak / 2 ** 20:9.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
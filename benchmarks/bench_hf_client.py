@@ -0,0 +1,81 @@
+# benchmarks/bench_hf_client.py
+"""
+Inference API client throughput and latency against the local stub.
+
+Classifies --texts texts through analysis/inference_stub.py (which adds
+--latency ms per HTTP request, standing in for the network and model):
+
+    naive    requests.post() per text: a new connection every call
+    pooled   InferenceClient, one text per call over a keep-alive session
+    batched  InferenceClient.classify() with --batch-size texts per call
+
+and prints texts/s, p50/p95 per HTTP call and the connections opened.
+No network access is needed.
+
+Run from the project root:
+    python benchmarks/bench_hf_client.py [--texts 2000 --latency 5 --batch-size 32]
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from analysis.inference import InferenceClient  # noqa: E402
+from analysis.inference_stub import StubInferenceServer  # noqa: E402
+from bench_chatbot_router import build_corpus  # noqa: E402
+
+
+def run(name, stub, calls):
+    """Time each call in calls (zero-argument callables returning texts done)"""
+    stub.requests = stub.connections = 0
+    latencies = []
+    texts = 0
+    start = time.perf_counter()
+    for call in calls:
+        began = time.perf_counter()
+        texts += call()
+        latencies.append(time.perf_counter() - began)
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"  {name:8s} {texts / seconds:9.0f} {p50:8.2f} {p95:8.2f} {stub.requests:9d} {stub.connections:12d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=5.0, help='ms the stub adds to every request')
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    texts = build_corpus(args.texts)
+    with StubInferenceServer(latency=args.latency / 1000) as stub:
+        pooled = InferenceClient(url=stub.url, batch_size=1)
+        batched = InferenceClient(url=stub.url, batch_size=args.batch_size)
+        batches = [texts[start:start + args.batch_size] for start in range(0, len(texts), args.batch_size)]
+
+        def naive(text):
+            response = requests.post(stub.url, json={'inputs': text}, timeout=(3.05, 10))
+            response.raise_for_status()
+            return 1
+
+        print(f"{len(texts)} texts, {args.latency} ms per request")
+        print(f"  {'':8s} {'texts/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'requests':>9s} {'connections':>12s}")
+        run('naive', stub, [lambda text=text: naive(text) for text in texts])
+        run('pooled', stub, [lambda text=text: len(pooled.classify([text])) for text in texts])
+        run('batched', stub, [lambda batch=batch: len(batched.classify(batch)) for batch in batches])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_journal_import.py
+"""
+Journal import throughput and memory: analyze_mood per entry vs analysis/ingest.py.
+
+Writes --entries journal entries of about --words words, with timestamps
+spread over five years, to a temporary NDJSON file, then imports them:
+
+    per entry  analyze_mood(text, user) for each line, as the only way in
+               used to be (--baseline entries; timestamps are lost)
+    batch N    import_entries() streaming the file with batches of N
+               (--batch-sizes), timestamps kept, rollups updated
+
+and prints rows/s and queries. Finally it imports the file
+again at a quarter and at the full size under tracemalloc and prints the
+peak of each, which should not grow with the file.
+
+Runs against a throwaway test database.
+
+Run from the project root:
+    python benchmarks/bench_journal_import.py [--entries 20000 --words 60 --baseline 1000 --batch-sizes 100,500,2000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+from analysis.ingest import import_entries, read_entries  # noqa: E402
+from analysis.services import analyze_mood  # noqa: E402
+from bench_mood_lexicon import build_entries  # noqa: E402
+
+
+def write_file(path, count, words):
+    start = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+    with open(path, 'w', encoding='utf-8') as handle:
+        for i, text in enumerate(build_entries(count, words)):
+            moment = start + timedelta(hours=i * 5 * 365 * 24 / count)
+            handle.write(json.dumps({'text': text, 'created_at': moment.isoformat()}) + '\n')
+
+
+def timed(function):
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        rows = function()
+        seconds = time.perf_counter() - start
+    return rows, seconds, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=20_000)
+    parser.add_argument('--words', type=int, default=60)
+    parser.add_argument('--baseline', type=int, default=1000,
+                        help='entries imported one by one (queries are counted up to 9000)')
+    parser.add_argument('--batch-sizes', default='100,500,2000')
+    args = parser.parse_args()
+
+    # DEBUG off: its query log would show up in the memory figures
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    handle, path = tempfile.mkstemp(suffix='.ndjson')
+    os.close(handle)
+    try:
+        write_file(path, args.entries, args.words)
+        print(f"{args.entries} entries of ~{args.words} words, {os.path.getsize(path) / 2**20:.1f} MiB "
+              f"({connection.vendor})")
+        print(f"  {'':12s} {'entries':>8s} {'rows/s':>8s} {'queries':>8s}")
+
+        def per_entry():
+            user = User.objects.create_user(username='per-entry', password='x')
+            with open(path, encoding='utf-8') as source:
+                for line in islice(source, args.baseline):
+                    analyze_mood(json.loads(line)['text'], user)
+            return args.baseline
+
+        rows, seconds, queries = timed(per_entry)
+        print(f"  {'per entry':12s} {rows:8d} {rows / seconds:8.0f} {queries:8d}")
+
+        for size in (int(size) for size in args.batch_sizes.split(',')):
+            def batched():
+                user = User.objects.create_user(username=f'batch-{size}', password='x')
+                with open(path, encoding='utf-8') as source:
+                    return import_entries(user, read_entries(source, 'ndjson'), batch_size=size)['imported']
+
+            rows, seconds, queries = timed(batched)
+            print(f"  {f'batch {size}':12s} {rows:8d} {rows / seconds:8.0f} {queries:8d}")
+
+        for share in (4, 1):
+            user = User.objects.create_user(username=f'memory-{share}', password='x')
+            with open(path, encoding='utf-8') as source:
+                tracemalloc.start()
+                try:
+                    import_entries(user, islice(read_entries(source, 'ndjson'), args.entries // share))
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+            print(f"  peak traced memory importing {args.entries // share} entries: {peak / 2**20:.1f} MiB")
+    finally:
+        os.unlink(path)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
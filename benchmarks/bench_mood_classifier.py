@@ -0,0 +1,101 @@
+# benchmarks/bench_mood_classifier.py
+"""
+Offline mood classifier: training time, latency per text and batch throughput.
+
+Trains analysis/classifier.py on --train generated chat messages (made
+unique), labelled by the keyword analyzer for want of a labelled corpus,
+writes the weights to a temp file and memory-maps them as workers do.
+Then times, on --size chat messages and on ~--words word journal entries:
+
+    single   MoodAnalyzer.analyze_text_local, one text per call (p50/p95 ms)
+    batch    MoodAnalyzer.analyze_many_local on batches of --batch texts
+    lexicon  MoodAnalyzer.analyze_text_simulated, for reference
+
+Run from the project root:
+    python benchmarks/bench_mood_classifier.py [--train 20000 --size 5000 --batch 256 --words 400]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+
+from analysis.classifier import MoodClassifier, reset_classifier  # noqa: E402
+from analysis.models import MoodAnalysis  # noqa: E402
+from analysis.services import MoodAnalyzer  # noqa: E402
+from bench_chatbot_router import build_corpus  # noqa: E402
+from bench_mood_lexicon import build_entries  # noqa: E402
+
+MOODS = [mood for mood, _label in MoodAnalysis.MOOD_CHOICES]
+
+
+def per_call(function, texts):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        function(text)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return (len(texts) / sum(latencies), latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.95)] * 1000)
+
+
+def batched(texts, size):
+    start = time.perf_counter()
+    for first in range(0, len(texts), size):
+        MoodAnalyzer.analyze_many_local(texts[first:first + size])
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--train', type=int, default=20_000)
+    parser.add_argument('--size', type=int, default=5_000)
+    parser.add_argument('--batch', type=int, default=256)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--bits', type=int, default=18)
+    args = parser.parse_args()
+
+    texts = [f"{text} #{i}" for i, text in enumerate(build_corpus(args.train, seed=3))]
+    labels = [result['detected_mood'] for result in MoodAnalyzer.analyze_many(texts)]
+    with tempfile.TemporaryDirectory() as directory, \
+            override_settings(MOOD_CLASSIFIER={'PATH': os.path.join(directory, 'classifier.npy')}):
+        start = time.perf_counter()
+        classifier = MoodClassifier.train(texts, labels, MOODS, bits=args.bits, epochs=5)
+        train_time = time.perf_counter() - start
+        classifier.save(os.path.join(directory, 'classifier.npy'))
+        reset_classifier()
+
+        chat = build_corpus(args.size)
+        agreement = sum(
+            local['detected_mood'] == keyword['detected_mood']
+            for local, keyword in zip(MoodAnalyzer.analyze_many_local(chat), MoodAnalyzer.analyze_many(chat))
+        ) / len(chat)
+        size = os.path.getsize(os.path.join(directory, 'classifier.npy'))
+        print(f"trained on {len(texts)} texts in {train_time:.1f}s; {size / 2**20:.1f} MiB of weights; "
+              f"agrees with the lexicon on {agreement:.1%} of fresh messages")
+
+        print(f"  {'':26s} {'texts/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {f'batch {args.batch}/s':>13s}")
+        for name, corpus in (
+            ('chat messages', chat),
+            (f'{args.words}-word entries', build_entries(min(args.size, 1000), args.words)),
+        ):
+            rate, p50, p95 = per_call(MoodAnalyzer.analyze_text_local, corpus)
+            print(f"  {name:26s} {rate:9.0f} {p50:8.3f} {p95:8.3f} {batched(corpus, args.batch):13.0f}")
+            rate, p50, p95 = per_call(MoodAnalyzer.analyze_text_simulated, corpus)
+            print(f"  {'  lexicon':26s} {rate:9.0f} {p50:8.3f} {p95:8.3f}")
+        reset_classifier()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_mood_lexicon.py
+"""
+Mood scoring throughput on long journal entries: legacy keyword loops vs the
+shared lexicon.
+
+Builds --texts synthetic journal entries of about --words words each and
+reports texts per second for the keyword scan MoodAnalyzer used before
+(dict rebuilt per call, substring test per keyword) and for one pass of
+ANALYSIS_LEXICON.
+
+Run from the project root:
+    python benchmarks/bench_mood_lexicon.py [--texts 2000 --words 400]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.lexicon import ANALYSIS_LEXICON  # noqa: E402
+
+SENTENCES = [
+    "Woke up early and went for a walk along the river before work",
+    "The meeting ran long and I felt really anxious about the deadline",
+    "Had lunch with an old friend, it was so good to catch up",
+    "I'm not happy with how I handled the conversation with my manager",
+    "Spent the evening reading and the house was quiet and calm",
+    "Honestly the day was fine, nothing unexpected happened",
+    "Traffic was terrible and I got frustrated on the way home",
+    "Cooked dinner, called my parents, and felt grateful for them",
+    "I keep worrying about money and it makes it hard to sleep",
+    "We laughed a lot tonight, what a wonderful surprise",
+    "The project review went well and my team seemed excited",
+    "Felt a bit lonely after everyone left the office",
+]
+
+
+def build_entries(count, words, seed=11):
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(count):
+        sentences, length = [], 0
+        while length < words:
+            sentence = rng.choice(SENTENCES)
+            sentences.append(sentence)
+            length += len(sentence.split())
+        entries.append('. '.join(sentences) + '.')
+    return entries
+
+
+def legacy_score(text):
+    """The keyword scan analyze_text_simulated did before the lexicon"""
+    text_lower = text.lower()
+    mood_keywords = {
+        'happy': ['happy', 'joy', 'good', 'great', 'wonderful', 'excited', 'love', 'amazing'],
+        'sad': ['sad', 'unhappy', 'depressed', 'cry', 'tears', 'lonely', 'miserable'],
+        'angry': ['angry', 'mad', 'hate', 'annoyed', 'furious', 'rage', 'angry'],
+        'fear': ['fear', 'scared', 'afraid', 'anxious', 'worried', 'nervous', 'panic'],
+        'neutral': ['okay', 'fine', 'normal', 'alright', 'meh', 'whatever'],
+        'surprise': ['surprise', 'wow', 'shocked', 'unexpected', 'amazing'],
+    }
+    scores = {mood: 0 for mood in mood_keywords}
+    for mood, keywords in mood_keywords.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                scores[mood] += 1
+    intensity_words = ['very', 'really', 'extremely', 'so', 'super']
+    words = text_lower.split()
+    for i, word in enumerate(words):
+        if word in intensity_words and i + 1 < len(words):
+            next_word = words[i + 1]
+            for mood, keywords in mood_keywords.items():
+                if next_word in keywords:
+                    scores[mood] += 2
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=400)
+    args = parser.parse_args()
+
+    entries = build_entries(args.texts, args.words)
+    print(f"{args.texts} journal entries of ~{args.words} words")
+    for name, score in (('legacy keyword loops', legacy_score), ('shared lexicon', ANALYSIS_LEXICON.score)):
+        start = time.perf_counter()
+        for text in entries:
+            score(text)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:22s} {args.texts / elapsed:10,.0f} texts/s  {elapsed / args.texts * 1e6:8.1f} us/text")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_remote_breaker.py
+"""
+Per-request latency of the API analyzer through an outage, with and without the breaker.
+
+Sends --requests single-text analyses per phase to the local stub
+(analysis/inference_stub.py), through four phases:
+
+    healthy    the stub answers in --latency ms
+    down       every request gets a 503
+    slow       the stub answers in --slow ms
+    recovered  back to --latency ms, after the breaker's OPEN_SECONDS
+
+    direct   MoodAnalyzer.analyze_many_api with the client's own timeouts
+             and retries, falling back to the lexicon on InferenceError
+    breaker  MoodAnalyzer.analyze_many_guarded (deadline and circuit
+             breaker), falling back to the lexicon when it returns None
+
+and prints p50/p95/max ms per request, lexicon fallbacks and the HTTP
+requests the stub saw. No network access is needed.
+
+Run from the project root:
+    python benchmarks/bench_remote_breaker.py [--requests 20 --latency 20 --slow 1000 --deadline 0.5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+
+from analysis.breaker import remote_breaker, reset_remote_breaker  # noqa: E402
+from analysis.inference import InferenceError, inference_client  # noqa: E402
+from analysis.inference_stub import StubInferenceServer  # noqa: E402
+from analysis.services import MoodAnalyzer  # noqa: E402
+from bench_chatbot_router import build_corpus  # noqa: E402
+
+OPEN_SECONDS = 1.0
+
+
+def direct(text):
+    try:
+        return MoodAnalyzer.analyze_many_api([text])[0], False
+    except InferenceError:
+        return MoodAnalyzer.analyze_many([text])[0], True
+
+
+def guarded(text):
+    results = MoodAnalyzer.analyze_many_guarded([text])
+    if results is None:
+        return MoodAnalyzer.analyze_many([text])[0], True
+    return results[0], False
+
+
+def phase(stub, analyze, texts):
+    stub.requests = 0
+    latencies = []
+    fallbacks = 0
+    for text in texts:
+        start = time.perf_counter()
+        _result, fell_back = analyze(text)
+        latencies.append(time.perf_counter() - start)
+        fallbacks += fell_back
+    latencies.sort()
+    return (latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000,
+            latencies[-1] * 1000, fallbacks, stub.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20, help='analyses per phase')
+    parser.add_argument('--latency', type=float, default=20.0, help='ms per request while healthy')
+    parser.add_argument('--slow', type=float, default=1000.0, help='ms per request while slow')
+    parser.add_argument('--deadline', type=float, default=0.5, help='seconds per guarded request')
+    args = parser.parse_args()
+
+    texts = iter(f"{text} #{i}" for i, text in enumerate(build_corpus(args.requests * 8 + 1)))
+    breaker = {'MIN_CALLS': 5, 'ERROR_RATE': 0.5, 'P95_LATENCY': args.deadline * 0.8,
+               'OPEN_SECONDS': OPEN_SECONDS, 'PROBES': 1}
+    with StubInferenceServer() as stub, \
+            override_settings(HF_INFERENCE={'API_URL': stub.url},
+                              MOOD_ANALYZER={'DEADLINE': args.deadline, 'BREAKER': breaker}):
+        print(f"{args.requests} requests per phase; healthy {args.latency:.0f} ms, slow {args.slow:.0f} ms, "
+              f"deadline {args.deadline * 1000:.0f} ms")
+        print(f"  {'':20s} {'p50 ms':>8s} {'p95 ms':>8s} {'max ms':>8s} {'fallbacks':>10s} {'requests':>9s}")
+        for name, analyze in (('direct', direct), ('breaker', guarded)):
+            inference_client.cache_clear()
+            reset_remote_breaker()
+            for label, latency, failing in (('healthy', args.latency, False), ('down', args.latency, True),
+                                            ('slow', args.slow, False), ('recovered', args.latency, False)):
+                stub.latency = latency / 1000
+                stub.failures.clear()
+                if failing:
+                    stub.fail_next(args.requests * 10, status=503)
+                if label == 'recovered':
+                    time.sleep(OPEN_SECONDS)
+                batch = [next(texts) for _ in range(args.requests)]
+                p50, p95, worst, fallbacks, requests = phase(stub, analyze, batch)
+                print(f"  {f'{name} {label}':20s} {p50:8.1f} {p95:8.1f} {worst:8.1f} {fallbacks:10d} {requests:9d}")
+            if name == 'breaker':
+                stats = remote_breaker().stats()
+                print(f"  breaker {stats['state']}; trips {stats['trips']}; {stats['rejected']} calls rejected")
+
+
+if __name__ == '__main__':
+    main()
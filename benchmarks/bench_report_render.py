@@ -0,0 +1,102 @@
+# benchmarks/bench_report_render.py
+"""
+PDF mood report rendering throughput: process-wide template vs per-report styles.
+
+Seeds --users users with --entries analyses each (every one with an emotion
+breakdown) and renders each user's report into memory, --repeat rounds:
+
+    template   analysis/reports.py as it is: styles and table styles built
+               once per process
+    per-report a fresh stylesheet and table styles for every report (as
+               before the template)
+
+and prints reports/s and pages/s for both, from each one's fastest round
+(rounds alternate between the two so drift on a busy machine hits both).
+Both produce identical PDFs.
+
+Runs against a throwaway test database created from the configured one.
+
+Run from the project root:
+    python benchmarks/bench_report_render.py [--users 10 --entries 200 --repeat 3]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from analysis import reports  # noqa: E402
+from analysis.models import MoodAnalysis  # noqa: E402
+from analysis.rollups import rebuild_rollups  # noqa: E402
+
+MOODS = [mood for mood, _label in MoodAnalysis.MOOD_CHOICES]
+
+
+def seed(users, entries):
+    for user in users:
+        MoodAnalysis.objects.bulk_create(
+            MoodAnalysis(user=user, text=f"entry {i}: a short note about how the day went.",
+                         detected_mood=MOODS[i % len(MOODS)], confidence=0.8,
+                         emotions={'happy': f"{i % 100}.0%", 'sad': '10.0%', 'anxious': '5.0%'})
+            for i in range(entries)
+        )
+    rebuild_rollups([user.id for user in users])
+
+
+def render_round(users, template):
+    """(seconds, pages) to render every user's report once with template"""
+    pages = 0
+    with mock.patch.object(reports, 'report_template', template):
+        start = time.perf_counter()
+        for user in users:
+            pages += reports.write_mood_report(user, io.BytesIO())
+        return time.perf_counter() - start, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--entries', type=int, default=200, help='analyses per user')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        users = [User.objects.create_user(username=f'render{i}', password='x') for i in range(args.users)]
+        seed(users, args.entries)
+        # Warm up connections, imports and font metrics
+        reports.write_mood_report(users[0], io.BytesIO())
+
+        variants = {'per-report': reports.ReportTemplate, 'template': reports.report_template}
+        best = {}
+        for _ in range(args.repeat):
+            for name, template in variants.items():
+                seconds, pages = render_round(users, template)
+                if name not in best or seconds < best[name][0]:
+                    best[name] = (seconds, pages)
+
+        print(f"{args.users} users x {args.entries} entries, best of {args.repeat} rounds ({connection.vendor})")
+        print(f"  {'':10s} {'reports/s':>10s} {'pages/s':>9s} {'ms/report':>10s}")
+        for name, (seconds, pages) in best.items():
+            print(f"  {name:10s} {args.users / seconds:10.2f} {pages / seconds:9.1f} "
+                  f"{seconds / args.users * 1000:10.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/bench_send_message.py
+"""
+Queries and wall time per chat message: the previous send_message flow vs
+the current view.
+
+The previous flow routed the message for its mood, again inside
+get_response, re-derived the intent with a substring if-chain and saved
+the two ChatMessage rows with two INSERTs. The current view takes intent
+and mood from the structured ChatReply and saves both rows with one
+bulk_create in one transaction.
+
+Runs against a throwaway test database created from the configured one.
+Statements are counted as sent by Django; on SQLite each atomic block adds
+an explicit BEGIN, and each autocommitted INSERT is its own transaction.
+
+Run from the project root:
+    python benchmarks/bench_send_message.py [--messages 2000 --users 50]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mindtrack.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import JsonResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from bench_chatbot_router import build_corpus  # noqa: E402
+from chatbot import views  # noqa: E402
+from chatbot.models import ChatMessage  # noqa: E402
+from chatbot.services import MindTrackChatbot  # noqa: E402
+from chatbot.state import reset_state_backend  # noqa: E402
+
+
+def legacy_send_message(request):
+    """send_message as it was before ChatReply (error handling trimmed)"""
+    data = json.loads(request.body)
+    user_message = data.get('message', '').strip()
+    mood_context = data.get('mood_context', None)
+    if not mood_context:
+        mood_context = MindTrackChatbot.analyze_mood_from_text(user_message)
+    user_chat = ChatMessage.objects.create(
+        user=request.user, message=user_message, is_user=True, mood_context=mood_context
+    )
+    bot_response = MindTrackChatbot.get_response(user_message, mood_context, user_id=request.user.id)
+    user_message_lower = user_message.lower()
+    if 'quote' in user_message_lower:
+        intent_detected = 'quote_request'
+    elif 'poem' in user_message_lower or 'poetry' in user_message_lower:
+        intent_detected = 'poem_request'
+    elif 'music' in user_message_lower or 'song' in user_message_lower or 'youtube' in user_message_lower:
+        intent_detected = 'music_request'
+    elif 'exercise' in user_message_lower or 'workout' in user_message_lower or 'activity' in user_message_lower:
+        intent_detected = 'activity_request'
+    elif 'nepali' in user_message_lower:
+        intent_detected = 'nepali_request'
+    elif 'how are you' in user_message_lower:
+        intent_detected = 'greeting'
+    elif 'hello' in user_message_lower or 'hi' in user_message_lower or 'hey' in user_message_lower:
+        intent_detected = 'greeting'
+    elif 'thank' in user_message_lower:
+        intent_detected = 'gratitude'
+    elif 'bye' in user_message_lower or 'goodbye' in user_message_lower:
+        intent_detected = 'farewell'
+    else:
+        intent_detected = 'conversation'
+    bot_chat = ChatMessage.objects.create(
+        user=request.user, message=bot_response, is_user=False,
+        mood_context=mood_context, intent_detected=intent_detected
+    )
+    local_time = timezone.localtime(bot_chat.created_at, views.NEPAL_TZ)
+    return JsonResponse({
+        'success': True,
+        'response': bot_response,
+        'mood_context': mood_context,
+        'intent_detected': intent_detected,
+        'timestamp': local_time.strftime('%H:%M'),
+        'message_id': user_chat.id
+    })
+
+
+def run(view, requests):
+    ChatMessage.objects.all().delete()
+    reset_state_backend()
+    random.seed(3)
+    statements = []
+
+    def count(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        start = time.perf_counter()
+        for request in requests:
+            view(request)
+        elapsed = time.perf_counter() - start
+    inserts = sum(sql.startswith('INSERT') for sql in statements)
+    return len(statements), inserts, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        users = [User.objects.create_user(username=f'bench{i}', password='x') for i in range(args.users)]
+        factory = RequestFactory()
+        rng = random.Random(1)
+        requests = []
+        for message in build_corpus(args.messages):
+            request = factory.post('/chatbot/send/', json.dumps({'message': message}),
+                                   content_type='application/json')
+            request.user = rng.choice(users)
+            requests.append(request)
+
+        print(f"{args.messages} messages from {args.users} users ({connection.vendor})")
+        for name, view in (('previous flow', legacy_send_message), ('ChatReply + bulk_create', views.send_message)):
+            statement_count, insert_count, elapsed = run(view, requests)
+            print(f"  {name:24s} {statement_count / args.messages:5.2f} statements/msg "
+                  f"({insert_count / args.messages:.2f} INSERT)   {elapsed / args.messages * 1e6:8.1f} us/msg")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
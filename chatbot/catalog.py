@@ -0,0 +1,288 @@
+# chatbot/catalog.py
+"""
+Versioned, memory-mapped content catalog for the chatbot.
+
+The quotes, poems, songs, tips and canned responses in data_resources.py are
+compiled into one packed file that every worker memory-maps read-only, so
+the pages are shared between gunicorn workers and per-worker memory stays
+flat as the catalog grows. Items are decoded only when they are served.
+
+File layout (little-endian):
+
+    header   magic(8) version(u64) item_count(u32) key_count(u32) keys_len(u32) pad(u32)
+    keys     JSON list of [language, category, mood, kind, first, count], padded to 8
+    ids      u32 stable content id per item, padded to 8
+    offsets  u64 per item plus one, relative to the start of the blob
+    blob     UTF-8 payloads (plain text, or JSON for kind == 'json')
+
+Lookups are by (language, category, mood). Stable ids survive rebuilds: an
+item that is unchanged keeps its id, new items get fresh ones. Workers call
+get_catalog(), which re-checks the file every CHECK_INTERVAL seconds and
+swaps to a new version atomically (a single reference assignment); a reply
+that already holds the old catalog keeps reading it until it finishes.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+MAGIC = b'MTCATv1\x00'
+HEADER = struct.Struct('<8sQIIII')
+
+Key = Tuple[str, str, str]
+
+
+def _pad(length: int) -> int:
+    return (8 - length % 8) % 8
+
+
+def resource_entries() -> List[Tuple[str, str, str, str, list]]:
+    """(language, category, mood, kind, items) for everything in data_resources"""
+    from . import data_resources as resources
+
+    entries = []
+    for category, table in (('quote', resources.QUOTE_CATEGORIES), ('poem', resources.POEM_CATEGORIES)):
+        for key, items in table.items():
+            if key.startswith('nepali_'):
+                entries.append(('ne', category, key[len('nepali_'):], 'text', items))
+            else:
+                entries.append(('en', category, key, 'text', items))
+    for mood, items in resources.YOUTUBE_RESOURCES.items():
+        entries.append(('en', 'song', mood, 'json', items))
+    for mood, items in resources.EXERCISE_TIPS.items():
+        entries.append(('en', 'exercise', mood, 'text', items))
+    for mood, items in resources.CONSTRUCTIVE_WAYS.items():
+        entries.append(('en', 'constructive', mood, 'text', items))
+    for mood, items in resources.MOOD_RESPONSES.items():
+        if isinstance(items, dict):
+            entries.append(('en', 'mood_response', mood, 'text', items['general']))
+            entries.append(('en', 'cheer_up', mood, 'text', items['cheer_up']))
+        else:
+            entries.append(('en', 'mood_response', mood, 'text', items))
+    entries.append(('en', 'greeting', '', 'text', resources.GREETINGS))
+    entries.append(('en', 'farewell', '', 'text', resources.FAREWELLS))
+    return entries
+
+
+def _encode(kind: str, item) -> bytes:
+    if kind == 'json':
+        return json.dumps(item, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return item.encode('utf-8')
+
+
+def _fingerprint(key: Key, payload: bytes) -> str:
+    return hashlib.blake2b(repr(key).encode('utf-8') + b'\x00' + payload, digest_size=16).hexdigest()
+
+
+def build_catalog_bytes(entries: Iterable, previous: Optional['ContentCatalog'] = None,
+                        version: Optional[int] = None) -> bytes:
+    """Pack catalog entries, keeping the stable ids of items `previous` already had"""
+    known = previous.fingerprints() if previous is not None else {}
+    next_id = max(known.values(), default=-1) + 1
+    if version is None:
+        version = previous.version + 1 if previous is not None else 1
+
+    keys, ids, offsets, payloads = [], [], [0], []
+    position = 0
+    for language, category, mood, kind, items in entries:
+        key = (language, category, mood)
+        keys.append([language, category, mood, kind, len(ids), len(items)])
+        for item in items:
+            payload = _encode(kind, item)
+            fingerprint = _fingerprint(key, payload)
+            content_id = known.get(fingerprint)
+            if content_id is None:
+                content_id = known[fingerprint] = next_id
+                next_id += 1
+            ids.append(content_id)
+            payloads.append(payload)
+            position += len(payload)
+            offsets.append(position)
+
+    keys_blob = json.dumps(keys, ensure_ascii=False).encode('utf-8')
+    ids_blob = struct.pack(f'<{len(ids)}I', *ids)
+    parts = [
+        HEADER.pack(MAGIC, version, len(ids), len(keys), len(keys_blob), 0),
+        keys_blob, b'\x00' * _pad(len(keys_blob)),
+        ids_blob, b'\x00' * _pad(len(ids_blob)),
+        struct.pack(f'<{len(offsets)}Q', *offsets),
+    ]
+    parts.extend(payloads)
+    return b''.join(parts)
+
+
+def write_catalog(path, entries: Iterable, version: Optional[int] = None) -> 'ContentCatalog':
+    """Build a catalog next to `path` and atomically move it into place"""
+    path = os.fspath(path)
+    previous = ContentCatalog.open(path) if os.path.exists(path) else None
+    data = build_catalog_bytes(entries, previous, version)
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return ContentCatalog.open(path)
+
+
+class CatalogSlice:
+    """Items stored under one (language, category, mood) key"""
+
+    __slots__ = ('catalog', 'first', 'count', 'kind')
+
+    def __init__(self, catalog: 'ContentCatalog', first: int, count: int, kind: str):
+        self.catalog = catalog
+        self.first = first
+        self.count = count
+        self.kind = kind
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.catalog.item(self.first + index, self.kind)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def content_id(self, index: int) -> int:
+        """Stable id of the item at `index` within this slice"""
+        return self.catalog.content_id(self.first + index)
+
+
+_EMPTY = ('text', 0, 0)
+
+
+class ContentCatalog:
+    """Read-only view over a packed catalog (memory-mapped file or bytes)"""
+
+    def __init__(self, buffer, path: Optional[str] = None):
+        self.path = path
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, self.version, item_count, key_count, keys_len, _ = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path or 'buffer'} is not a chatbot catalog")
+
+        position = HEADER.size
+        keys = json.loads(bytes(view[position:position + keys_len]).decode('utf-8'))
+        position += keys_len + _pad(keys_len)
+        self._keys: Dict[Key, Tuple[str, int, int]] = {
+            (language, category, mood): (kind, first, count)
+            for language, category, mood, kind, first, count in keys
+        }
+
+        ids_len = 4 * item_count
+        self._ids = view[position:position + ids_len].cast('I')
+        position += ids_len + _pad(ids_len)
+        offsets_len = 8 * (item_count + 1)
+        self._offsets = view[position:position + offsets_len].cast('Q')
+        self._blob_start = position + offsets_len
+        self.item_count = item_count
+
+    @classmethod
+    def open(cls, path) -> 'ContentCatalog':
+        path = os.fspath(path)
+        with open(path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        catalog = cls(mapped, path)
+        stat = os.stat(path)
+        catalog.file_signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return catalog
+
+    @classmethod
+    def from_resources(cls) -> 'ContentCatalog':
+        """In-memory catalog straight from data_resources (no compiled file)"""
+        return cls(build_catalog_bytes(resource_entries(), version=0))
+
+    def keys(self):
+        return self._keys.keys()
+
+    def items(self, language: str, category: str, mood: str = '') -> CatalogSlice:
+        kind, first, count = self._keys.get((language, category, mood), _EMPTY)
+        return CatalogSlice(self, first, count, kind)
+
+    def _payload(self, index: int) -> bytes:
+        start = self._blob_start
+        return self._buffer[start + self._offsets[index]:start + self._offsets[index + 1]]
+
+    def item(self, index: int, kind: str = 'text'):
+        text = self._payload(index).decode('utf-8')
+        return json.loads(text) if kind == 'json' else text
+
+    def content_id(self, index: int) -> int:
+        return self._ids[index]
+
+    def fingerprints(self) -> Dict[str, int]:
+        """Item fingerprint -> stable id, used to carry ids into the next build"""
+        result = {}
+        for (language, category, mood), (kind, first, count) in self._keys.items():
+            key = (language, category, mood)
+            for index in range(first, first + count):
+                result[_fingerprint(key, self._payload(index))] = self._ids[index]
+        return result
+
+
+_current: Optional[ContentCatalog] = None
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+
+def catalog_path() -> str:
+    config = getattr(settings, 'CHATBOT_CATALOG', {})
+    return os.fspath(config.get('PATH', os.path.join(settings.BASE_DIR, 'var', 'chatbot_catalog.bin')))
+
+
+def get_catalog() -> ContentCatalog:
+    """The newest catalog, re-checking the compiled file every CHECK_INTERVAL seconds"""
+    global _current, _checked_at
+    interval = getattr(settings, 'CHATBOT_CATALOG', {}).get('CHECK_INTERVAL', 5)
+    catalog = _current
+    if catalog is not None and time.monotonic() - _checked_at < interval:
+        return catalog
+
+    with _reload_lock:
+        if _current is not None and time.monotonic() - _checked_at < interval:
+            return _current
+        path = catalog_path()
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if _current is None or _current.path is not None:
+                _current = ContentCatalog.from_resources()
+        else:
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if _current is None or getattr(_current, 'file_signature', None) != signature:
+                _current = ContentCatalog.open(path)
+        _checked_at = time.monotonic()
+        return _current
+
+
+def reset_catalog() -> None:
+    """Forget the loaded catalog so the next get_catalog() reloads it"""
+    global _current, _checked_at
+    with _reload_lock:
+        _current = None
+        _checked_at = 0.0
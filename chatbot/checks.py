@@ -0,0 +1,36 @@
+# chatbot/checks.py
+"""Deployment checks for the chatbot (`python manage.py check --deploy`)"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from django.utils.module_loading import import_string
+
+from .state import DEFAULT_BACKEND, CacheStateBackend
+
+# Cache backends that keep their data inside one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_state_backend(app_configs, **kwargs):
+    config = getattr(settings, 'CHATBOT_STATE', {})
+    backend = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+    if not issubclass(backend, CacheStateBackend):
+        return [Warning(
+            f"CHATBOT_STATE uses {backend.__name__}, which keeps conversation state per process.",
+            hint="With several workers, set CHATBOT_STATE_BACKEND to 'chatbot.state.SessionStateBackend' "
+                 "or 'chatbot.state.CacheStateBackend' on a shared cache.",
+            id='chatbot.W001',
+        )]
+    alias = config.get('OPTIONS', {}).get('CACHE_ALIAS', 'default')
+    cache_backend = settings.CACHES.get(alias, {}).get('BACKEND', PROCESS_LOCAL_CACHES[0])
+    if cache_backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f"CHATBOT_STATE uses the '{alias}' cache, which is {cache_backend.rsplit('.', 1)[1]} "
+            f"and so per process.",
+            hint=f"Point CACHES['{alias}'] at Redis or Memcached when running several workers.",
+            id='chatbot.W002',
+        )]
+    return []
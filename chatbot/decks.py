@@ -0,0 +1,99 @@
+# chatbot/decks.py
+"""
+Per-user shuffled decks for "fresh content" rotation.
+
+Each content category (quotes of one kind, songs for one mood, ...) gets a
+deck per user in the user's conversation state. A draw is one step of a
+Fisher-Yates shuffle: pick one of the ids not drawn yet this cycle uniformly
+and swap-remove it. That is O(1) whatever the category size, every item
+comes up once per cycle, and what is left of the order cannot be guessed
+from the cards already drawn. Decks are plain JSON lists that start with
+-size (older layouts started with +size and are replaced on their next
+draw).
+
+Decks of up to DENSE_MAX cards list the ids still to draw:
+
+    [-size, id, id, ...]
+
+Larger decks keep a virtual list 0..size-1 of which the first size - drawn
+slots are still to draw, storing only the slots moved this cycle (slot as a
+string, as JSON would leave it -> id), so their state does not grow with
+the category:
+
+    [-size, drawn, {slot: id}]
+
+A cycle never starts with the card that ended the previous one: a refilled
+deck puts that card last and its first draw skips it. A new small deck
+puts a random card last, so its first draw stays uniform; a new large deck
+has nothing moved and draws from every slot.
+"""
+import random
+from typing import Dict, List
+
+# Largest deck kept as an explicit list of remaining ids
+DENSE_MAX = 64
+
+DRAWN, MOVED = 1, 2
+
+# size -> a full small deck, copied for new decks and refills
+_FULL = {}
+
+
+def _full(size: int, tail: int) -> List[int]:
+    """A small deck holding every id, with `tail` last"""
+    full = _FULL.get(size)
+    if full is None:
+        full = _FULL[size] = [-size, *range(size)]
+    deck = full[:]
+    deck[1 + tail], deck[-1] = deck[-1], tail
+    return deck
+
+
+def _refill_moved(size: int, tail: int) -> Dict[str, int]:
+    """Moved slots of a refilled large deck: `tail` in the last slot (recorded even if already there)"""
+    last = size - 1
+    return {str(last): tail} if tail == last else {str(tail): last, str(last): tail}
+
+
+def draw(state: Dict, key: str, size: int, rng=random) -> int:
+    """Draw the next content id (0 <= id < size) from one of the user's decks"""
+    decks = state.get('decks')
+    if decks is None:
+        decks = state['decks'] = {}
+    deck = decks.get(key)
+    if size > DENSE_MAX:
+        if deck is None or deck[0] != -size:
+            deck = decks[key] = [-size, 0, {}]
+        return _draw_sparse(deck, size, rng)
+
+    if deck is None or deck[0] != -size:
+        deck = decks[key] = _full(size, int(rng.random() * size))
+    count = len(deck) - 1
+    if count == size > 1:
+        count -= 1  # first draw of a cycle; the last card comes later
+    index = 1 + int(rng.random() * count)
+    card = deck[index]
+    deck[index] = deck[-1]
+    deck.pop()
+    if len(deck) == 1:
+        deck = decks[key] = _full(size, card)
+    return card
+
+
+def _draw_sparse(deck: List, size: int, rng) -> int:
+    moved = deck[MOVED]
+    count = size - deck[DRAWN]
+    # The first draw of a refilled deck leaves the last slot for later
+    slot = int(rng.random() * (count - 1 if count == size and moved else count))
+    last = count - 1
+    slot_key, last_key = str(slot), str(last)
+    card = moved.get(slot_key, slot)
+    if slot != last:
+        moved[slot_key] = moved.get(last_key, last)
+    moved.pop(last_key, None)
+    if count == 1:
+        deck[DRAWN] = 0
+        deck[MOVED] = _refill_moved(size, card)
+    else:
+        deck[DRAWN] += 1
+    return card
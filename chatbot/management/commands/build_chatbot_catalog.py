@@ -0,0 +1,47 @@
+# chatbot/management/commands/build_chatbot_catalog.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.catalog import catalog_path, resource_entries, write_catalog
+
+
+class Command(BaseCommand):
+    help = "Compile chatbot content into the memory-mapped catalog that workers hot-reload"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Catalog file (default: settings.CHATBOT_CATALOG['PATH'])")
+        parser.add_argument(
+            '--extra', action='append', default=[], metavar='JSON',
+            help='JSON file of extra entries: [{"language", "category", "mood", "kind", "items"}, ...]',
+        )
+
+    def handle(self, *args, **options):
+        entries = {}
+        for language, category, mood, kind, items in resource_entries():
+            entries[(language, category, mood)] = [kind, list(items)]
+
+        for extra_path in options['extra']:
+            try:
+                with open(extra_path, encoding='utf-8') as handle:
+                    extra = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {extra_path}: {e}")
+            for entry in extra:
+                key = (entry['language'], entry['category'], entry.get('mood', ''))
+                kind = entry.get('kind', 'text')
+                current = entries.setdefault(key, [kind, []])
+                if current[0] != kind:
+                    raise CommandError(f"{key} mixes '{current[0]}' and '{kind}' items")
+                current[1].extend(item for item in entry['items'] if item not in current[1])
+
+        path = options['output'] or catalog_path()
+        catalog = write_catalog(
+            path,
+            [(language, category, mood, kind, items)
+             for (language, category, mood), (kind, items) in entries.items()],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote catalog v{catalog.version} to {path}: "
+            f"{catalog.item_count} items under {len(catalog.keys())} keys"
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 04:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0004_remove_userchatsession_last_interaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'id'], name='chatmsg_user_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 05:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0005_chatmessage_user_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'created_at'], name='chatmsg_user_created_idx'),
+        ),
+    ]
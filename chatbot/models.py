@@ -1,7 +1,6 @@
 # chatbot/models.py
 from django.db import models
 from django.contrib.auth.models import User
-from django.utils import timezone
 
 class ChatMessage(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_messages')
@@ -13,6 +12,12 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Keyset pages of one user's history (get_chat_history)
+            models.Index(fields=['user', 'id'], name='chatmsg_user_id_idx'),
+            # Per-user time ranges in created_at order
+            models.Index(fields=['user', 'created_at'], name='chatmsg_user_created_idx'),
+        ]
 
     def __str__(self):
         sender = "User" if self.is_user else "Bot"
@@ -21,17 +26,11 @@ class ChatMessage(models.Model):
 class UserChatSession(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='chat_session')
     current_mood = models.CharField(max_length=50, blank=True, null=True)
-<<<<<<< HEAD
-    last_interaction = models.DateTimeField(blank=True, null=True)
-    interaction_count = models.IntegerField(default=0)
-    created_at = models.DateTimeField(default=timezone.now)
-=======
     last_intent = models.CharField(max_length=50, blank=True, null=True)
     conversation_topic = models.CharField(max_length=100, blank=True, null=True)
     interaction_count = models.IntegerField(default=0)
     context_data = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
->>>>>>> javicmusk
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
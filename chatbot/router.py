@@ -0,0 +1,207 @@
+# chatbot/router.py
+"""
+Single-pass intent and mood router for the chatbot.
+
+All trigger words, stems and phrases are compiled once at import into a
+single trie-shaped regex (shared prefixes are matched once, like an
+automaton). A message is lowercased and scanned a single time; the router
+returns every matched trigger plus the intents and mood they imply, in
+priority order.
+
+Triggers are matched on word boundaries, so "hi" no longer fires on "this"
+and "ok" no longer fires on "book". A trailing '*' marks a stem
+('motivat*' matches "motivate", "motivation", "motivated", ...).
+
+The mood words themselves live in the shared lexicon (utils/lexicon.py).
+They stay in the trigger regex so branches can test for them, and a message
+that contains any is scored by CHAT_LEXICON to pick its mood, so intensity
+and negation count ("so tired, not happy").
+"""
+import re
+from typing import Optional, Set, Tuple
+
+from utils.lexicon import CHAT_LEXICON, CHAT_MOODS, NEGATORS, compile_terms, term_name
+
+# ============================================
+# INTENT TRIGGERS (in get_response priority order)
+# ============================================
+
+INTENT_TRIGGERS = {
+    'music': ('song', 'songs', 'music', 'youtube', 'playlist*', 'listen*'),
+    'exercise': ('exercis*', 'workout*', 'activity', 'activities', 'tip', 'tips',
+                 'suggestion*', 'physical*'),
+    'quote': ('quote', 'quotes'),
+    'poem': ('poem', 'poems', 'poetry'),
+    'nepali': ('nepali', 'नेपाली'),
+    'how_are_you': ('how are you',),
+    'greeting': ('hello', 'hi', 'hey', 'greetings', 'how you doing', 'how you doin',
+                 'how ya doing'),
+    'how_to': ('how to', 'how do i'),
+}
+
+# Routing order used by MindTrackChatbot.get_response. Composite intents
+# (nepali_quote, nepali_poem) need both of their component triggers.
+INTENT_PRIORITY = (
+    'music',
+    'exercise',
+    'how_to',
+    'nepali_quote',
+    'nepali_poem',
+    'quote',
+    'poem',
+    'how_are_you',
+    'greeting',
+)
+
+# ============================================
+# MOOD TRIGGERS (in analyze_mood_from_text tie-break order)
+# ============================================
+
+MOOD_TRIGGERS = CHAT_MOODS
+
+MOOD_PRIORITY = tuple(MOOD_TRIGGERS)
+
+# Labels stored in ChatMessage.intent_detected, first match wins (quote and
+# poem requests are labelled before music, as the chat log always has been)
+INTENT_LABELS = (
+    ('quote_request', ('quote', 'quotes')),
+    ('poem_request', ('poem', 'poems', 'poetry')),
+    ('music_request', ('music', 'song', 'songs', 'youtube')),
+    ('activity_request', ('exercis', 'workout', 'activity', 'activities')),
+    ('nepali_request', ('nepali', 'नेपाली')),
+    ('greeting', ('how are you', 'hello', 'hi', 'hey')),
+    ('gratitude', ('thank',)),
+    ('farewell', ('bye', 'goodbye')),
+)
+
+# Words only used to pick a category or sub-branch once an intent is known
+SELECTOR_TRIGGERS = (
+    'happiness', 'sadness', 'share', 'overcome', 'deal', 'calm*', 'uplift*',
+    'mindful*', 'emotional', 'cheer*', 'up', 'thank*', 'bye', 'goodbye',
+)
+
+
+_term = term_name
+
+
+def _compile(specs):
+    specs = set(specs)
+    words = {spec: spec for spec in specs if not spec.endswith('*')}
+    stems = tuple(sorted((_term(s) for s in specs if s.endswith('*')), key=len, reverse=True))
+    return compile_terms(specs), words, stems
+
+
+_ALL_SPECS = [spec for specs in INTENT_TRIGGERS.values() for spec in specs]
+_ALL_SPECS += [spec for specs in MOOD_TRIGGERS.values() for spec in specs]
+_ALL_SPECS += SELECTOR_TRIGGERS
+_ALL_SPECS += NEGATORS
+
+# One trie-shaped regex over every trigger, so each message is scanned once
+_TRIGGER_RE, _WORD_TERMS, _STEM_TERMS = _compile(_ALL_SPECS)
+
+# Each trigger term sets one bit per base intent / mood it belongs to; the
+# ordered intent tuple and winning mood are then a single table lookup.
+_BASE_INTENTS = tuple(INTENT_TRIGGERS)
+_INTENT_BITS = {}
+for _bit, _intent in enumerate(_BASE_INTENTS):
+    for _spec in INTENT_TRIGGERS[_intent]:
+        if _spec != 'how to':  # only counts at the start of a message
+            _INTENT_BITS[_term(_spec)] = _INTENT_BITS.get(_term(_spec), 0) | 1 << _bit
+_HOW_TO_BIT = 1 << _BASE_INTENTS.index('how_to')
+
+# One bit per mood, plus a bit for negators. A single mood without a negator
+# resolves by table lookup (intensity cannot change the winner); only mixed
+# or negated moods are scored by the lexicon.
+_MOOD_BITS = {}
+for _bit, _mood in enumerate(MOOD_PRIORITY):
+    for _spec in MOOD_TRIGGERS[_mood]:
+        _MOOD_BITS[_term(_spec)] = 1 << _bit
+_NEGATOR_BIT = 1 << len(MOOD_PRIORITY)
+for _word in NEGATORS:
+    _MOOD_BITS[_word] = _NEGATOR_BIT
+_MOOD_BY_MASK = {1 << bit: mood for bit, mood in enumerate(MOOD_PRIORITY)}
+
+
+def _intents_for(mask: int) -> Tuple[str, ...]:
+    flags = {intent for bit, intent in enumerate(_BASE_INTENTS) if mask >> bit & 1}
+    if 'nepali' in flags and 'quote' in flags:
+        flags.add('nepali_quote')
+    if 'nepali' in flags and 'poem' in flags:
+        flags.add('nepali_poem')
+    return tuple(intent for intent in INTENT_PRIORITY if intent in flags)
+
+
+_INTENTS_BY_MASK = tuple(_intents_for(mask) for mask in range(1 << len(_BASE_INTENTS)))
+
+
+class Route:
+    """Result of routing one message: matched triggers, intents and mood"""
+
+    __slots__ = ('text', 'terms', 'intents', 'mood')
+
+    def __init__(self, text: str, terms: Set[str], intents: Tuple[str, ...], mood: Optional[str]):
+        self.text = text
+        self.terms = terms
+        self.intents = intents
+        self.mood = mood
+
+    def has(self, *terms: str) -> bool:
+        """True if any of the given trigger terms occurred in the message"""
+        return not self.terms.isdisjoint(terms)
+
+    @property
+    def intent(self) -> Optional[str]:
+        """Highest priority intent, or None for plain conversation"""
+        return self.intents[0] if self.intents else None
+
+    @property
+    def label(self) -> str:
+        """Intent label stored with the bot's chat message"""
+        for label, terms in INTENT_LABELS:
+            if not self.terms.isdisjoint(terms):
+                return label
+        return 'conversation'
+
+    def __repr__(self):
+        return f"Route(intents={self.intents!r}, mood={self.mood!r}, terms={sorted(self.terms)!r})"
+
+
+_LEADING_HOW_TO_RE = re.compile(r'how\s+to(?!\w)')
+
+# Matched text -> (term, intent bits, mood bits). Seeded with every literal
+# trigger; stem and phrase spellings are added as they are first seen.
+_MATCHES = {
+    word: (word, _INTENT_BITS.get(word, 0), _MOOD_BITS.get(word, 0)) for word in _WORD_TERMS
+}
+_MAX_MATCHES = 4096
+
+
+def _resolve(found: str):
+    words = found.split()
+    if len(words) > 1:
+        # A phrase; its \s+ also matches \r, \xa0 and other Unicode spaces
+        term = ' '.join(words)
+    else:
+        term = next(stem for stem in _STEM_TERMS if found.startswith(stem))
+    entry = (term, _INTENT_BITS.get(term, 0), _MOOD_BITS.get(term, 0))
+    if len(_MATCHES) < _MAX_MATCHES:
+        _MATCHES[found] = entry
+    return entry
+
+
+def route(message: str) -> Route:
+    """Lowercase and scan a message once, returning all matched triggers"""
+    text = message.lower().replace('’', "'").strip()
+    terms = set()
+    intent_mask = mood_mask = 0
+    for found in _TRIGGER_RE.findall(text):
+        term, intent_bits, mood_bits = _MATCHES.get(found) or _resolve(found)
+        terms.add(term)
+        intent_mask |= intent_bits
+        mood_mask |= mood_bits
+    if 'how to' in terms and _LEADING_HOW_TO_RE.match(text):
+        intent_mask |= _HOW_TO_BIT
+    mood = _MOOD_BY_MASK.get(mood_mask)
+    if mood is None and mood_mask & ~_NEGATOR_BIT:
+        mood = CHAT_LEXICON.dominant(CHAT_LEXICON.score(text))
+    return Route(text, terms, _INTENTS_BY_MASK[intent_mask], mood)
@@ -1,364 +1,339 @@
 # chatbot/services.py
 import random
 import re
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from collections import Counter
 
 # from .models import UserChatSession
-from . import data_resources as resources
+from .catalog import ContentCatalog, get_catalog
+from .decks import draw
+from .router import Route, route as route_message
+from .state import get_state_backend, interaction_stamp
+
+@dataclass
+class ChatReply:
+    """One engine reply plus what the engine worked out while building it"""
+    response: str
+    # Label stored in ChatMessage.intent_detected ('quote_request', 'greeting', ...)
+    intent: str
+    # Mood named in the message itself (None if it names none)
+    mood: Optional[str] = None
+    topic: Optional[str] = None
+    # Stable catalog id of the quote/poem/song/tip/response served, if any
+    content_id: Optional[int] = None
+
+    def __str__(self):
+        return self.response
+
 
 class MindTrackChatbot:
     """Enhanced chatbot with user session management and NLP"""
     
-    # Track conversation state
-    _conversation_state = {
-        'last_quotes_given': [],
-        'last_songs_given': [],
-        'last_poems_given': [],
-        'last_exercise_tips_given': [],
-        'cheer_up_context': False,
-        'last_interaction': None,
-        'interaction_count': 0,
-        'current_mood': None,
-        'last_topic': None
-    }
-    
     @classmethod
-    def _reset_state(cls):
-        """Reset conversation state"""
-        cls._conversation_state = {
-            'last_quotes_given': [],
-            'last_songs_given': [],
-            'last_poems_given': [],
-            'last_exercise_tips_given': [],
-            'cheer_up_context': False,
-            'last_interaction': None,
-            'interaction_count': 0,
-            'current_mood': None,
-            'last_topic': None
-        }
-    
-    @classmethod
-    def _update_state(cls, user_message: str, response: str, mood: str = None, topic: str = None):
+    def _update_state(cls, state: Dict, user_message: str, response: str, mood: str = None,
+                      topic: str = None, route: Optional[Route] = None):
         """Update conversation state"""
-        cls._conversation_state['interaction_count'] += 1
-        cls._conversation_state['last_interaction'] = {
-            'timestamp': datetime.now(),
-            'user_message': user_message[:100],
-            'response': response[:100]
-        }
+        if route is None:
+            route = route_message(user_message)
+        
+        state['interaction_count'] += 1
+        state['last_interaction'] = interaction_stamp(user_message, response)
         
         if mood:
-            cls._conversation_state['current_mood'] = mood
+            state['current_mood'] = mood
         
         if topic:
-            cls._conversation_state['last_topic'] = topic
+            state['last_topic'] = topic
         
         # Reset cheer up context UNLESS explicitly mentioned
-        if 'cheer' not in user_message.lower() and 'up' not in user_message.lower():
-            cls._conversation_state['cheer_up_context'] = False
+        if not route.has('cheer', 'up'):
+            state['cheer_up_context'] = False
     
     @staticmethod
     def analyze_mood_from_text(text):
-        """Enhanced mood detection from text"""
-        text_lower = text.lower()
-        
-        # Check for motivational requests FIRST (highest priority)
-        motivational_keywords = ['motivat', 'inspire', 'encourag', 'need motivation', 'want motivation', 'give me motivation']
-        if any(keyword in text_lower for keyword in motivational_keywords):
-            return 'motivational'
-        
-        # Check for specific moods
-        if 'lonely' in text_lower or 'alone' in text_lower:
-            return 'lonely'
-        if 'tired' in text_lower or 'exhausted' in text_lower:
-            return 'tired'
-        if 'anxious' in text_lower or 'anxiety' in text_lower or 'fear' in text_lower or 'scared' in text_lower or 'nervous' in text_lower:
-            return 'anxious'
-        if 'angry' in text_lower or 'mad' in text_lower:
-            return 'angry'
-        if 'happy' in text_lower or 'joy' in text_lower:
-            return 'happy'
-        if 'sad' in text_lower or 'unhappy' in text_lower:
-            return 'sad'
-        if 'okay' in text_lower or 'fine' in text_lower or 'ok' in text_lower:
-            return 'neutral'
-        
-        return None
+        """Enhanced mood detection from text (motivational requests take priority)"""
+        return route_message(text).mood
+    
+    @staticmethod
+    def _deal(state: Dict, key: str, items) -> Tuple[Any, int]:
+        """Next card from this user's deck for `key`, with its catalog id"""
+        # Repeats only after the deck is exhausted
+        index = draw(state, key, len(items))
+        return items[index], items.content_id(index)
+    
+    @staticmethod
+    def _choose(items) -> Tuple[Any, int]:
+        """Random item from a catalog slice, with its catalog id"""
+        index = random.randrange(len(items))
+        return items[index], items.content_id(index)
     
     @classmethod
-    def _get_fresh_quote(cls, category: str = 'motivational', is_nepali: bool = False) -> str:
-        """Get a quote that hasn't been given recently"""
+    def _get_fresh_quote(cls, state: Dict, category: str = 'motivational', is_nepali: bool = False,
+                         catalog: Optional[ContentCatalog] = None) -> Tuple[str, Optional[int]]:
+        """Get a quote that hasn't been given recently, with its content id"""
+        catalog = catalog or get_catalog()
         if is_nepali:
-            if category == 'motivational':
-                available_quotes = resources.QUOTE_CATEGORIES.get('nepali_motivational', [])
-            elif category == 'happy':
-                available_quotes = resources.QUOTE_CATEGORIES.get('nepali_happy', [])
-            elif category == 'sad':
-                available_quotes = resources.QUOTE_CATEGORIES.get('nepali_sad', [])
-            elif category == 'calming':
-                available_quotes = resources.QUOTE_CATEGORIES.get('nepali_calming', [])
-            else:
-                available_quotes = resources.QUOTE_CATEGORIES.get('nepali_uplifting', [])
+            if category not in ('motivational', 'happy', 'sad', 'calming'):
+                category = 'uplifting'
+            key = f'nepali_{category}'
+            available_quotes = catalog.items('ne', 'quote', category)
         else:
-            available_quotes = resources.QUOTE_CATEGORIES.get(category, resources.QUOTE_CATEGORIES['motivational'])
+            available_quotes = catalog.items('en', 'quote', category)
+            if not available_quotes:
+                category = 'motivational'
+                available_quotes = catalog.items('en', 'quote', category)
+            key = category
         
         if not available_quotes:
-            return "I don't have quotes in that category yet. How about a poem instead?"
-        
-        # Remove recently given quotes
-        fresh_quotes = [q for q in available_quotes if q not in cls._conversation_state['last_quotes_given']]
-        
-        # If all quotes have been used, reset and use any
-        if not fresh_quotes:
-            cls._conversation_state['last_quotes_given'] = []
-            fresh_quotes = available_quotes
+            return "I don't have quotes in that category yet. How about a poem instead?", None
         
-        # Select and track quote
-        selected_quote = random.choice(fresh_quotes)
-        cls._conversation_state['last_quotes_given'].append(selected_quote)
-        
-        # Keep only last 5 quotes
-        if len(cls._conversation_state['last_quotes_given']) > 5:
-            cls._conversation_state['last_quotes_given'] = cls._conversation_state['last_quotes_given'][-5:]
-        
-        return selected_quote
+        return cls._deal(state, f'quote:{key}', available_quotes)
     
     @classmethod
-    def _get_fresh_poem(cls, category: str = 'uplifting', is_nepali: bool = False) -> str:
-        """Get a poem that hasn't been given recently"""
+    def _get_fresh_poem(cls, state: Dict, category: str = 'uplifting', is_nepali: bool = False,
+                        catalog: Optional[ContentCatalog] = None) -> Tuple[str, Optional[int]]:
+        """Get a poem that hasn't been given recently, with its content id"""
+        catalog = catalog or get_catalog()
         if is_nepali:
-            if category == 'happy':
-                available_poems = resources.POEM_CATEGORIES.get('nepali_happy', [])
-            elif category == 'sad':
-                available_poems = resources.POEM_CATEGORIES.get('nepali_sad', [])
-            elif category == 'lonely':
-                available_poems = resources.POEM_CATEGORIES.get('nepali_lonely', [])
-            elif category == 'calming':
-                available_poems = resources.POEM_CATEGORIES.get('nepali_calming', [])
-            elif category == 'motivational':
-                available_poems = resources.POEM_CATEGORIES.get('nepali_motivational', [])
-            else:
-                available_poems = resources.POEM_CATEGORIES.get('nepali_uplifting', [])
+            if category not in ('happy', 'sad', 'lonely', 'calming', 'motivational'):
+                category = 'uplifting'
+            key = f'nepali_{category}'
+            available_poems = catalog.items('ne', 'poem', category)
         else:
-            available_poems = resources.POEM_CATEGORIES.get(category, resources.POEM_CATEGORIES['uplifting'])
+            available_poems = catalog.items('en', 'poem', category)
+            if not available_poems:
+                category = 'uplifting'
+                available_poems = catalog.items('en', 'poem', category)
+            key = category
         
         if not available_poems:
-            return "I don't have poems in that category yet. How about a quote instead?"
-        
-        # Remove recently given poems
-        fresh_poems = [p for p in available_poems if p not in cls._conversation_state['last_poems_given']]
+            return "I don't have poems in that category yet. How about a quote instead?", None
         
-        # If all poems have been used, reset and use any
-        if not fresh_poems:
-            cls._conversation_state['last_poems_given'] = []
-            fresh_poems = available_poems
-        
-        # Select and track poem
-        selected_poem = random.choice(fresh_poems)
-        cls._conversation_state['last_poems_given'].append(selected_poem)
-        
-        # Keep only last 5 poems
-        if len(cls._conversation_state['last_poems_given']) > 5:
-            cls._conversation_state['last_poems_given'] = cls._conversation_state['last_poems_given'][-5:]
-        
-        return selected_poem
+        return cls._deal(state, f'poem:{key}', available_poems)
     
     @classmethod
-    def _get_fresh_song(cls, mood: str = None, is_cheer_up: bool = False) -> Dict:
-        """Get a song that hasn't been given recently for this mood"""
-        if not mood or mood not in resources.YOUTUBE_RESOURCES:
+    def _get_fresh_song(cls, state: Dict, mood: str = None, is_cheer_up: bool = False,
+                        catalog: Optional[ContentCatalog] = None) -> Tuple[Dict, int]:
+        """Get a song that hasn't been given recently for this mood, with its content id"""
+        catalog = catalog or get_catalog()
+        mood = mood or 'neutral'
+        mood_resources = catalog.items('en', 'song', mood)
+        if not mood_resources:
             mood = 'neutral'
+            mood_resources = catalog.items('en', 'song', mood)
         
-        # Get resources for this mood
-        mood_resources = resources.YOUTUBE_RESOURCES.get(mood, resources.YOUTUBE_RESOURCES['neutral'])
-        
-        # Filter out recently given songs
-        fresh_resources = [r for r in mood_resources if r['id'] not in cls._conversation_state['last_songs_given']]
-        
-        # If all songs have been used, reset for this mood
-        if not fresh_resources:
-            # Keep songs from other moods, only reset this mood's songs
-            cls._conversation_state['last_songs_given'] = [
-                song_id for song_id in cls._conversation_state['last_songs_given']
-                if not song_id.startswith(f"{mood}_")
-            ]
-            fresh_resources = mood_resources
-        
-        # Select and track song
-        selected_resource = random.choice(fresh_resources)
-        cls._conversation_state['last_songs_given'].append(selected_resource['id'])
-        
-        # Keep only last 8 songs
-        if len(cls._conversation_state['last_songs_given']) > 8:
-            cls._conversation_state['last_songs_given'] = cls._conversation_state['last_songs_given'][-8:]
-        
-        return selected_resource
+        return cls._deal(state, f'song:{mood}', mood_resources)
     
     @classmethod
-    def get_response(cls, user_message: str, user_mood: Optional[str] = None) -> str:
-        """Generate enhanced chatbot response - ORIGINAL SIGNATURE"""
-        user_message_lower = user_message.lower().strip()
-        
-        # Reset state on new conversation
-        if cls._conversation_state['interaction_count'] == 0:
-            cls._reset_state()
+    def _get_fresh_exercise_tip(cls, state: Dict, mood: str,
+                                catalog: Optional[ContentCatalog] = None) -> Tuple[str, int]:
+        """Get an exercise tip that hasn't been given recently for this mood, with its content id"""
+        catalog = catalog or get_catalog()
+        exercise_tips = catalog.items('en', 'exercise', mood)
+        if not exercise_tips:
+            mood = 'neutral'
+            exercise_tips = catalog.items('en', 'exercise', mood)
         
-        # Check for Nepali requests
-        is_nepali_request = 'nepali' in user_message_lower or 'नेपाली' in user_message_lower
+        return cls._deal(state, f'exercise:{mood}', exercise_tips)
+    
+    @classmethod
+    def _finish(cls, state: Dict, user_message: str, response: str, mood: Optional[str],
+                topic: Optional[str], route: Route, content_id: Optional[int] = None) -> ChatReply:
+        """Record the turn in the user's state and package the reply"""
+        cls._update_state(state, user_message, response, mood, topic, route)
+        return ChatReply(response, route.label, route.mood, topic, content_id)
+    
+    @classmethod
+    def get_response(cls, user_message: str, user_mood: Optional[str] = None, user_id=None) -> str:
+        """Generate enhanced chatbot response - ORIGINAL SIGNATURE plus optional user_id"""
+        return cls.reply(user_message, user_mood, user_id).response
+    
+    @classmethod
+    def reply(cls, user_message: str, user_mood: Optional[str] = None, user_id=None) -> ChatReply:
+        """Like get_response, but with the intent, mood, topic and content id of the reply"""
+        backend = get_state_backend()
+        user_key = user_id if user_id is not None else 'anonymous'
+        with backend.lock(user_key):
+            state = backend.load(user_key)
+            reply = cls._respond(state, user_message, user_mood)
+            backend.save(user_key, state)
+        return reply
+    
+    @classmethod
+    def respond_many(cls, messages: Iterable[Tuple[Any, str]], user_mood: Optional[str] = None) -> List[ChatReply]:
+        """
+        Batch version of reply for [(user_id, message), ...] (chat log
+        replays, load tests). Each user's messages are answered in their
+        original order, exactly as consecutive reply calls would, but
+        each user's state is locked, loaded and saved once, the catalog is
+        fetched once and repeated message texts are routed once.
+        """
+        by_user = {}
+        count = 0
+        for count, (user_id, message) in enumerate(messages, 1):
+            user_key = user_id if user_id is not None else 'anonymous'
+            by_user.setdefault(user_key, []).append((count - 1, message))
+        
+        backend = get_state_backend()
+        catalog = get_catalog()
+        routes = {}
+        replies = [None] * count
+        for user_key, items in by_user.items():
+            with backend.lock(user_key):
+                state = backend.load(user_key)
+                for position, message in items:
+                    route = routes.get(message)
+                    if route is None:
+                        route = routes[message] = route_message(message)
+                    replies[position] = cls._respond(state, message, user_mood, route, catalog)
+                backend.save(user_key, state)
+        return replies
+    
+    @classmethod
+    def _respond(cls, state: Dict, user_message: str, user_mood: Optional[str] = None,
+                 route: Optional[Route] = None, catalog: Optional[ContentCatalog] = None) -> ChatReply:
+        """Build a reply, reading and updating one user's conversation state"""
+        # Scan the message once; every branch below reads from this route
+        if route is None:
+            route = route_message(user_message)
+        intent = route.intent
+        # One catalog version for the whole reply, even if a newer one is swapped in meanwhile
+        if catalog is None:
+            catalog = get_catalog()
         
         # CRITICAL FIX: Check mood from CURRENT message
-        current_message_mood = cls.analyze_mood_from_text(user_message)
+        current_message_mood = route.mood
         
         # If current message has a mood, it OVERRIDES everything
         if current_message_mood:
             detected_mood = current_message_mood
-            cls._conversation_state['current_mood'] = current_message_mood
+            state['current_mood'] = current_message_mood
         elif user_mood:
             # Use provided user_mood if no mood in current message
             detected_mood = user_mood
-            cls._conversation_state['current_mood'] = user_mood
+            state['current_mood'] = user_mood
         else:
             # Use existing mood from state
-            detected_mood = cls._conversation_state.get('current_mood')
+            detected_mood = state.get('current_mood')
         
         # ========== HANDLE SPECIFIC REQUESTS FIRST ==========
         
         # Check for song/music requests
-        if any(word in user_message_lower for word in ['song', 'music', 'youtube', 'playlist', 'listen']):
+        if intent == 'music':
             # Get song for current mood
-            song = cls._get_fresh_song(detected_mood or 'neutral')
-            if song:
-                mood_intros = {
-                    'happy': "To amplify your happy mood, here's some celebratory music:\n\n",
-                    'sad': "For your current mood, here's some supportive music:\n\n",
-                    'lonely': "For moments of loneliness, here's some comforting music:\n\n",
-                    'anxious': "To help calm and ground your anxiety, try this:\n\n",
-                    'angry': "To help channel or calm your anger, this might help:\n\n",
-                    'tired': "For restorative support when feeling tired:\n\n",
-                    'neutral': "For your current state, here's some balanced music:\n\n",
-                    'motivational': "To boost your motivation, here's some inspiring music:\n\n"
-                }
-                
-                intro = mood_intros.get(detected_mood or 'neutral', "Here's some music for you:\n\n")
-                response = f"{intro}🎵 **{song['title']}**\n🔗 {song['url']}\n💡 {song['description']}\n\n📝 Copy the URL above and paste into your browser to open YouTube"
-                cls._update_state(user_message, response, detected_mood, 'music')
-                return response
+            song, content_id = cls._get_fresh_song(state, detected_mood or 'neutral', catalog=catalog)
+            mood_intros = {
+                'happy': "To amplify your happy mood, here's some celebratory music:\n\n",
+                'sad': "For your current mood, here's some supportive music:\n\n",
+                'lonely': "For moments of loneliness, here's some comforting music:\n\n",
+                'anxious': "To help calm and ground your anxiety, try this:\n\n",
+                'angry': "To help channel or calm your anger, this might help:\n\n",
+                'tired': "For restorative support when feeling tired:\n\n",
+                'neutral': "For your current state, here's some balanced music:\n\n",
+                'motivational': "To boost your motivation, here's some inspiring music:\n\n"
+            }
+            
+            intro = mood_intros.get(detected_mood or 'neutral', "Here's some music for you:\n\n")
+            response = f"{intro}🎵 **{song['title']}**\n🔗 {song['url']}\n💡 {song['description']}\n\n📝 Copy the URL above and paste into your browser to open YouTube"
+            return cls._finish(state, user_message, response, detected_mood, 'music', route, content_id)
         
         # Check for exercise/activity requests
-        if any(word in user_message_lower for word in ['exercise', 'workout', 'activity', 'tip', 'suggestion', 'physical']):
+        if intent == 'exercise':
             # Determine mood for exercise
             mood_for_exercise = detected_mood or 'neutral'
-            exercise_tips = resources.EXERCISE_TIPS.get(mood_for_exercise, resources.EXERCISE_TIPS['neutral'])
+            selected_tip, content_id = cls._get_fresh_exercise_tip(state, mood_for_exercise, catalog=catalog)
             
-            if exercise_tips:
-                # Get fresh exercise tip
-                fresh_tips = [t for t in exercise_tips if t not in cls._conversation_state['last_exercise_tips_given']]
-                if not fresh_tips:
-                    cls._conversation_state['last_exercise_tips_given'] = []
-                    fresh_tips = exercise_tips
-                
-                selected_tip = random.choice(fresh_tips)
-                cls._conversation_state['last_exercise_tips_given'].append(selected_tip)
-                if len(cls._conversation_state['last_exercise_tips_given']) > 5:
-                    cls._conversation_state['last_exercise_tips_given'] = cls._conversation_state['last_exercise_tips_given'][-5:]
-                
-                exercise_intros = {
-                    'happy': "To celebrate your happy mood, here's an energizing exercise idea:\n\n",
-                    'sad': "For moments of sadness, gentle movement can be particularly helpful:\n\n",
-                    'lonely': "When feeling lonely, these exercises might help create connection:\n\n",
-                    'anxious': "For anxiety relief, try this grounding exercise:\n\n",
-                    'angry': "To safely channel angry energy, consider this exercise:\n\n",
-                    'tired': "When feeling tired, gentle movement can actually boost energy:\n\n",
-                    'neutral': "For your current state, here's a balanced exercise suggestion:\n\n",
-                    'motivational': "To build motivation, start with this achievable exercise:\n\n"
-                }
-                
-                intro = exercise_intros.get(mood_for_exercise, "Here's an exercise tip for you:\n\n")
-                response = f"{intro}{selected_tip}"
-                cls._update_state(user_message, response, detected_mood, 'exercise')
-                return response
+            exercise_intros = {
+                'happy': "To celebrate your happy mood, here's an energizing exercise idea:\n\n",
+                'sad': "For moments of sadness, gentle movement can be particularly helpful:\n\n",
+                'lonely': "When feeling lonely, these exercises might help create connection:\n\n",
+                'anxious': "For anxiety relief, try this grounding exercise:\n\n",
+                'angry': "To safely channel angry energy, consider this exercise:\n\n",
+                'tired': "When feeling tired, gentle movement can actually boost energy:\n\n",
+                'neutral': "For your current state, here's a balanced exercise suggestion:\n\n",
+                'motivational': "To build motivation, start with this achievable exercise:\n\n"
+            }
+            
+            intro = exercise_intros.get(mood_for_exercise, "Here's an exercise tip for you:\n\n")
+            response = f"{intro}{selected_tip}"
+            return cls._finish(state, user_message, response, detected_mood, 'exercise', route, content_id)
         
-        # Handle "how to" questions - ADD THIS SECTION HERE
-        if user_message_lower.startswith('how to') or 'how do i' in user_message_lower:
+        # Handle "how to" questions
+        if intent == 'how_to':
+            content_id = None
             # Extract the topic
-            if 'share' in user_message_lower and 'happiness' in user_message_lower:
+            if route.has('share') and route.has('happiness'):
                 response = "Sharing happiness with others is wonderful! Here are some ways:\n\n1. **Express gratitude** - Thank people who make you happy\n2. **Share positive stories** - Tell others about good things happening\n3. **Give compliments** - Spread positivity with kind words\n4. **Invite others** - Include people in your happy activities\n5. **Smile genuinely** - Your smile can brighten someone's day 😊\n\nWhat aspect of sharing happiness interests you most?"
-                cls._update_state(user_message, response, detected_mood, 'advice')
-                return response
-            elif 'overcome' in user_message_lower and 'fear' in user_message_lower:
-                response = "Overcoming fear takes courage. Here are constructive approaches:\n\n" + resources.CONSTRUCTIVE_WAYS['anxious'][0]
-                cls._update_state(user_message, response, detected_mood, 'advice')
-                return response
-            elif 'deal' in user_message_lower and 'nervous' in user_message_lower:
-                response = "Dealing with nervousness:\n\n" + resources.CONSTRUCTIVE_WAYS['anxious'][1]
-                cls._update_state(user_message, response, detected_mood, 'advice')
-                return response
-            elif any(word in user_message_lower for word in ['happy', 'happiness', 'joy']):
-                response = "To cultivate more happiness:\n\n" + resources.CONSTRUCTIVE_WAYS['happy'][2]
-                cls._update_state(user_message, response, detected_mood, 'advice')
-                return response
-            elif any(word in user_message_lower for word in ['sad', 'sadness', 'unhappy']):
-                response = "When feeling sad:\n\n" + resources.CONSTRUCTIVE_WAYS['sad'][1]
-                cls._update_state(user_message, response, detected_mood, 'advice')
-                return response
+            elif route.has('overcome') and route.has('fear', 'fears'):
+                advice = catalog.items('en', 'constructive', 'anxious')
+                response = "Overcoming fear takes courage. Here are constructive approaches:\n\n" + advice[0]
+                content_id = advice.content_id(0)
+            elif route.has('deal') and route.has('nervous'):
+                advice = catalog.items('en', 'constructive', 'anxious')
+                response = "Dealing with nervousness:\n\n" + advice[1]
+                content_id = advice.content_id(1)
+            elif route.has('happy', 'happiness', 'joy', 'joyful'):
+                advice = catalog.items('en', 'constructive', 'happy')
+                response = "To cultivate more happiness:\n\n" + advice[2]
+                content_id = advice.content_id(2)
+            elif route.has('sad', 'sadness', 'unhappy'):
+                advice = catalog.items('en', 'constructive', 'sad')
+                response = "When feeling sad:\n\n" + advice[1]
+                content_id = advice.content_id(1)
             else:
                 # General "how to" response
                 response = "That's a great question! Could you tell me more about what specific area you'd like guidance on? I can help with emotional management, constructive strategies, or specific techniques."
-                cls._update_state(user_message, response, detected_mood, 'advice')
-                return response
+            return cls._finish(state, user_message, response, detected_mood, 'advice', route, content_id)
         
         # Handle Nepali quote requests
-        if is_nepali_request and 'quote' in user_message_lower:
+        if intent == 'nepali_quote':
             # Determine Nepali quote category
-            if 'motivat' in user_message_lower:
+            if route.has('motivat'):
                 category = 'motivational'
-            elif 'happy' in user_message_lower:
+            elif route.has('happy'):
                 category = 'happy'
-            elif 'sad' in user_message_lower:
+            elif route.has('sad'):
                 category = 'sad'
-            elif 'calm' in user_message_lower:
+            elif route.has('calm'):
                 category = 'calming'
             else:
                 category = 'motivational'
             
-            quote = cls._get_fresh_quote(category, is_nepali=True)
+            quote, content_id = cls._get_fresh_quote(state, category, is_nepali=True, catalog=catalog)
             response = f"Here's a Nepali quote for you:\n\n\"{quote}\""
-            cls._update_state(user_message, response, detected_mood, 'quote')
-            return response
+            return cls._finish(state, user_message, response, detected_mood, 'quote', route, content_id)
         
         # Handle Nepali poem requests
-        if is_nepali_request and ('poem' in user_message_lower or 'poetry' in user_message_lower):
+        if intent == 'nepali_poem':
             # Determine Nepali poem category
-            if 'happy' in user_message_lower:
+            if route.has('happy'):
                 category = 'happy'
-            elif 'sad' in user_message_lower:
+            elif route.has('sad'):
                 category = 'sad'
-            elif 'lonely' in user_message_lower:
+            elif route.has('lonely'):
                 category = 'lonely'
-            elif 'calm' in user_message_lower:
+            elif route.has('calm'):
                 category = 'calming'
-            elif 'motivat' in user_message_lower:
+            elif route.has('motivat'):
                 category = 'motivational'
             else:
                 category = 'uplifting'
             
-            poem = cls._get_fresh_poem(category, is_nepali=True)
+            poem, content_id = cls._get_fresh_poem(state, category, is_nepali=True, catalog=catalog)
             response = f"Here's a Nepali poem for you:\n\n{poem}"
-            cls._update_state(user_message, response, detected_mood, 'poem')
-            return response
+            return cls._finish(state, user_message, response, detected_mood, 'poem', route, content_id)
         
         # Handle regular quote requests
-        if 'quote' in user_message_lower or 'quotes' in user_message_lower:
+        if intent == 'quote':
             # Determine quote category
-            if 'motivational' in user_message_lower or 'motivate' in user_message_lower:
+            if route.has('motivat'):
                 category = 'motivational'
-            elif 'sad' in user_message_lower or 'emotional' in user_message_lower:
+            elif route.has('sad', 'emotional'):
                 category = 'emotional'
-            elif 'happy' in user_message_lower or 'uplifting' in user_message_lower:
+            elif route.has('happy', 'uplift'):
                 category = 'uplifting'
-            elif 'mindful' in user_message_lower:
+            elif route.has('mindful'):
                 category = 'mindfulness'
             else:
                 # Determine quote category based on mood
@@ -371,25 +346,24 @@ class MindTrackChatbot:
                 else:
                     category = 'mindfulness'
             
-            quote = cls._get_fresh_quote(category)
+            quote, content_id = cls._get_fresh_quote(state, category, catalog=catalog)
             response = f"Here's a quote for you:\n\n\"{quote}\""
-            cls._update_state(user_message, response, detected_mood, 'quote')
-            return response
+            return cls._finish(state, user_message, response, detected_mood, 'quote', route, content_id)
         
         # Handle poem requests
-        if 'poem' in user_message_lower or 'poetry' in user_message_lower:
+        if intent == 'poem':
             # Determine poem category
-            if 'motivat' in user_message_lower:
+            if route.has('motivat'):
                 category = 'motivational'
-            elif 'uplift' in user_message_lower:
+            elif route.has('uplift'):
                 category = 'uplifting'
-            elif 'happy' in user_message_lower:
+            elif route.has('happy'):
                 category = 'happy'
-            elif 'sad' in user_message_lower:
+            elif route.has('sad'):
                 category = 'sad'
-            elif 'lonely' in user_message_lower:
+            elif route.has('lonely'):
                 category = 'lonely'
-            elif 'calm' in user_message_lower:
+            elif route.has('calm'):
                 category = 'calming'
             else:
                 # Default based on mood
@@ -406,43 +380,34 @@ class MindTrackChatbot:
                 else:
                     category = 'uplifting'
             
-            poem = cls._get_fresh_poem(category)
+            poem, content_id = cls._get_fresh_poem(state, category, catalog=catalog)
             response = f"Here's a poem for you:\n\n{poem}"
-            cls._update_state(user_message, response, detected_mood, 'poem')
-            return response
+            return cls._finish(state, user_message, response, detected_mood, 'poem', route, content_id)
         
         # Check for "how are you" specifically
-        if 'how are you' in user_message_lower:
+        if intent == 'how_are_you':
             response = random.choice([
                 "Thank you for asking! I'm here and fully present to support you. How are you feeling today?",
                 "I'm doing well, and I'm focused on being here for you. How has your day been so far?",
                 "I'm present and ready to listen. Thanks for checking in! How are you really doing?",
             ])
-            cls._update_state(user_message, response, detected_mood)
-            return response
+            return cls._finish(state, user_message, response, detected_mood, None, route)
         
         # Check for greetings
-        greetings = ['hello', 'hi', 'hey', 'greetings', 'hey buddy']
-        if any(greet in user_message_lower for greet in ['hello', 'hi', 'hey', 'greetings', 'how you doing', 'how you doin', 'how ya doing']) and cls._conversation_state['interaction_count'] < 2:
-            response = random.choice(resources.GREETINGS)
-            cls._update_state(user_message, response, detected_mood)
-            return response
+        if intent == 'greeting' and state['interaction_count'] < 2:
+            response, content_id = cls._choose(catalog.items('en', 'greeting'))
+            return cls._finish(state, user_message, response, detected_mood, None, route, content_id)
         
         # Mood-based responses
-        mood_responses = resources.MOOD_RESPONSES
-        
-        if detected_mood and detected_mood in mood_responses:
-            if detected_mood == 'sad':
-                if cls._conversation_state['cheer_up_context']:
-                    responses = mood_responses['sad']['cheer_up']
-                else:
-                    responses = mood_responses['sad']['general']
+        if detected_mood:
+            if detected_mood == 'sad' and state['cheer_up_context']:
+                responses = catalog.items('en', 'cheer_up', 'sad')
             else:
-                responses = mood_responses[detected_mood]
+                responses = catalog.items('en', 'mood_response', detected_mood)
             
-            response = random.choice(responses)
-            cls._update_state(user_message, response, detected_mood, 'mood')
-            return response
+            if responses:
+                response, content_id = cls._choose(responses)
+                return cls._finish(state, user_message, response, detected_mood, 'mood', route, content_id)
         
         # Default empathetic responses
         empathetic_responses = [
@@ -454,5 +419,4 @@ class MindTrackChatbot:
         ]
         
         response = random.choice(empathetic_responses)
-        cls._update_state(user_message, response, detected_mood)
-        return response
+        return cls._finish(state, user_message, response, detected_mood, None, route)
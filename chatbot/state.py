@@ -0,0 +1,336 @@
+# chatbot/state.py
+"""
+Per-user conversation state for MindTrackChatbot.
+
+The engine loads a user's state, mutates it while building one reply and
+saves it back, all while holding that user's lock. Where the state lives is
+pluggable through the CHATBOT_STATE setting:
+
+    CHATBOT_STATE = {
+        'BACKEND': 'chatbot.state.LocMemStateBackend',
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'TTL': 6 * 60 * 60},
+    }
+
+Backends:
+    LocMemStateBackend   in-process LRU with TTL (per worker, lost on restart)
+    CacheStateBackend    Django's cache framework (shared between workers
+                         when the cache is Redis/Memcached)
+    SessionStateBackend  CacheStateBackend in front of a batched write-back
+                         into UserChatSession.context_data (survives restarts)
+
+LocMemStateBackend, and the cache backends on a LocMemCache, are single
+process only: under several workers each keeps its own copy of a user's
+state and conversations diverge. Multi-worker deployments need a cache
+backend on a shared cache; `manage.py check --deploy` warns otherwise
+(see checks.py).
+
+State values must stay JSON-serializable.
+"""
+import atexit
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'chatbot.state.LocMemStateBackend'
+
+# Number of striped in-process locks; users hash onto one of them
+LOCK_STRIPES = 64
+
+
+class StateLockTimeout(RuntimeError):
+    """Another worker held a user's state lock for longer than LOCK_WAIT"""
+
+
+def new_state() -> Dict:
+    """Fresh conversation state for a user"""
+    return {
+        # category key -> [-size, id, ...] or [-size, drawn, moved], see chatbot/decks.py
+        'decks': {},
+        'cheer_up_context': False,
+        'last_interaction': None,
+        'interaction_count': 0,
+        'current_mood': None,
+        'last_topic': None,
+    }
+
+
+class BaseStateBackend:
+    """Interface shared by all state backends"""
+
+    def __init__(self, options: Optional[Dict] = None):
+        self.options = options or {}
+        self.ttl = self.options.get('TTL', 6 * 60 * 60)
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @contextmanager
+    def lock(self, user_key):
+        """Serialize load/modify/save for one user within this process"""
+        stripe = self._locks[hash(user_key) % LOCK_STRIPES]
+        with stripe:
+            yield
+
+    def load(self, user_key) -> Dict:
+        raise NotImplementedError
+
+    def save(self, user_key, state: Dict) -> None:
+        raise NotImplementedError
+
+    def delete(self, user_key) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Persist anything buffered (no-op for write-through backends)"""
+
+
+class LocMemStateBackend(BaseStateBackend):
+    """Bounded in-process LRU with per-entry TTL"""
+
+    def __init__(self, options: Optional[Dict] = None):
+        super().__init__(options)
+        self.max_entries = self.options.get('MAX_ENTRIES', 10000)
+        self._entries = OrderedDict()
+        self._entries_lock = threading.Lock()
+
+    def load(self, user_key) -> Dict:
+        now = time.monotonic()
+        with self._entries_lock:
+            entry = self._entries.get(user_key)
+            if entry is not None:
+                expires_at, state = entry
+                if expires_at > now:
+                    self._entries.move_to_end(user_key)
+                    return state
+                del self._entries[user_key]
+        return new_state()
+
+    def save(self, user_key, state: Dict) -> None:
+        with self._entries_lock:
+            self._entries[user_key] = (time.monotonic() + self.ttl, state)
+            self._entries.move_to_end(user_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_key) -> None:
+        with self._entries_lock:
+            self._entries.pop(user_key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheStateBackend(BaseStateBackend):
+    """State kept in a Django cache alias, shared by every worker using it"""
+
+    def __init__(self, options: Optional[Dict] = None):
+        super().__init__(options)
+        self.cache = caches[self.options.get('CACHE_ALIAS', 'default')]
+        self.key_prefix = self.options.get('KEY_PREFIX', 'chatbot:state')
+        self.lock_timeout = self.options.get('LOCK_TIMEOUT', 5)
+        # Past LOCK_TIMEOUT the lock of a worker that died holding it has expired
+        self.lock_wait = self.options.get('LOCK_WAIT', self.lock_timeout + 1)
+
+    def _key(self, user_key) -> str:
+        return f"{self.key_prefix}:{user_key}"
+
+    @contextmanager
+    def lock(self, user_key):
+        """
+        In-process stripe plus a short cache lock so workers take turns;
+        StateLockTimeout if the cache lock is not free within LOCK_WAIT.
+
+        The cache lock holds a token unique to this holder and is only
+        released while it still holds that token: if our lock expired and
+        another worker took it, theirs is left alone.
+        """
+        with super().lock(user_key):
+            lock_key = self._key(user_key) + ':lock'
+            token = uuid.uuid4().hex
+            deadline = time.monotonic() + self.lock_wait
+            while not self.cache.add(lock_key, token, self.lock_timeout):
+                if time.monotonic() >= deadline:
+                    raise StateLockTimeout(f"State of {user_key} still locked after {self.lock_wait}s")
+                time.sleep(0.01)
+            try:
+                yield
+            finally:
+                # Django's cache has no compare-and-delete; the window between
+                # the two calls is far shorter than LOCK_TIMEOUT
+                if self.cache.get(lock_key) == token:
+                    self.cache.delete(lock_key)
+
+    def load(self, user_key) -> Dict:
+        state = self.cache.get(self._key(user_key))
+        return state if state is not None else new_state()
+
+    def save(self, user_key, state: Dict) -> None:
+        self.cache.set(self._key(user_key), state, self.ttl)
+
+    def delete(self, user_key) -> None:
+        self.cache.delete(self._key(user_key))
+
+
+class SessionStateBackend(CacheStateBackend):
+    """
+    Cache-fronted write-back into UserChatSession.context_data.
+
+    Reads hit the cache first, so hot sessions never touch the database and
+    every worker sees the others' saves. Saves go to the cache immediately
+    and mark the user for write-back; the marked users are written with one
+    bulk_update per batch, once there are BATCH_SIZE of them or
+    FLUSH_INTERVAL seconds have passed, and again at interpreter exit. A
+    flush writes what the cache holds then, so a worker flushing late does
+    not overwrite a newer save from another worker. The interval is kept by
+    a timer, so an idle worker still writes back its last saves.
+
+    Only integer keys (user ids) are written back; other keys, such as the
+    'anonymous' key of logged-out chats, live in the cache alone.
+    """
+
+    def __init__(self, options: Optional[Dict] = None):
+        super().__init__(options)
+        self.batch_size = self.options.get('BATCH_SIZE', 50)
+        self.flush_interval = self.options.get('FLUSH_INTERVAL', 5.0)
+        self._dirty = {}
+        self._dirty_lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _persisted(user_key) -> bool:
+        """Whether user_key is a user id with a UserChatSession row"""
+        return isinstance(user_key, int) and not isinstance(user_key, bool)
+
+    def load(self, user_key) -> Dict:
+        if not self._persisted(user_key):
+            return super().load(user_key)
+        # The shared cache holds the latest save from any worker; this
+        # worker's pending writes only stand in when the cache lost the key
+        state = self.cache.get(self._key(user_key))
+        if state is not None:
+            return state
+        with self._dirty_lock:
+            state = self._dirty.get(user_key)
+        if state is not None:
+            self.cache.set(self._key(user_key), state, self.ttl)
+            return state
+
+        from .models import UserChatSession
+
+        stored = UserChatSession.objects.filter(user_id=user_key).values_list('context_data', flat=True).first()
+        state = new_state()
+        if stored:
+            state.update(stored)
+        self.cache.set(self._key(user_key), state, self.ttl)
+        return state
+
+    def save(self, user_key, state: Dict) -> None:
+        super().save(user_key, state)
+        if not self._persisted(user_key):
+            return
+        with self._dirty_lock:
+            self._dirty[user_key] = state
+            due = len(self._dirty) >= self.batch_size
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _flush_on_timer(self) -> None:
+        from django.db import connections
+
+        try:
+            self.flush()
+        finally:
+            # This thread's database connections are not reused
+            connections.close_all()
+
+    def delete(self, user_key) -> None:
+        super().delete(user_key)
+        with self._dirty_lock:
+            self._dirty.pop(user_key, None)
+
+    def flush(self) -> None:
+        with self._dirty_lock:
+            pending, self._dirty = self._dirty, {}
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if not pending:
+            return
+
+        from django.db import transaction
+        from django.utils import timezone
+        from .models import UserChatSession
+
+        # The latest save from any worker, or ours if the cache lost it
+        latest = self.cache.get_many([self._key(user_key) for user_key in pending])
+        for user_key in pending:
+            state = latest.get(self._key(user_key))
+            if state is not None:
+                pending[user_key] = state
+
+        with transaction.atomic():
+            UserChatSession.objects.bulk_create(
+                [UserChatSession(user_id=user_id) for user_id in pending],
+                ignore_conflicts=True,
+            )
+            sessions = list(UserChatSession.objects.filter(user_id__in=list(pending)))
+            for session in sessions:
+                state = pending[session.user_id]
+                session.context_data = state
+                session.current_mood = state.get('current_mood')
+                session.conversation_topic = state.get('last_topic')
+                session.interaction_count = state.get('interaction_count', 0)
+                session.updated_at = timezone.now()
+            UserChatSession.objects.bulk_update(
+                sessions,
+                ['context_data', 'current_mood', 'conversation_topic', 'interaction_count', 'updated_at'],
+            )
+
+    def pending(self) -> int:
+        """Number of users waiting to be written back"""
+        return len(self._dirty)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend() -> BaseStateBackend:
+    """The process-wide backend configured by settings.CHATBOT_STATE"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'CHATBOT_STATE', {})
+                backend_class = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+                _backend = backend_class(config.get('OPTIONS', {}))
+    return _backend
+
+
+def reset_state_backend() -> None:
+    """Drop the configured backend (tests and settings changes)"""
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.flush()
+        _backend = None
+
+
+def interaction_stamp(user_message: str, response: str) -> Dict:
+    """JSON-friendly record of the last exchange"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'user_message': user_message[:100],
+        'response': response[:100],
+    }
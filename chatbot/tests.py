@@ -1,3 +1,588 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from utils.executor import reset_engine_executor, run_in_engine
+
+from . import data_resources as resources
+from .catalog import ContentCatalog, get_catalog, reset_catalog, resource_entries, write_catalog
+from .decks import draw
+from .models import ChatMessage, UserChatSession
+from .router import INTENT_PRIORITY, route
+from .services import MindTrackChatbot
+from .checks import check_state_backend
+from .state import (
+    CacheStateBackend, LocMemStateBackend, SessionStateBackend, StateLockTimeout, get_state_backend, new_state,
+    reset_state_backend,
+)
+
+
+class RouterTestCase(SimpleTestCase):
+    def test_word_boundaries(self):
+        # Substring scans used to fire on words that merely contain a trigger
+        self.assertIsNone(route("this is a book about history").intent)
+        self.assertIsNone(route("this is a book about history").mood)
+        self.assertIsNone(route("I made dinner").mood)
+        self.assertEqual(route("hi there").intent, 'greeting')
+        self.assertEqual(route("I'm ok").mood, 'neutral')
+
+    def test_unhappy_is_sad(self):
+        self.assertEqual(route("I feel so unhappy today").mood, 'sad')
+
+    def test_stems(self):
+        self.assertEqual(route("I need some motivation").mood, 'motivational')
+        self.assertEqual(route("feeling inspired").mood, 'motivational')
+        self.assertEqual(route("any exercises for me?").intent, 'exercise')
+
+    def test_nepali_script(self):
+        self.assertEqual(route("नेपाली quote").intent, 'nepali_quote')
+
+    def test_how_to_must_lead(self):
+        self.assertEqual(route("how to deal with nervous feelings").intent, 'how_to')
+        self.assertEqual(route("so how do i share happiness").intent, 'how_to')
+        self.assertIsNone(route("tell me how to").intent)
+
+    def test_phrases_across_any_whitespace(self):
+        self.assertEqual(route("how\rto relax").intent, 'how_to')
+        self.assertEqual(route("how\xa0are\u2003you").intent, 'how_are_you')
+        self.assertEqual(route("so\xa0tired, how\u2003are\xa0you").mood, 'tired')
+        self.assertEqual(MindTrackChatbot.analyze_mood_from_text("not\xa0happy"), 'sad')
+
+    def test_mood_priority(self):
+        # Motivation beats every other mood, lonely beats tired, ...
+        self.assertEqual(route("lonely but I want motivation").mood, 'motivational')
+        self.assertEqual(route("tired and lonely").mood, 'lonely')
+        self.assertEqual(route("happy but tired").mood, 'tired')
+        self.assertEqual(route("sad, angry and happy").mood, 'angry')
+        self.assertEqual(route("fine, just sad").mood, 'sad')
+
+    def test_mood_intensity_and_negation(self):
+        self.assertEqual(route("so tired, a bit lonely").mood, 'tired')
+        self.assertEqual(route("I'm not happy").mood, 'sad')
+        self.assertIsNone(route("I'm not tired").mood)
+
+    def test_intent_priority(self):
+        cases = [
+            ("play a song and give me an exercise quote poem", 'music'),
+            ("an exercise tip with a quote", 'exercise'),
+            ("how to find a quote about happiness", 'how_to'),
+            ("nepali quote and poem please", 'nepali_quote'),
+            ("nepali poem", 'nepali_poem'),
+            ("quote or poem, hello", 'quote'),
+            ("a poem please, how are you", 'poem'),
+            ("hello, how are you", 'how_are_you'),
+            ("hey", 'greeting'),
+        ]
+        for message, expected in cases:
+            with self.subTest(message=message):
+                self.assertEqual(route(message).intent, expected)
+        self.assertEqual(
+            route("song exercise how do i nepali quote poem how are you hi").intents,
+            INTENT_PRIORITY,
+        )
+
+
+class ChatbotPriorityTestCase(SimpleTestCase):
+    def setUp(self):
+        self.state = new_state()
+
+    def assertTopic(self, message, topic):
+        state = new_state()
+        MindTrackChatbot._respond(state, message)
+        self.assertEqual(state['last_topic'], topic, message)
+
+    def test_branch_order(self):
+        self.assertTopic("song and a quote", 'music')
+        self.assertTopic("workout quote", 'exercise')
+        self.assertTopic("how to overcome fear, any quote?", 'advice')
+        self.assertTopic("nepali poem quote", 'quote')
+        self.assertTopic("a poem please", 'poem')
+        self.assertTopic("I am happy", 'mood')
+
+    def test_nepali_quote_comes_from_nepali_category(self):
+        response = MindTrackChatbot._respond(self.state, "nepali quote").response
+        self.assertTrue(response.startswith("Here's a Nepali quote"))
+
+    def test_greeting_only_early_in_conversation(self):
+        self.state['interaction_count'] = 5
+        MindTrackChatbot._respond(self.state, "hi")
+        self.assertIsNone(self.state['last_topic'])
+
+    def test_reply_carries_intent_mood_and_content(self):
+        reply = MindTrackChatbot._respond(self.state, "I'm so lonely, a poem please")
+        self.assertEqual((reply.intent, reply.mood, reply.topic), ('poem_request', 'lonely', 'poem'))
+        poems = get_catalog().items('en', 'poem', 'lonely')
+        index = list(poems).index(reply.response.split('\n\n', 1)[1])
+        self.assertEqual(reply.content_id, poems.content_id(index))
+
+        reply = MindTrackChatbot._respond(new_state(), "thanks, this helped")
+        self.assertEqual((reply.intent, reply.mood, reply.content_id), ('gratitude', None, None))
+
+    def test_analyze_mood_from_text(self):
+        self.assertEqual(MindTrackChatbot.analyze_mood_from_text("I'm exhausted"), 'tired')
+        self.assertIsNone(MindTrackChatbot.analyze_mood_from_text("this is a book"))
+
+
+class ContentDeckTestCase(SimpleTestCase):
+    def test_every_item_once_per_cycle(self):
+        state = new_state()
+        # Up to DENSE_MAX cards a deck lists its ids, above it only moved slots
+        for size in (1, 2, 7, 10, 12, 64, 65, 300):
+            first = [draw(state, f'quote:{size}', size) for _ in range(size)]
+            second = [draw(state, f'quote:{size}', size) for _ in range(size)]
+            self.assertEqual(sorted(first), list(range(size)))
+            self.assertEqual(sorted(second), list(range(size)))
+            if size > 1:
+                self.assertNotEqual(first[-1], second[0])
+
+    def test_deck_resets_when_category_size_changes(self):
+        state = new_state()
+        draw(state, 'poem:happy', 5)
+        self.assertLess(draw(state, 'poem:happy', 3), 3)
+        self.assertEqual(state['decks']['poem:happy'][0], -3)
+
+    def test_decks_are_real_shuffles(self):
+        rng = random.Random(5)
+        orders = set()
+        for i in range(200):
+            state = new_state()
+            order = tuple(draw(state, 'quote:x', 10, rng) for _ in range(10))
+            orders.add(order)
+            # No fixed stride between neighbouring cards
+            self.assertGreater(len({(b - a) % 10 for a, b in zip(order, order[1:])}), 1, order)
+        # A stride walk of 10 cards can only produce 4 * 10 orders
+        self.assertGreater(len(orders), 150)
+
+    def test_old_deck_layout_is_reshuffled(self):
+        state = new_state()
+        for old in ([5, 3, 1, 2], [5, 123456, 2]):
+            state['decks']['song:sad'] = old
+            self.assertLess(draw(state, 'song:sad', 5), 5)
+            self.assertEqual((state['decks']['song:sad'][0], len(state['decks']['song:sad'])), (-5, 5))
+
+    def test_first_cards_are_uniform(self):
+        rng = random.Random(9)
+        for size in (5, 70):
+            firsts = [0] * size
+            for _ in range(size * 1000):
+                firsts[draw(new_state(), 'quote:x', size, rng)] += 1
+            self.assertLess(max(firsts) - min(firsts), 200, firsts)
+
+    def test_deck_state_is_compact(self):
+        state = new_state()
+        for _ in range(50):
+            draw(state, 'song:sad', 10)
+            draw(state, 'quote:big', 1000)
+        # Small decks list their remaining ids; large ones only the slots moved
+        self.assertLess(len(json.dumps(state['decks']['song:sad'])), 40)
+        self.assertLess(len(json.dumps(state['decks']['quote:big'])), 1200)
+
+    def test_deck_survives_json_round_trip(self):
+        state = new_state()
+        for size, before in ((7, 3), (100, 30)):
+            first = [draw(state, f'quote:{size}', size) for _ in range(before)]
+            state = json.loads(json.dumps(state))
+            rest = [draw(state, f'quote:{size}', size) for _ in range(size * 2 - before)]
+            self.assertEqual(sorted(first + rest), sorted(list(range(size)) * 2))
+
+    def test_quotes_do_not_repeat_until_exhausted(self):
+        state = new_state()
+        quotes = [MindTrackChatbot._get_fresh_quote(state, 'mindfulness')[0] for _ in range(10)]
+        self.assertEqual(sorted(quotes), sorted(resources.QUOTE_CATEGORIES['mindfulness']))
+
+
+class ContentCatalogTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'catalog.bin')
+        settings_override = override_settings(CHATBOT_CATALOG={'PATH': self.path, 'CHECK_INTERVAL': 0})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_catalog()
+        self.addCleanup(reset_catalog)
+
+    def test_lookup_by_language_category_mood(self):
+        catalog = ContentCatalog.from_resources()
+        self.assertEqual(list(catalog.items('en', 'quote', 'mindfulness')),
+                         resources.QUOTE_CATEGORIES['mindfulness'])
+        self.assertEqual(list(catalog.items('ne', 'poem', 'lonely')),
+                         resources.POEM_CATEGORIES['nepali_lonely'])
+        self.assertEqual(catalog.items('en', 'song', 'sad')[0], resources.YOUTUBE_RESOURCES['sad'][0])
+        self.assertEqual(list(catalog.items('en', 'cheer_up', 'sad')),
+                         resources.MOOD_RESPONSES['sad']['cheer_up'])
+        self.assertFalse(catalog.items('en', 'quote', 'missing'))
+
+    def test_ids_are_stable_across_rebuilds(self):
+        first = write_catalog(self.path, resource_entries())
+        quotes = first.items('en', 'quote', 'mindfulness')
+        ids = {text: quotes.content_id(i) for i, text in enumerate(quotes)}
+
+        entries = [
+            (language, category, mood, kind, ["A brand new quote"] + items if mood == 'mindfulness' else items)
+            for language, category, mood, kind, items in resource_entries()
+        ]
+        second = write_catalog(self.path, entries)
+        quotes = second.items('en', 'quote', 'mindfulness')
+        self.assertEqual(second.version, first.version + 1)
+        self.assertNotIn(quotes.content_id(0), ids.values())
+        for i in range(1, len(quotes)):
+            self.assertEqual(quotes.content_id(i), ids[quotes[i]])
+
+    def test_workers_hot_swap_to_new_version(self):
+        self.assertEqual(get_catalog().version, 0)  # no compiled file yet
+        write_catalog(self.path, resource_entries())
+        held = get_catalog()
+        self.assertEqual(held.version, 1)
+
+        write_catalog(self.path, [('en', 'greeting', '', 'text', ["Namaste!"])])
+        self.assertEqual(list(get_catalog().items('en', 'greeting')), ["Namaste!"])
+        # A reply that still holds the previous version keeps reading it
+        self.assertEqual(list(held.items('en', 'greeting')), resources.GREETINGS)
+        self.assertEqual(MindTrackChatbot._respond(new_state(), "hi").response, "Namaste!")
+
+
+@override_settings(CHATBOT_STATE={'BACKEND': 'chatbot.state.LocMemStateBackend'})
+class ConversationStateTestCase(SimpleTestCase):
+    def setUp(self):
+        reset_state_backend()
+        self.addCleanup(reset_state_backend)
+
+    def test_users_do_not_share_state(self):
+        MindTrackChatbot.get_response("I feel so lonely", user_id=1)
+        MindTrackChatbot.get_response("what's up", user_id=2)
+        backend = get_state_backend()
+        self.assertEqual(backend.load(1)['current_mood'], 'lonely')
+        self.assertIsNone(backend.load(2)['current_mood'])
+        self.assertEqual(backend.load(2)['interaction_count'], 1)
+
+    def test_state_is_json_serializable(self):
+        MindTrackChatbot.get_response("give me a quote", user_id=1)
+        json.dumps(get_state_backend().load(1))
+
+    def test_respond_many_matches_reply(self):
+        messages = [(1, "hi"), (2, "I feel lonely"), (1, "a quote please"), (None, "play a song"),
+                    (2, "a poem"), (1, "a quote please"), (2, "I'm not happy")]
+        random.seed(42)
+        batch = MindTrackChatbot.respond_many(messages)
+        batch_states = {user: get_state_backend().load(user) for user in (1, 2, 'anonymous')}
+
+        reset_state_backend()
+        random.seed(42)
+        # respond_many answers user by user, in order of first appearance
+        single = {}
+        for user in (1, 2, None):
+            for position, (user_id, message) in enumerate(messages):
+                if user_id == user:
+                    single[position] = MindTrackChatbot.reply(message, user_id=user_id)
+        self.assertEqual(batch, [single[position] for position in range(len(messages))])
+        for user, state in batch_states.items():
+            expected = get_state_backend().load(user)
+            self.assertEqual(state['decks'], expected['decks'])
+            self.assertEqual(state['interaction_count'], expected['interaction_count'])
+            self.assertEqual(state['current_mood'], expected['current_mood'])
+
+    def test_lru_eviction_and_ttl(self):
+        backend = LocMemStateBackend({'MAX_ENTRIES': 2, 'TTL': 60})
+        for user_id in (1, 2, 3):
+            state = new_state()
+            state['interaction_count'] = user_id
+            backend.save(user_id, state)
+        self.assertEqual(len(backend), 2)
+        self.assertEqual(backend.load(1)['interaction_count'], 0)
+        self.assertEqual(backend.load(3)['interaction_count'], 3)
+
+        expired = LocMemStateBackend({'TTL': -1})
+        expired.save(1, {'interaction_count': 9})
+        self.assertEqual(expired.load(1)['interaction_count'], 0)
+
+    def test_concurrent_users(self):
+        def chat(user_id):
+            for _ in range(20):
+                MindTrackChatbot.get_response("I am happy", user_id=user_id)
+
+        threads = [threading.Thread(target=chat, args=(user_id,)) for user_id in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for user_id in range(8):
+            self.assertEqual(get_state_backend().load(user_id)['interaction_count'], 20)
+
+
+class CacheStateBackendTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CacheStateBackend({'LOCK_TIMEOUT': 5, 'LOCK_WAIT': 0.05})
+
+    def test_lock_wait_times_out(self):
+        # Another worker holds user 1's lock
+        cache.add(self.backend._key(1) + ':lock', 1, 5)
+        with self.assertRaises(StateLockTimeout):
+            with self.backend.lock(1):
+                self.fail("entered without the lock")
+        with self.backend.lock(2):
+            pass
+
+        cache.delete(self.backend._key(1) + ':lock')
+        with self.backend.lock(1):
+            self.assertIsNotNone(cache.get(self.backend._key(1) + ':lock'))
+        self.assertIsNone(cache.get(self.backend._key(1) + ':lock'))
+
+    def test_lock_release_keeps_another_holders_lock(self):
+        lock_key = self.backend._key(1) + ':lock'
+        with self.backend.lock(1):
+            # Our lock expired mid-turn and another worker took it
+            cache.set(lock_key, 'other-worker', 5)
+        self.assertEqual(cache.get(lock_key), 'other-worker')
+
+    def test_deploy_check_flags_per_process_state(self):
+        def check_ids(backend):
+            with override_settings(CHATBOT_STATE={'BACKEND': backend}):
+                return [warning.id for warning in check_state_backend(None)]
+
+        self.assertEqual(check_ids('chatbot.state.LocMemStateBackend'), ['chatbot.W001'])
+        self.assertEqual(check_ids('chatbot.state.SessionStateBackend'), ['chatbot.W002'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                   'LOCATION': 'redis://localhost:6379'}}):
+            self.assertEqual(check_ids('chatbot.state.SessionStateBackend'), [])
+
+
+class SessionStateBackendTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'user{i}', password='x') for i in range(3)]
+        self.backend = SessionStateBackend({'BATCH_SIZE': 3, 'FLUSH_INTERVAL': 3600})
+        self.addCleanup(self.backend.flush)
+
+    def test_hot_sessions_skip_the_database(self):
+        state = self.backend.load(self.users[0].id)
+        state['current_mood'] = 'happy'
+        self.backend.save(self.users[0].id, state)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.load(self.users[0].id)['current_mood'], 'happy')
+
+    def test_write_back_is_batched(self):
+        with self.assertNumQueries(0):
+            for user in self.users[:2]:
+                state = new_state()
+                state['current_mood'] = 'sad'
+                self.backend.save(user.id, state)
+        self.assertEqual(self.backend.pending(), 2)
+
+        state = new_state()
+        state['current_mood'] = 'sad'
+        self.backend.save(self.users[2].id, state)
+        self.assertEqual(self.backend.pending(), 0)
+        sessions = UserChatSession.objects.filter(user__in=self.users)
+        self.assertEqual(sessions.count(), 3)
+        self.assertEqual({s.current_mood for s in sessions}, {'sad'})
+
+    def test_workers_see_each_others_saves(self):
+        # Two workers sharing the cache, each with its own write-back queue
+        other = SessionStateBackend({'BATCH_SIZE': 3, 'FLUSH_INTERVAL': 3600})
+        self.addCleanup(other.flush)
+        user_id = self.users[0].id
+        for backend in (self.backend, other, self.backend, other):
+            with backend.lock(user_id):
+                state = backend.load(user_id)
+                state['interaction_count'] += 1
+                backend.save(user_id, state)
+        self.assertEqual(self.backend.load(user_id)['interaction_count'], 4)
+        self.assertEqual(other.load(user_id)['interaction_count'], 4)
+
+        # Whichever queue is written last, the database gets the latest state
+        other.flush()
+        self.backend.flush()
+        cache.clear()
+        self.assertEqual(self.backend.load(user_id)['interaction_count'], 4)
+
+    def test_anonymous_state_stays_out_of_the_database(self):
+        state = self.backend.load('anonymous')
+        state['current_mood'] = 'calm'
+        with self.assertNumQueries(0):
+            self.backend.save('anonymous', state)
+            self.assertEqual(self.backend.pending(), 0)
+            self.backend.flush()
+        self.assertEqual(self.backend.load('anonymous')['current_mood'], 'calm')
+        self.assertFalse(UserChatSession.objects.exists())
+
+    def test_idle_worker_flushes_after_the_interval(self):
+        backend = SessionStateBackend({'FLUSH_INTERVAL': 0.01})
+        self.addCleanup(backend.flush)
+        flushed = threading.Event()
+        with mock.patch.object(backend, 'flush', side_effect=flushed.set):
+            backend.save(self.users[0].id, new_state())
+            self.assertTrue(flushed.wait(5))
+
+    def test_state_survives_cache_loss(self):
+        state = new_state()
+        state['last_topic'] = 'poem'
+        self.backend.save(self.users[0].id, state)
+        self.backend.flush()
+        cache.clear()
+        self.assertEqual(self.backend.load(self.users[0].id)['last_topic'], 'poem')
+
+
+@override_settings(CHATBOT_STATE={'BACKEND': 'chatbot.state.LocMemStateBackend'})
+class SendMessageViewTestCase(TestCase):
+    def setUp(self):
+        reset_state_backend()
+        self.addCleanup(reset_state_backend)
+        self.user = User.objects.create_user(username='chatter', password='x')
+        self.client.force_login(self.user)
+
+    def send(self, message, **extra):
+        return self.client.post(reverse('chatbot:send_message'), json.dumps(dict(message=message, **extra)),
+                                content_type='application/json').json()
+
+    def test_exchange_is_saved_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.send("I feel so lonely, any song?")
+        inserts = [q['sql'] for q in queries if q['sql'].startswith('INSERT') and 'chatbot_chatmessage' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+
+        user_chat, bot_chat = ChatMessage.objects.filter(user=self.user).order_by('created_at', 'id')
+        self.assertEqual(data['message_id'], user_chat.id)
+        self.assertEqual((data['intent_detected'], data['mood_context']), ('music_request', 'lonely'))
+        self.assertEqual((bot_chat.message, bot_chat.intent_detected), (data['response'], 'music_request'))
+        self.assertEqual({user_chat.mood_context, bot_chat.mood_context}, {'lonely'})
+
+    def test_history_keeps_exchange_order(self):
+        for message in ("hello", "a quote please", "thanks"):
+            self.send(message)
+        history = self.client.get(reverse('chatbot:get_history')).json()['history']
+        self.assertEqual([item['is_user'] for item in history], [True, False] * 3)
+        self.assertEqual([item['intent_detected'] for item in history[1::2]],
+                         ['greeting', 'quote_request', 'gratitude'])
+
+    async def test_concurrent_sends_from_one_worker(self):
+        await self.async_client.aforce_login(self.user)
+        responses = await asyncio.gather(*(
+            self.async_client.post(reverse('chatbot:send_message'), json.dumps({'message': f"a quote please #{i}"}),
+                                   content_type='application/json')
+            for i in range(8)
+        ))
+        self.assertTrue(all(response.json()['success'] for response in responses))
+        self.assertEqual(await ChatMessage.objects.filter(user=self.user).acount(), 16)
+        self.assertEqual(get_state_backend().load(self.user.id)['interaction_count'], 8)
+
+
+
+class ChatHistoryPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='x')
+        other = User.objects.create_user(username='other', password='x')
+        ChatMessage.objects.bulk_create(
+            [ChatMessage(user=self.user, message=f"m{i}", is_user=i % 2 == 0) for i in range(120)]
+            + [ChatMessage(user=other, message="not yours") for _ in range(5)]
+        )
+        self.ids = list(ChatMessage.objects.filter(user=self.user).order_by('id').values_list('id', flat=True))
+        self.client.force_login(self.user)
+
+    def history(self, **params):
+        return self.client.get(reverse('chatbot:get_history'), params)
+
+    def test_newest_page_first(self):
+        data = self.history().json()
+        self.assertEqual([item['id'] for item in data['history']], self.ids[-50:])
+        self.assertTrue(data['has_more'])
+        self.assertEqual((data['oldest_id'], data['newest_id']), (self.ids[-50], self.ids[-1]))
+
+    def test_before_walks_back_to_the_start(self):
+        pages, before = [], None
+        while True:
+            data = self.history(**({'before': before} if before else {})).json()
+            pages.append([item['id'] for item in data['history']])
+            if not data['has_more']:
+                break
+            before = data['oldest_id']
+        self.assertEqual([len(page) for page in pages], [50, 50, 20])
+        self.assertEqual(sorted(sum(pages, [])), self.ids)
+
+    def test_after_and_since(self):
+        data = self.history(after=self.ids[9], limit=5).json()
+        self.assertEqual([item['id'] for item in data['history']], self.ids[10:15])
+        self.assertTrue(data['has_more'])
+
+        data = self.history(since=self.ids[-3]).json()
+        self.assertEqual([item['id'] for item in data['history']], self.ids[-2:])
+        self.assertFalse(data['has_more'])
+        # A client that fell far behind gets the newest page and is told so
+        data = self.history(since=self.ids[0], limit=10).json()
+        self.assertEqual([item['id'] for item in data['history']], self.ids[-10:])
+        self.assertTrue(data['has_more'])
+
+        data = self.history(since=self.ids[-1]).json()
+        self.assertEqual((data['history'], data['newest_id']), ([], self.ids[-1]))
+
+    def test_idle_poll_is_not_modified(self):
+        response = self.history(since=self.ids[-1])
+        etag = response['ETag']
+        with self.assertNumQueries(3):  # session, user, newest id
+            response = self.client.get(reverse('chatbot:get_history'), {'since': self.ids[-1]},
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        ChatMessage.objects.create(user=self.user, message="new")
+        response = self.client.get(reverse('chatbot:get_history'), {'since': self.ids[-1]},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['message'] for item in response.json()['history']], ["new"])
+
+    def test_invalid_cursor(self):
+        data = self.history(before='abc').json()
+        self.assertEqual((data['success'], data['error']), (False, "'before' must be a message id"))
+        self.assertEqual(len(self.history(limit=10000).json()['history']), 120)
+
+    def test_export_streams_the_whole_history(self):
+        response = self.client.get(reverse('chatbot:export_history', args=['ndjson']))
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['id'] for record in records], self.ids)
+        self.assertEqual((records[0]['message'], records[0]['is_user']), ('m0', True))
+
+        response = self.client.get(reverse('chatbot:export_history', args=['csv']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,created_at,is_user,message,mood_context,intent_detected')
+        self.assertEqual(len(lines), 121)
+
+class EngineExecutorTestCase(SimpleTestCase):
+    def setUp(self):
+        reset_engine_executor()
+        self.addCleanup(reset_engine_executor)
+
+    @override_settings(ENGINE_EXECUTOR={'MAX_WORKERS': 2})
+    def test_engine_work_is_bounded(self):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+        release = threading.Event()
+
+        def work(i):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            release.wait(1)
+            with lock:
+                running[0] -= 1
+            return i
+
+        async def main():
+            tasks = [asyncio.ensure_future(run_in_engine(work, i)) for i in range(6)]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*tasks)
+
+        self.assertEqual(asyncio.run(main()), list(range(6)))
+        self.assertEqual(peak[0], 2)
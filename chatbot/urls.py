@@ -9,4 +9,5 @@ urlpatterns = [
     path('send/', views.send_message, name='send_message'),
     path('history/', views.get_chat_history, name='get_history'),
     path('clear/', views.clear_chat_history, name='clear_history'),
+    path('export/<str:fmt>/', views.export_chat_history, name='export_history'),
 ]
\ No newline at end of file
@@ -1,13 +1,19 @@
 # chatbot/views.py
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.db.models import Max
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import json
 import traceback
 
+from utils.executor import run_in_engine
+from utils.exports import FORMATS as EXPORT_FORMATS, streaming_export
+
 from .services import MindTrackChatbot
+from .state import get_state_backend
 from .models import ChatMessage, UserChatSession
 
 from django.utils import timezone
@@ -16,6 +22,10 @@ import pytz
 # Default timezone for Nepal
 NEPAL_TZ = pytz.timezone('Asia/Kathmandu')
 
+# Messages per history page (?limit= may ask for up to HISTORY_PAGE_MAX)
+HISTORY_PAGE_SIZE = 50
+HISTORY_PAGE_MAX = 200
+
 
 @login_required
 def chat_view(request):
@@ -23,8 +33,8 @@ def chat_view(request):
     # Get or create user session
     UserChatSession.objects.get_or_create(user=request.user)
     
-    # Get recent chat history (last 50 messages)
-    chat_history = ChatMessage.objects.filter(user=request.user).order_by('created_at')[:50]
+    # Get recent chat history (last 50 messages, newest first)
+    chat_history = ChatMessage.objects.filter(user=request.user).order_by('-id')[:HISTORY_PAGE_SIZE]
 
     return render(request, 'chatbot/chat.html', {
         'user': request.user,
@@ -35,7 +45,7 @@ def chat_view(request):
 @login_required
 @require_POST
 @csrf_exempt
-def send_message(request):
+async def send_message(request):
     """Handle sending and receiving chat messages"""
     try:
         data = json.loads(request.body)
@@ -48,52 +58,32 @@ def send_message(request):
                 'error': 'Message cannot be empty'
             })
 
-        # Detect mood if not provided
-        if not mood_context:
-            mood_context = MindTrackChatbot.analyze_mood_from_text(user_message)
-
-        # Save user message
-        user_chat = ChatMessage.objects.create(
-            user=request.user,
-            message=user_message,
-            is_user=True,
-            mood_context=mood_context
-        )
-
-        # Get bot response (ORIGINAL WAY - returns string only)
-        bot_response = MindTrackChatbot.get_response(user_message, mood_context)
-
-        # Determine intent for database
-        user_message_lower = user_message.lower()
-        if 'quote' in user_message_lower:
-            intent_detected = 'quote_request'
-        elif 'poem' in user_message_lower or 'poetry' in user_message_lower:
-            intent_detected = 'poem_request'
-        elif 'music' in user_message_lower or 'song' in user_message_lower or 'youtube' in user_message_lower:
-            intent_detected = 'music_request'
-        elif 'exercise' in user_message_lower or 'workout' in user_message_lower or 'activity' in user_message_lower:
-            intent_detected = 'activity_request'
-        elif 'nepali' in user_message_lower:
-            intent_detected = 'nepali_request'
-        elif 'how are you' in user_message_lower:
-            intent_detected = 'greeting'
-        elif 'hello' in user_message_lower or 'hi' in user_message_lower or 'hey' in user_message_lower:
-            intent_detected = 'greeting'
-        elif 'thank' in user_message_lower:
-            intent_detected = 'gratitude'
-        elif 'bye' in user_message_lower or 'goodbye' in user_message_lower:
-            intent_detected = 'farewell'
-        else:
-            intent_detected = 'conversation'
+        user = await request.auser()
 
-        # Save bot response with context
-        bot_chat = ChatMessage.objects.create(
-            user=request.user,
-            message=bot_response,
-            is_user=False,
-            mood_context=mood_context,
-            intent_detected=intent_detected
-        )
+        # One routing pass gives the reply, its intent and the message's mood;
+        # the engine runs on the bounded engine pool, not the event loop
+        reply = await run_in_engine(MindTrackChatbot.reply, user_message, mood_context, user.id)
+        mood_context = mood_context or reply.mood
+        bot_response = reply.response
+        intent_detected = reply.intent
+
+        # Save both sides of the exchange together, in one INSERT
+        # (bulk_create runs it in a single transaction)
+        user_chat, bot_chat = await ChatMessage.objects.abulk_create([
+            ChatMessage(
+                user=user,
+                message=user_message,
+                is_user=True,
+                mood_context=mood_context
+            ),
+            ChatMessage(
+                user=user,
+                message=bot_response,
+                is_user=False,
+                mood_context=mood_context,
+                intent_detected=intent_detected
+            ),
+        ])
 
         # Convert bot timestamp to Nepal timezone
         local_time = timezone.localtime(bot_chat.created_at, NEPAL_TZ)
@@ -128,12 +118,70 @@ def send_message(request):
         })
 
 
+def _cursor(request, name):
+    """Optional positive integer query parameter (a ChatMessage id)"""
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    if not value.isdigit():
+        raise ValueError(f"'{name}' must be a message id")
+    return int(value)
+
+
 @login_required
-def get_chat_history(request):
-    """Get chat history for the user"""
+async def get_chat_history(request):
+    """
+    Get chat history for the user, a page at a time (items oldest first).
+
+    No cursor: the newest `limit` messages
+    ?before=<id>: the newest `limit` messages older than <id> (scroll back)
+    ?after=<id>: the oldest `limit` messages newer than <id> (page forward)
+    ?since=<id>: delta sync, the messages newer than <id>; if more than
+                 `limit` arrived, only the newest `limit` (has_more is true)
+
+    Pages are keyset queries on (user, id), so latency does not grow with
+    the size of the history. Responses carry an ETag of the user's newest
+    message id; a poll with a matching If-None-Match gets a 304 after one
+    index lookup.
+    """
     try:
-        # Get last 50 messages in chronological order
-        chat_history = ChatMessage.objects.filter(user=request.user).order_by('created_at')[:50]
+        try:
+            before = _cursor(request, 'before')
+            after = _cursor(request, 'after')
+            since = _cursor(request, 'since')
+            limit = min(_cursor(request, 'limit') or HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+
+        user = await request.auser()
+        messages = ChatMessage.objects.filter(user=user)
+
+        # Ids only grow, and clearing the history removes the newest one, so
+        # the newest id changes whenever any page could have changed
+        latest_id = (await messages.aaggregate(latest_id=Max('id')))['latest_id']
+        etag = f'"chat-{user.id}-{latest_id or 0}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        if after is not None:
+            page = messages.filter(id__gt=after).order_by('id')
+        else:
+            if before is not None:
+                messages = messages.filter(id__lt=before)
+            if since is not None:
+                messages = messages.filter(id__gt=since)
+            page = messages.order_by('-id')
+
+        # One extra row tells whether there is more beyond this page
+        chat_history = [chat async for chat in page[:limit + 1]]
+        has_more = len(chat_history) > limit
+        chat_history = chat_history[:limit]
+        if after is None:
+            chat_history.reverse()
 
         history_data = []
         for chat in chat_history:
@@ -150,11 +198,19 @@ def get_chat_history(request):
                 'date': local_time.strftime('%Y-%m-%d')
             })
 
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
             'history': history_data,
-            'total_messages': len(history_data)
+            'total_messages': len(history_data),
+            'has_more': has_more,
+            # Cursors for the next requests: ?before=oldest_id, ?since=newest_id
+            'oldest_id': history_data[0]['id'] if history_data else None,
+            'newest_id': history_data[-1]['id'] if history_data else (since or after),
         })
+        response['ETag'] = etag
+        # Let browsers keep the page but revalidate it on every request
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     except Exception as e:
         return JsonResponse({
@@ -180,6 +236,7 @@ def clear_chat_history(request):
         session.interaction_count = 0
         session.context_data = {}
         session.save()
+        get_state_backend().delete(request.user.id)
         
         return JsonResponse({
             'success': True,
@@ -190,4 +247,13 @@ def clear_chat_history(request):
         return JsonResponse({
             'success': False,
             'error': str(e)
-        })
\ No newline at end of file
+        })
+
+@login_required
+def export_chat_history(request, fmt):
+    """Stream the user's whole chat history as CSV or NDJSON"""
+    if fmt not in EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+    messages = ChatMessage.objects.filter(user=request.user).order_by('id')
+    columns = ['id', 'created_at', 'is_user', 'message', 'mood_context', 'intent_detected']
+    return streaming_export(messages, columns, fmt, f"mindtrack_chat_{request.user.username}")
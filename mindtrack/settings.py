@@ -167,6 +167,115 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',  # Default backend as fallback
 ]
 
+# Chatbot conversation state (see chatbot/state.py). LocMemStateBackend is
+# single process only: under several workers (gunicorn -w N) each keeps its
+# own copy and conversations diverge. Multi-worker deployments must set
+# CHATBOT_STATE_BACKEND=chatbot.state.SessionStateBackend (persisted into
+# UserChatSession) or CacheStateBackend, with CACHES['default'] on a shared
+# cache such as Redis; `manage.py check --deploy` warns otherwise.
+CHATBOT_STATE = {
+    'BACKEND': os.getenv('CHATBOT_STATE_BACKEND', 'chatbot.state.LocMemStateBackend'),
+    'OPTIONS': {
+        'MAX_ENTRIES': 10000,
+        'TTL': 6 * 60 * 60,
+    },
+}
+
+# Compiled chatbot content (see chatbot/catalog.py). Rebuild with
+# `python manage.py build_chatbot_catalog`; workers pick up the new version
+# within CHECK_INTERVAL seconds. Without the file, data_resources.py is used.
+CHATBOT_CATALOG = {
+    'PATH': BASE_DIR / 'var' / 'chatbot_catalog.bin',
+    'CHECK_INTERVAL': 5,
+}
+
+# Threads that run chatbot/mood engine work for async views (see
+# utils/executor.py). CPU-bound, so about one per core is plenty.
+ENGINE_EXECUTOR = {
+    'MAX_WORKERS': 4,
+}
+
+# PDF mood reports (see analysis/reports.py): at most MAX_ROWS entries,
+# read CHUNK_SIZE at a time, buffered in memory up to SPOOL_MAX_SIZE bytes
+# before spilling to a temp file.
+MOOD_REPORT = {
+    'MAX_ROWS': 2000,
+    'CHUNK_SIZE': 500,
+    'SPOOL_MAX_SIZE': 4 * 1024 * 1024,
+}
+
+# Background report jobs (see analysis/jobs.py), rendered by
+# `python manage.py run_report_worker`. Finished reports are kept in
+# ARTIFACT_DIR; a job running longer than STALE_AFTER seconds is retried.
+REPORT_JOBS = {
+    'ARTIFACT_DIR': BASE_DIR / 'var' / 'reports',
+    'POLL_INTERVAL': 1.0,
+    'STALE_AFTER': 15 * 60,
+    'MAX_ATTEMPTS': 3,
+}
+
+# Hugging Face inference API for mood analysis (see analysis/inference.py).
+# Texts are sent BATCH_SIZE per call over up to POOL_SIZE keep-alive
+# connections; failed calls are retried RETRIES times with jittered backoff.
+HF_INFERENCE = {
+    'API_URL': os.getenv(
+        'HF_API_URL', 'https://api-inference.huggingface.co/models/j-hartmann/emotion-english-distilroberta-base'),
+    'API_KEY': os.getenv('HF_API_KEY', ''),
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10.0,
+    'RETRIES': 2,
+    'BACKOFF': 0.5,
+    'BATCH_SIZE': 32,
+    'POOL_SIZE': 10,
+}
+
+# Offline mood classifier (see analysis/classifier.py). Train with
+# `python manage.py train_mood_classifier`; workers memory-map PATH and
+# pick up a retrained model within CHECK_INTERVAL seconds.
+MOOD_CLASSIFIER = {
+    'PATH': BASE_DIR / 'var' / 'mood_classifier.npy',
+    'CHECK_INTERVAL': 5,
+}
+
+# Engine behind MoodAnalyzer.analyze (see analysis/services.py):
+# 'simulated' (keyword lexicon), 'local' (trained classifier), 'api', or
+# 'cascade': the lexicon, escalating texts whose top mood leads by less
+# than CASCADE['MIN_MARGIN'] to CASCADE['ENGINE'].
+# API calls get DEADLINE seconds and go through a circuit breaker (see
+# analysis/breaker.py); when it is open they fall back to the lexicon.
+MOOD_ANALYZER = {
+    'ENGINE': 'simulated',
+    'CASCADE': {
+        'ENGINE': 'local',
+        'MIN_MARGIN': 0.3,
+    },
+    'DEADLINE': 2.0,
+    'BREAKER': {
+        'WINDOW': 60.0,
+        'MIN_CALLS': 10,
+        'ERROR_RATE': 0.5,
+        'P95_LATENCY': 2.0,
+        'OPEN_SECONDS': 30.0,
+        'PROBES': 1,
+    },
+}
+
+# Analysis results by (engine, normalised text); see analysis/result_cache.py.
+# MAX_ENTRIES per worker in memory, then CACHE_ALIAS for TIMEOUT seconds.
+ANALYSIS_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 30 * 24 * 60 * 60,
+}
+
+# Journal imports (see analysis/ingest.py): entries are analyzed and stored
+# BATCH_SIZE at a time; the analysis/api/import/ endpoint takes at most
+# MAX_ENTRIES per request. Large files: `python manage.py import_journal`.
+MOOD_IMPORT = {
+    'BATCH_SIZE': 500,
+    'MAX_ENTRIES': 500,
+}
+
 # Login URLs
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
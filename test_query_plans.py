@@ -0,0 +1,174 @@
+"""
+Query-plan regression suite.
+
+Requests every page and endpoint that reads a user's mood analyses or chat
+messages, captures their SQL, EXPLAINs each statement on a seeded dataset
+and fails if any of them scans a whole table or sorts raw rows instead of
+reading them in index order. Sorting the handful of rows a GROUP BY
+produced (e.g. "ORDER BY count") is fine.
+
+Runs on whichever database the settings point at: SQLite (EXPLAIN QUERY
+PLAN) or PostgreSQL (EXPLAIN (FORMAT JSON), with enable_seqscan and
+enable_sort off so small tables still show whether an index can serve the
+query). Other backends are skipped.
+"""
+import json
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from analysis.models import MoodAnalysis, MoodDailyRollup
+from analysis.rollups import rebuild_rollups
+from chatbot.models import ChatMessage
+
+# Tables whose per-user queries must stay on an index
+TABLES = (MoodAnalysis._meta.db_table, ChatMessage._meta.db_table, MoodDailyRollup._meta.db_table)
+
+MOODS = [mood for mood, _label in MoodAnalysis.MOOD_CHOICES]
+
+
+def sqlite_problems(sql, rows, group_sort_ok):
+    """Problems in EXPLAIN QUERY PLAN rows (id, parent, notused, detail)"""
+    problems = []
+    for _id, _parent, _notused, detail in rows:
+        scan = re.match(r'SCAN (\w+)', detail)
+        if scan and scan.group(1) in TABLES:
+            problems.append(detail)
+        elif detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail:
+            # Ordering aggregated rows is cheap; ordering raw rows is not
+            if 'GROUP BY' not in sql:
+                problems.append(detail)
+        elif detail.startswith('USE TEMP B-TREE FOR') and not group_sort_ok:
+            problems.append(detail)
+    return problems
+
+
+def postgres_problems(node, group_sort_ok, parent=None):
+    """Problems in one node of an EXPLAIN (FORMAT JSON) plan tree, recursively"""
+    problems = []
+    kind = node['Node Type']
+    children = node.get('Plans', [])
+    if kind == 'Seq Scan' and node.get('Relation Name') in TABLES:
+        problems.append(f"Seq Scan on {node['Relation Name']}")
+    elif kind in ('Sort', 'Incremental Sort'):
+        sorts_groups = any(child['Node Type'] == 'Aggregate' for child in children)
+        feeds_group_by = parent is not None and parent['Node Type'] == 'Aggregate'
+        if not sorts_groups and not (group_sort_ok and feeds_group_by):
+            problems.append(f"{kind} on {', '.join(node.get('Sort Key', []))}")
+    for child in children:
+        problems.extend(postgres_problems(child, group_sort_ok, node))
+    return problems
+
+
+class QueryPlanTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'planner{i}', password='x') for i in range(3)]
+        now = timezone.now()
+        for user in cls.users:
+            # Entries spread over 90 days
+            MoodAnalysis.objects.bulk_create(
+                MoodAnalysis(user=user, text=f"entry {i}", detected_mood=MOODS[i % len(MOODS)], confidence=0.8,
+                             created_at=now - timedelta(hours=7 * i))
+                for i in range(300)
+            )
+            ChatMessage.objects.bulk_create(
+                ChatMessage(user=user, message=f"message {i}", is_user=i % 2 == 0) for i in range(300)
+            )
+        # bulk writes skip the rollup signals
+        rebuild_rollups()
+        cls.user = cls.users[1]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('; '.join(f"ANALYZE {table}" for table in TABLES))
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f"no plan checks for {connection.vendor}")
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off; SET enable_sort = off")
+            self.addCleanup(self._reset_planner)
+        self.client.force_login(self.user)
+
+    def _reset_planner(self):
+        with connection.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan; RESET enable_sort")
+
+    def problems(self, sql, group_sort_ok=False):
+        """(problems, printable plan) for one statement"""
+        plan = self.explain(sql)
+        if connection.vendor == 'sqlite':
+            return sqlite_problems(sql, plan, group_sort_ok), '\n'.join(row[3] for row in plan)
+        return postgres_problems(plan, group_sort_ok), json.dumps(plan, indent=2)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                return cursor.fetchall()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            plan = cursor.fetchone()[0]
+            return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+    def assertIndexedPlans(self, method, url, group_sort_ok=False, **params):
+        """Request url and check the plan of every statement it ran on TABLES"""
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, params)
+            if response.streaming:
+                # Streamed bodies run their queries as they are consumed
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url)
+
+        checked = 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')) or not any(f'"{table}"' in sql for table in TABLES):
+                continue
+            problems, shown = self.problems(sql, group_sort_ok)
+            self.assertFalse(problems, f"{url}: {problems}\n{sql}\n{shown}")
+            checked += 1
+        self.assertTrue(checked, f"{url} ran no queries on {TABLES}")
+
+    def test_dashboard(self):
+        self.assertIndexedPlans('get', reverse('dashboard'))
+
+    def test_analytics(self):
+        # Ranged pies and weekly/monthly buckets group rollup rows read from
+        # the (user, day) index; SQLite can only group those by sorting, but
+        # it sorts at most one row per day and mood
+        for range_key in ('30d', '1y', 'all'):
+            self.assertIndexedPlans('get', reverse('analysis:analytics'), group_sort_ok=True, range=range_key)
+
+    def test_pdf_export(self):
+        self.assertIndexedPlans('get', reverse('analysis:export_pdf'))
+
+    def test_data_exports(self):
+        for fmt in ('csv', 'ndjson'):
+            self.assertIndexedPlans('get', reverse('analysis:export_analyses', args=[fmt]))
+            self.assertIndexedPlans('get', reverse('chatbot:export_history', args=[fmt]))
+
+    def test_chat_history_pages(self):
+        newest = ChatMessage.objects.filter(user=self.user).latest('id').id
+        url = reverse('chatbot:get_history')
+        self.assertIndexedPlans('get', url)
+        self.assertIndexedPlans('get', url, before=newest - 100)
+        self.assertIndexedPlans('get', url, after=newest - 100)
+        self.assertIndexedPlans('get', url, since=newest - 2)
+
+    def test_clear_chat_history(self):
+        self.assertIndexedPlans('post', reverse('chatbot:clear_history'))
+
+    def test_checker_flags_unindexed_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(ChatMessage.objects.filter(message='message 1').order_by('message'))
+            list(MoodAnalysis.objects.filter(user=self.user).order_by('confidence'))
+        scan, sort = (self.problems(query['sql'])[0] for query in queries.captured_queries)
+        self.assertTrue(scan)
+        self.assertTrue(sort)
@@ -0,0 +1,61 @@
+# utils/executor.py
+"""
+Bounded thread pool for CPU-bound engine work called from async views.
+
+The chatbot engine and mood scoring are plain synchronous Python. Async
+views hand them to run_in_engine() instead of running them on the event
+loop; at most settings.ENGINE_EXECUTOR['MAX_WORKERS'] calls run at once
+and the rest queue without holding a thread each.
+
+    reply = await run_in_engine(MindTrackChatbot.reply, text, None, user.id)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+DEFAULT_MAX_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_engine_executor() -> ThreadPoolExecutor:
+    """The process-wide engine pool, created on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = getattr(settings, 'ENGINE_EXECUTOR', {})
+                _executor = ThreadPoolExecutor(
+                    max_workers=config.get('MAX_WORKERS', DEFAULT_MAX_WORKERS),
+                    thread_name_prefix='mindtrack-engine',
+                )
+    return _executor
+
+
+def reset_engine_executor():
+    """Shut the pool down; the next call builds it from current settings"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _run(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Engine code may touch the DB (e.g. SessionStateBackend); pool
+        # threads outlive requests, so honour CONN_MAX_AGE here too
+        close_old_connections()
+
+
+async def run_in_engine(func, *args, **kwargs):
+    """Await func(*args, **kwargs) on the bounded engine pool"""
+    return await sync_to_async(partial(_run, func), thread_sensitive=False,
+                               executor=get_engine_executor())(*args, **kwargs)
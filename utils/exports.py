@@ -0,0 +1,91 @@
+# utils/exports.py
+"""
+Streaming CSV / NDJSON exports of a queryset.
+
+The response starts with no query run: the CSV header (or nothing, for
+NDJSON) goes out first, then rows are read through a server-side cursor
+(QuerySet.values_list().iterator()) and encoded into chunks of about
+CHUNK_BYTES. Memory therefore depends on the chunk size, not on how many
+rows the user has.
+
+    return streaming_export(ChatMessage.objects.filter(user=user).order_by('id'),
+                            ['id', 'created_at', 'message'], 'csv', 'chat')
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from django.http import StreamingHttpResponse
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+CHUNK_BYTES = 64 * 1024
+FETCH_SIZE = 2000
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def csv_chunks(columns, rows, chunk_bytes=CHUNK_BYTES):
+    """CSV text of the header and rows, in chunks of about chunk_bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # The header alone, so the first byte does not wait for the query
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, rows, chunk_bytes=CHUNK_BYTES):
+    """One JSON object per row and line, in chunks of about chunk_bytes"""
+    lines, size = [], 0
+    for number, row in enumerate(rows):
+        line = json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default)
+        lines.append(line)
+        size += len(line) + 1
+        # The first row goes out alone, as soon as the cursor returns it
+        if size >= chunk_bytes or number == 0:
+            yield '\n'.join(lines) + '\n'
+            lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_rows(queryset, columns, fetch_size=FETCH_SIZE):
+    """Tuples of columns from queryset, read with a server-side cursor once iterated"""
+    yield from queryset.values_list(*columns).iterator(chunk_size=fetch_size)
+
+
+def streaming_export(queryset, columns, fmt, filename):
+    """A StreamingHttpResponse download of queryset's columns as fmt ('csv' or 'ndjson')"""
+    rows = export_rows(queryset, columns)
+    chunks = csv_chunks(columns, rows) if fmt == 'csv' else ndjson_chunks(columns, rows)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    # Proxies such as nginx would otherwise buffer the whole download
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,280 @@
+# utils/lexicon.py
+"""
+Shared keyword mood lexicon engine.
+
+A Lexicon compiles its mood words, intensifiers and negators once into a
+token table (stems are resolved once per new spelling and cached) and
+scores every mood in a single pass over the tokens. The result is a dense
+score vector: a list of floats in the order of `lexicon.moods`.
+
+    scores = ANALYSIS_LEXICON.score("I'm not happy, I'm so worried")
+    ANALYSIS_LEXICON.dominant(scores)   # 'fear'
+
+Scoring rules:
+    - each mood word adds 1.0 to every mood it belongs to
+    - an intensifier directly before a word multiplies it ('so very happy')
+    - a negator up to NEGATION_WINDOW words before a word sends its weight to
+      the lexicon's negated mood instead ('not happy' -> sad), or drops it
+    - negation and intensity do not carry past . ! ? ;
+
+Words are whole tokens; a trailing '*' marks a stem ('frustrat*' matches
+"frustrated", "frustrating", ...). compile_terms() builds the equivalent
+trie-shaped regex for scanners that need phrases (the chatbot router).
+"""
+import re
+import string
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, compress
+from typing import Dict, List, Optional, Pattern, Sequence
+
+INTENSIFIERS = {
+    'very': 2.0,
+    'really': 2.0,
+    'so': 2.0,
+    'super': 2.0,
+    'truly': 2.0,
+    'extremely': 3.0,
+    'incredibly': 3.0,
+}
+
+NEGATORS = (
+    'not', 'no', 'never', 'hardly', 'cannot',
+    "don't", "dont", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't",
+    "can't", "cant", "won't", "wouldn't", "couldn't", "haven't", "hasn't",
+)
+
+# A negator reaches at most this many words ahead ("not feeling very happy")
+NEGATION_WINDOW = 3
+
+# Clause breaks become their own '.' token, other punctuation a space
+_CLAUSE_BREAKS = '.!?;'
+_PUNCTUATION = ''.join(c for c in string.punctuation + '“”‘…—–' if c not in _CLAUSE_BREAKS + "'")
+_SPACING = str.maketrans(_PUNCTUATION, ' ' * len(_PUNCTUATION))
+
+_MOOD, _BOOST, _NEGATE, _BREAK, _DOC = 'mood', 'boost', 'negate', 'break', 'doc'
+
+# Separates texts when a batch is tokenized as one string
+_DOC_TOKEN = '\x00'
+
+# score_many tokenizes texts together in chunks of about this many characters
+# (large enough to amortize per-call work, small enough to stay in cache)
+BATCH_CHUNK_CHARS = 16384
+
+# Spellings remembered per lexicon; past this, unseen words are resolved
+# on every occurrence instead of cached
+MAX_CACHED_TOKENS = 50000
+
+
+def term_name(spec: str) -> str:
+    """Canonical name of a word spec ('motivat*' -> 'motivat')"""
+    return spec.rstrip('*')
+
+
+def _trie(specs) -> dict:
+    """Build a character trie; '' marks a word end, '*' a stem end"""
+    root = {}
+    for spec in specs:
+        node = root
+        for char in term_name(spec):
+            node = node.setdefault(char, {})
+        node[''] = '*' if spec.endswith('*') else True
+    return root
+
+
+def _trie_pattern(node: dict) -> str:
+    """Turn a trie into a regex with no duplicated prefixes"""
+    if node.get('') == '*':
+        return r'\w*'
+    branches = []
+    for char in sorted(key for key in node if key):
+        atom = r'\s+' if char == ' ' else re.escape(char)
+        branches.append(atom + _trie_pattern(node[char]))
+    if not branches:
+        return ''
+    group = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if node.get(''):
+        return '(?:' + group + ')?'
+    return group
+
+
+def compile_terms(specs) -> Pattern:
+    """One regex matching any of the word specs on word boundaries"""
+    return re.compile(r'\b(?:' + _trie_pattern(_trie(set(specs))) + r')(?!\w)')
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, with '.' standing for every clause break"""
+    text = text.lower()
+    for char in _CLAUSE_BREAKS:
+        if char in text:
+            text = text.replace(char, ' . ')
+    if text.isascii():
+        return text.translate(_SPACING).split()
+    # str.translate leaves its fast path on non-ASCII text; a few C-level
+    # replaces of the punctuation actually present are much cheaper
+    text = text.replace('’', "'")
+    for char in _PUNCTUATION:
+        if char in text:
+            text = text.replace(char, ' ')
+    return text.split()
+
+
+class _TokenTable(dict):
+    """token -> entry (or None); unseen spellings are resolved against the stems once"""
+
+    def __init__(self, entries, stems):
+        super().__init__(entries)
+        self.stems = stems
+        self.stem_prefixes = tuple(stems)
+
+    def __missing__(self, token):
+        entry = None
+        if self.stem_prefixes and token.startswith(self.stem_prefixes):
+            entry = next(self.stems[stem] for stem in self.stems if token.startswith(stem))
+        if len(self) < MAX_CACHED_TOKENS:
+            self[token] = entry
+        return entry
+
+
+class Lexicon:
+    """Mood words compiled into one token pass that fills a dense score vector"""
+
+    def __init__(self, moods: Dict[str, Sequence[str]], negated: Optional[Dict[str, Optional[str]]] = None,
+                 intensifiers: Dict[str, float] = INTENSIFIERS, negators: Sequence[str] = NEGATORS):
+        # Vector order; also breaks ties in dominant()
+        self.moods = tuple(moods)
+        index = {mood: i for i, mood in enumerate(self.moods)}
+        self._negated = tuple(index.get((negated or {}).get(mood)) for mood in self.moods)
+
+        words = {}
+        for mood, specs in moods.items():
+            for spec in specs:
+                words.setdefault(spec, set()).add(index[mood])
+        entries = {spec: (_MOOD, tuple(sorted(bits))) for spec, bits in words.items() if not spec.endswith('*')}
+        entries.update((word, (_BOOST, factor)) for word, factor in intensifiers.items())
+        entries.update((word, (_NEGATE, None)) for word in negators)
+        entries['.'] = (_BREAK, None)
+        entries[_DOC_TOKEN] = (_DOC, None)
+        # Longest stem first, so 'frustrat' wins over a shorter 'frus'
+        stems = {term_name(spec): (_MOOD, tuple(sorted(bits)))
+                 for spec, bits in sorted(words.items(), key=lambda item: -len(item[0]))
+                 if spec.endswith('*')}
+        self._tokens = _TokenTable(entries, stems)
+
+    def score(self, text: str) -> List[float]:
+        """Score every mood in a single pass over the text's tokens"""
+        scores = [0.0] * len(self.moods)
+        self._accumulate(list(map(self._tokens.__getitem__, _tokenize(text))), scores, 0, 0)
+        return scores
+
+    def score_many(self, texts: Sequence[str]) -> array:
+        """
+        Score a batch into one row-major matrix of doubles.
+
+        Row i (matrix[i * width:(i + 1) * width], width = len(moods)) equals
+        score(texts[i]). Texts are tokenized a chunk at a time as a single
+        string and only lexicon hits are visited, so per-text call overhead
+        disappears. On long texts the per-token work (lowercasing, splitting,
+        table lookups) dominates, and batching leaves it as it is.
+        """
+        width = len(self.moods)
+        matrix = array('d', bytes(8 * width * len(texts)))
+        ends = list(accumulate(map(len, texts)))
+        first = 0
+        while first < len(texts):
+            start = ends[first - 1] if first else 0
+            last = min(bisect_left(ends, start + BATCH_CHUNK_CHARS, first) + 1, len(texts))
+            self._score_chunk(texts[first:last], matrix, first * width)
+            first = last
+        return matrix
+
+    def _score_chunk(self, texts: Sequence[str], matrix: array, row: int) -> None:
+        width = len(self.moods)
+        joined = f' {_DOC_TOKEN} '.join(texts)
+        if joined.count(_DOC_TOKEN) != len(texts) - 1:
+            # A text contains the separator itself; score one by one
+            for offset, text in enumerate(texts):
+                matrix[row + offset * width:row + (offset + 1) * width] = array('d', self.score(text))
+            return
+        self._accumulate(list(map(self._tokens.__getitem__, _tokenize(joined))), matrix, row, width)
+
+    def _accumulate(self, entries: List, scores, row: int, step: int) -> None:
+        """
+        Add the weights of a token entry list into scores[row:row + len(moods)],
+        moving `step` places on at each _DOC token (0 for a single text, where
+        it only ends a clause). Only tokens that are in the lexicon are visited.
+        """
+        negated = self._negated
+        boost, boost_at, negate_at = 1.0, -2, -NEGATION_WINDOW - 2
+
+        for i in compress(range(len(entries)), entries):
+            kind, value = entries[i]
+            if kind is _MOOD:
+                weight = boost if boost_at == i - 1 else 1.0
+                if i - negate_at <= NEGATION_WINDOW:
+                    for mood in value:
+                        target = negated[mood]
+                        if target is not None:
+                            scores[row + target] += weight
+                else:
+                    for mood in value:
+                        scores[row + mood] += weight
+            elif kind is _BOOST:
+                boost = boost * value if boost_at == i - 1 else value
+                boost_at = i
+            elif kind is _NEGATE:
+                negate_at = i
+            else:
+                if kind is _DOC:
+                    row += step
+                negate_at = -NEGATION_WINDOW - 2
+
+    def dominant(self, scores: Sequence[float]) -> Optional[str]:
+        """Highest scoring mood (earliest in `moods` on ties), or None if nothing scored"""
+        best = max(range(len(scores)), key=lambda i: (scores[i], -i))
+        return self.moods[best] if scores[best] > 0 else None
+
+    def as_dict(self, scores: Sequence[float]) -> Dict[str, float]:
+        return dict(zip(self.moods, scores))
+
+
+# ============================================
+# CHATBOT MOODS (in tie-break priority order)
+# ============================================
+
+CHAT_MOODS = {
+    'motivational': ('motivat*', 'inspir*', 'encourag*'),
+    'lonely': ('lonely', 'alone'),
+    'tired': ('tired', 'exhausted'),
+    'anxious': ('anxious', 'anxiety', 'fear', 'fears', 'fearful', 'scared', 'nervous'),
+    'angry': ('angry', 'mad'),
+    'happy': ('happy', 'joy', 'joyful'),
+    'sad': ('sad', 'unhappy'),
+    'neutral': ('okay', 'fine', 'ok'),
+}
+
+CHAT_LEXICON = Lexicon(CHAT_MOODS, negated={'happy': 'sad', 'neutral': 'sad'})
+
+# ============================================
+# ANALYSIS MOODS (the six MoodAnalysis emotions)
+# ============================================
+
+ANALYSIS_MOODS = {
+    'happy': ('happy', 'joy', 'joyful', 'good', 'great', 'wonderful', 'excited', 'exciting',
+              'love', 'loved', 'loving', 'lovely', 'amazing', 'fantastic', 'glad', 'grateful'),
+    'sad': ('sad', 'unhappy', 'depress*', 'cry', 'cried', 'crying', 'tears', 'lonely', 'miserable',
+            'bad', 'terrible', 'awful', 'heartbroken', 'hopeless'),
+    'angry': ('angry', 'mad', 'hate', 'hated', 'annoyed', 'annoying', 'furious', 'rage',
+              'frustrat*', 'irritat*'),
+    'fear': ('fear', 'fears', 'scared', 'afraid', 'anxious', 'anxiety', 'worried', 'worry', 'worrying',
+             'nervous', 'panic', 'panicked', 'terrified'),
+    'neutral': ('okay', 'fine', 'normal', 'alright', 'meh', 'whatever', 'ok', 'average'),
+    'surprise': ('surprise', 'surprised', 'surprising', 'wow', 'shocked', 'unexpected', 'amazing',
+                 'astonish*'),
+}
+
+ANALYSIS_LEXICON = Lexicon(
+    ANALYSIS_MOODS,
+    negated={'happy': 'sad', 'neutral': 'sad', 'sad': 'neutral', 'angry': 'neutral', 'fear': 'neutral'},
+)